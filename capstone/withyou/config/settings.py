@@ -9,6 +9,9 @@ Centralized configuration for the application.
 Refactored for Pydantic V2 Compliance.
 """
 import os
+import threading
+from typing import Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -23,14 +26,86 @@ class Settings(BaseSettings):
     SAFETY_MODEL: str = "gemini-1.5-flash" 
     REASONING_MODEL: str = "gemini-1.5-pro"
     
+    # Per-turn model tiering (core/model_tiers.py): these agents run on
+    # SAFETY_MODEL (flash) or REASONING_MODEL (pro) per turn.
+    TIERED_AGENTS: list = ["cbt_coach", "behavioral_planner"]
+    TIER_LONG_MESSAGE_WORDS: int = 40
+    TIER_PRO_RISK_SCORE: float = 0.3
+    TIER_PRO_TTFT_TARGET_MS: float = Field(2500.0, alias="WITHYOU_PRO_TTFT_TARGET_MS")
+    TIER_LATENCY_WINDOW_SECONDS: float = 60.0
+    TIER_LATENCY_SAMPLES: int = 200
+
     # Clinical Thresholds
     MAX_RETRY_ATTEMPTS: int = 3
     CRISIS_TRIGGER_KEYWORDS: list = ["suicide", "kill myself", "end it all"]
+    # Keyword hits always escalate; only allowlisted acknowledgements skip the
+    # Safety Guardian (core/safety_cascade.py).
+    DEFAULT_LOCATION: str = "global"
+
+    # Vetted crisis resources (versioned data file, hot-reloaded on change).
+    # One registry for both apps: this is withyou_system's data file, so a
+    # hotline edited there is served here too.
+    CRISIS_RESOURCES_PATH: str = Field(
+        os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+            "capstone_v2", "withyou_system", "data", "crisis_resources.json",
+        ),
+        alias="WITHYOU_CRISIS_RESOURCES",
+    )
+    CRISIS_RESOURCES_RELOAD_SECONDS: float = 5.0
+
+    # Local state
+    MOOD_STORE_DIR: str = Field("state/mood", alias="WITHYOU_MOOD_DIR")
+    TELEMETRY_DIR: str = Field("state/logs", alias="WITHYOU_LOG_DIR")
+    TELEMETRY_QUEUE_SIZE: int = 65536       # Queued log records before INFO is shed
+    TELEMETRY_MAX_BYTES: int = 50 * 1024 * 1024
+    TELEMETRY_BACKUPS: int = 5
+    METRICS_PORT: int = Field(9464, alias="WITHYOU_METRICS_PORT")   # Local /metrics; 0 disables
+
+    # Crisis escalations for human review (core/escalations.py): one open case
+    # per session; each reviewer tier (webhook URLs, first tier first) has
+    # ESCALATION_ACK_SLA_SECONDS to acknowledge before the next tier is paged.
+    # Without webhooks, cases go to the JSONL review queue.
+    ESCALATION_DB_PATH: str = Field("state/escalations.db", alias="WITHYOU_ESCALATION_DB")
+    ESCALATION_QUEUE_PATH: str = Field("state/escalation_queue.jsonl", alias="WITHYOU_ESCALATION_QUEUE")
+    ESCALATION_WEBHOOKS: list = Field([], alias="WITHYOU_ESCALATION_WEBHOOKS")   # JSON list of URLs
+    ESCALATION_WORKERS: int = 2
+    ESCALATION_ACK_SLA_SECONDS: float = 300.0
+    ESCALATION_RETRY_SECONDS: float = 5.0        # First retry after a failed delivery; doubles per attempt
+    ESCALATION_MAX_ATTEMPTS: int = 3             # Failed deliveries before the next tier is tried
+    ESCALATION_LEASE_SECONDS: float = 60.0       # A delivery not finished by then is retried
+    ESCALATION_COMMIT_WAIT_SECONDS: float = 5.0
+    ESCALATION_EXCERPT_CHARS: int = 500
     
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
         extra = 'ignore'
 
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """The Settings singleton, built (and .env read) on first call."""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings()
+    return _settings
+
+
+class _LazySettings:
+    """
+    Stands in for the singleton so `from config.settings import settings`
+    stays cheap: nothing is read from the environment or .env until the
+    first attribute access.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
 # Singleton instance
-settings = Settings()
\ No newline at end of file
+settings = _LazySettings()
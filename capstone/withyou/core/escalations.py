@@ -0,0 +1,515 @@
+"""
+core/escalations.py
+Crisis escalation outbox: a synced append-only log, then durable SQLite cases,
+one per session, delivered to reviewer tiers with acknowledgement SLAs and
+re-escalation.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger("clinical_audit")
+
+PENDING = "pending"            # Waiting for (re)delivery to the current tier
+DELIVERED = "delivered"        # With a reviewer; the ack SLA is running
+ACKNOWLEDGED = "acknowledged"  # A reviewer has it
+RESOLVED = "resolved"          # Closed; a new escalation in the session opens a new case
+
+
+class Escalation(NamedTuple):
+    id: int
+    user_id: str
+    session_id: str
+    source: str        # Which gate escalated, e.g. "safety_cascade", "safety_sentinel"
+    risk: str
+    excerpt: str       # The message that escalated, redacted and cut
+    created: float
+    last_seen: float
+    occurrences: int   # Escalations folded into this case
+    level: int         # Reviewer tier: 0 first, +1 per missed ack SLA or exhausted retries
+    status: str
+    attempts: int      # Delivery attempts at this level
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "case_id": self.id, "user_id": self.user_id, "session_id": self.session_id,
+            "source": self.source, "risk": self.risk, "excerpt": self.excerpt,
+            "created": round(self.created, 3), "last_seen": round(self.last_seen, 3),
+            "occurrences": self.occurrences, "tier": self.level, "attempt": self.attempts,
+        }
+
+
+class Recorded(NamedTuple):
+    case_id: int
+    new: bool   # False: folded into the session's open case
+
+
+class JsonlReviewQueue:
+    """Local sink: appends cases to a JSONL file a review console (or relay) tails."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, case: Escalation):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        line = json.dumps(case.payload()) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+class WebhookSink:
+    """POSTs the case as JSON; any non-2xx reply or network error fails the delivery."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, case: Escalation):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(case.payload()).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+    def __repr__(self) -> str:
+        return f"WebhookSink({self.url!r})"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS escalations (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    risk TEXT NOT NULL,
+    excerpt TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    level INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_action REAL,
+    acked_by TEXT,
+    acked_at REAL,
+    resolved_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS escalations_open_session ON escalations (user_id, session_id) WHERE status != 'resolved';
+CREATE INDEX IF NOT EXISTS escalations_by_action ON escalations (next_action) WHERE next_action IS NOT NULL;
+CREATE TABLE IF NOT EXISTS log_state (id INTEGER PRIMARY KEY CHECK (id = 0), committed_seq INTEGER NOT NULL);
+INSERT OR IGNORE INTO log_state VALUES (0, 0);
+"""
+
+_COLUMNS = "id, user_id, session_id, source, risk, excerpt, created, last_seen, occurrences, level, status, attempts"
+
+_UPSERT = (
+    "INSERT INTO escalations (user_id, session_id, source, risk, excerpt, created, last_seen, status, next_action)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', ?)"
+    " ON CONFLICT (user_id, session_id) WHERE status != 'resolved'"
+    " DO UPDATE SET occurrences = occurrences + 1, last_seen = excluded.last_seen"
+    " RETURNING id, occurrences"
+)
+
+_MAX_RETRY_SECONDS = 300.0
+
+_sync_log = getattr(os, "fdatasync", os.fsync)
+
+
+_AUDIT_EVENTS = frozenset({"ESCALATION_OPENED", "ESCALATION_SLA_BREACHED"})
+
+
+def _log(event: str, details: Dict[str, Any]):
+    if event.endswith("_FAILED"):
+        level = logging.ERROR
+    else:
+        level = logging.WARNING if event in _AUDIT_EVENTS else logging.INFO
+    logger.log(level, f"{event}: " + " ".join(f"{key}={value}" for key, value in details.items()))
+
+
+class EscalationOutbox:
+    """
+    Crisis escalations for human review, never lost and never on the
+    reply's critical path.
+
+    `record` appends the escalation to a local append-only log and
+    fdatasyncs it (one small write, ~100 us) before returning, so a case
+    is durable before the caller yields the crisis reply. A writer thread
+    then commits everything queued within `group_seconds` to SQLite in one
+    transaction (group commit, synchronous=FULL) and resolves the returned
+    Futures; each commit also stores the last log sequence number it
+    covers, and the log is truncated whenever SQLite has caught up with
+    it. On open, log entries past that number are queued again, so a crash
+    between the two writes loses nothing. The log holds the unredacted
+    excerpt only until its commit. A case is keyed by (user, session):
+    repeat escalations while it is open only bump its count, which a
+    partial unique index enforces.
+
+    A pool of worker threads claims due cases from the index on
+    `next_action` and hands each to the sink for its tier. A claim is a
+    lease: if the process dies mid-delivery the case is due again when the
+    lease runs out (and immediately on the next start), so delivery is at
+    least once; sinks get the case id to deduplicate. A delivered case has
+    `ack_sla_seconds` to be acknowledged before it moves to the next tier
+    (the last tier keeps being re-notified); failed deliveries back off
+    and, after `max_attempts`, also move up a tier.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        tiers: Optional[Sequence[Callable[[Escalation], Any]]] = None,
+        workers: int = 4,
+        ack_sla_seconds: float = 300.0,
+        retry_seconds: float = 5.0,
+        max_attempts: int = 3,
+        lease_seconds: float = 60.0,
+        excerpt_chars: int = 500,
+        redact: Optional[Callable[[str, str], str]] = None,
+        log_path: Optional[str] = None,
+        group_seconds: float = 0.005,
+    ):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.tiers = list(tiers) if tiers else [JsonlReviewQueue(os.path.join(os.path.dirname(db_path) or ".", "escalation_queue.jsonl"))]
+        self.workers = workers
+        self.ack_sla_seconds = ack_sla_seconds
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.excerpt_chars = excerpt_chars
+        self.redact = redact
+        self.group_seconds = group_seconds
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Unlike the session store, a committed case must survive power loss too
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._incoming: deque = deque()
+        self._log_lock = threading.Lock()
+        self._log_path = log_path or os.path.splitext(db_path)[0] + ".log"
+        self._wake_writer = threading.Event()
+        self._ready = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stopped = False
+        self.counts = {
+            "recorded": 0, "cases_opened": 0, "deduplicated": 0, "commits": 0, "delivered": 0,
+            "failed_deliveries": 0, "sla_breaches": 0, "acknowledged": 0, "resolved": 0, "replayed": 0,
+        }
+        self._log_seq = self._replay_log()
+        self._log = open(self._log_path, "ab", buffering=0)
+
+    # --- Hot path -------------------------------------------------------------------
+
+    def record(self, user_id: str, session_id: str, source: str, risk: str = "HIGH", text: str = "") -> Future:
+        """
+        Appends the escalation to the log, synced, and queues it. The Future
+        resolves to a Recorded once the case is committed to SQLite.
+        """
+        if not self._threads:
+            self.start()
+        future: Future = Future()
+        at = time.time()
+        text = text[:self.excerpt_chars]
+        with self._log_lock:
+            seq = self._log_seq + 1
+            entry = {"seq": seq, "at": at, "user_id": user_id, "session_id": session_id, "source": source, "risk": risk, "text": text}
+            self._log.write(json.dumps(entry).encode("utf-8") + b"\n")
+            _sync_log(self._log.fileno())
+            self._log_seq = seq
+            # Appended under the lock, so the queue stays in log order
+            self._incoming.append((seq, at, user_id, session_id, source, risk, text, future))
+        self._wake_writer.set()
+        return future
+
+    # --- Intent log -------------------------------------------------------------------
+
+    def _replay_log(self) -> int:
+        """Queues log entries SQLite never committed; returns the last sequence number in use."""
+        with self._lock:
+            committed = self._conn.execute("SELECT committed_seq FROM log_state").fetchone()[0]
+        try:
+            with open(self._log_path, "rb") as handle:
+                data = handle.read()
+        except FileNotFoundError:
+            return committed
+        # A torn last line never returned from record(): drop it before appending again
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            with open(self._log_path, "r+b") as handle:
+                handle.truncate(end)
+        last = committed
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            last = max(last, entry["seq"])
+            if entry["seq"] > committed:
+                self._incoming.append((
+                    entry["seq"], entry["at"], entry["user_id"], entry["session_id"],
+                    entry["source"], entry["risk"], entry["text"], Future(),
+                ))
+        if self._incoming:
+            self.counts["replayed"] = len(self._incoming)
+            self._wake_writer.set()
+            _log("ESCALATIONS_REPLAYED", {"count": len(self._incoming), "log": self._log_path})
+        return last
+
+    def _compact_log(self, committed_seq: int):
+        with self._log_lock:
+            # Nothing was appended since this commit: every entry is in SQLite
+            if self._log_seq == committed_seq:
+                self._log.truncate(0)
+
+    # --- Writer thread ----------------------------------------------------------------
+
+    def _write_loop(self):
+        while True:
+            self._wake_writer.wait()
+            self._wake_writer.clear()
+            stopping = self._stop.is_set()
+            while self._incoming:
+                # The log already holds every queued case, so the commit can wait to group more
+                self._stop.wait(self.group_seconds)
+                try:
+                    self._commit_queued()
+                except Exception as error:
+                    # Nothing is dropped: the batch stays queued and is retried
+                    _log("ESCALATION_WRITE_FAILED", {"queued": len(self._incoming), "error": repr(error)})
+                    time.sleep(0.5)
+            if stopping:
+                return
+
+    def _commit_queued(self):
+        batch = list(self._incoming)
+        rows = []
+        for _, at, user_id, session_id, source, risk, text, _ in batch:
+            excerpt = text
+            if self.redact is not None:
+                excerpt = self.redact(user_id, excerpt)
+            rows.append((user_id, session_id, source, risk, excerpt, at, at, at))
+        results = []
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    results.append(conn.execute(_UPSERT, row).fetchone())
+                conn.execute("UPDATE log_state SET committed_seq = ?", (batch[-1][0],))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.counts["commits"] += 1
+            self.counts["recorded"] += len(batch)
+        for _ in batch:
+            self._incoming.popleft()
+        self._compact_log(batch[-1][0])
+        opened = 0
+        for entry, (case_id, occurrences) in zip(batch, results):
+            new = occurrences == 1
+            opened += new
+            future = entry[-1]
+            if not future.done():
+                future.set_result(Recorded(case_id, new))
+            if new:
+                _log("ESCALATION_OPENED", {"case_id": case_id, "user_id": entry[2], "session_id": entry[3], "source": entry[4]})
+        self.counts["cases_opened"] += opened
+        self.counts["deduplicated"] += len(batch) - opened
+        if opened:
+            with self._ready:
+                self._ready.notify(opened)
+
+    # --- Delivery workers ---------------------------------------------------------------
+
+    def _claim(self, now: float) -> Optional[Escalation]:
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT {_COLUMNS} FROM escalations WHERE next_action IS NOT NULL AND next_action <= ?"
+                    " ORDER BY next_action LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                case = Escalation(*row)
+                if case.status == DELIVERED:
+                    # Not acknowledged in time: the next tier gets it
+                    case = case._replace(level=case.level + 1, attempts=0)
+                    self.counts["sla_breaches"] += 1
+                    _log("ESCALATION_SLA_BREACHED", {"case_id": case.id, "tier": case.level})
+                case = case._replace(status=PENDING, attempts=case.attempts + 1)
+                conn.execute(
+                    "UPDATE escalations SET status = ?, level = ?, attempts = ?, next_action = ? WHERE id = ?",
+                    (PENDING, case.level, case.attempts, now + self.lease_seconds, case.id),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return case
+
+    def _deliver(self, case: Escalation) -> bool:
+        sink = self.tiers[min(case.level, len(self.tiers) - 1)]
+        try:
+            sink(case)
+        except Exception as error:
+            _log("ESCALATION_DELIVERY_FAILED", {"case_id": case.id, "tier": case.level, "attempt": case.attempts, "error": repr(error)})
+            if case.attempts >= self.max_attempts and case.level + 1 < len(self.tiers):
+                update = ("UPDATE escalations SET level = level + 1, attempts = 0, next_action = ? WHERE id = ? AND status = 'pending'",
+                          (time.time(), case.id))
+            else:
+                delay = min(self.retry_seconds * 2 ** (case.attempts - 1), _MAX_RETRY_SECONDS)
+                update = ("UPDATE escalations SET next_action = ? WHERE id = ? AND status = 'pending'", (time.time() + delay, case.id))
+            with self._lock:
+                self._conn.execute(*update)
+                self.counts["failed_deliveries"] += 1
+            return False
+        with self._lock:
+            # Acknowledged while the sink ran: leave it alone
+            self._conn.execute(
+                "UPDATE escalations SET status = 'delivered', next_action = ? WHERE id = ? AND status = 'pending'",
+                (time.time() + self.ack_sla_seconds, case.id),
+            )
+            self.counts["delivered"] += 1
+        _log("ESCALATION_DELIVERED", {"case_id": case.id, "tier": case.level, "attempt": case.attempts})
+        return True
+
+    def _next_due_in(self, now: float, cap: float) -> float:
+        with self._lock:
+            row = self._conn.execute("SELECT min(next_action) FROM escalations WHERE next_action IS NOT NULL").fetchone()
+        return cap if row[0] is None else min(max(row[0] - now, 0.0), cap)
+
+    def _work_loop(self):
+        while not self._stop.is_set():
+            try:
+                case = self._claim(time.time())
+                if case is not None:
+                    self._deliver(case)
+                    continue
+                wait = self._next_due_in(time.time(), 1.0)
+            except Exception as error:
+                _log("ESCALATION_WORKER_FAILED", {"error": repr(error)})
+                wait = 1.0
+            if wait > 0:
+                with self._ready:
+                    self._ready.wait(wait)
+
+    # --- Reviewers ------------------------------------------------------------------------
+
+    def acknowledge(self, case_id: int, reviewer: str) -> bool:
+        """Stops the SLA timer; returns False if the case is unknown or already acknowledged."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE escalations SET status = 'acknowledged', next_action = NULL, acked_by = ?, acked_at = ?"
+                " WHERE id = ? AND status IN ('pending', 'delivered')",
+                (reviewer, time.time(), case_id),
+            )
+            if cursor.rowcount:
+                self.counts["acknowledged"] += 1
+        if cursor.rowcount:
+            _log("ESCALATION_ACKNOWLEDGED", {"case_id": case_id, "reviewer": reviewer})
+        return cursor.rowcount > 0
+
+    def resolve(self, case_id: int, reviewer: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE escalations SET status = 'resolved', next_action = NULL, resolved_at = ?,"
+                " acked_by = coalesce(acked_by, ?), acked_at = coalesce(acked_at, ?) WHERE id = ? AND status != 'resolved'",
+                (time.time(), reviewer, time.time(), case_id),
+            )
+            if cursor.rowcount:
+                self.counts["resolved"] += 1
+        if cursor.rowcount:
+            _log("ESCALATION_RESOLVED", {"case_id": case_id, "reviewer": reviewer})
+        return cursor.rowcount > 0
+
+    def open_cases(self) -> List[Escalation]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM escalations WHERE status != 'resolved' ORDER BY created"
+            ).fetchall()
+        return [Escalation(*row) for row in rows]
+
+    # --- Control ---------------------------------------------------------------------------
+
+    def start(self):
+        """Starts the writer and the delivery workers; cases left mid-delivery by a previous run are due at once."""
+        with self._start_lock:
+            if self._threads or self._stopped:
+                return
+            with self._lock:
+                self._conn.execute("UPDATE escalations SET next_action = ? WHERE status = 'pending' AND next_action > ?", (time.time(),) * 2)
+            self._threads.append(threading.Thread(target=self._write_loop, name="escalation-writer", daemon=True))
+            self._threads.extend(
+                threading.Thread(target=self._work_loop, name=f"escalation-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            )
+            for thread in self._threads:
+                thread.start()
+            atexit.register(self.close)
+
+    def close(self):
+        """Commits whatever is still queued, then stops the threads."""
+        with self._start_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        self._stop.set()
+        self._wake_writer.set()
+        with self._ready:
+            self._ready.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        if not self._threads and self._incoming:
+            self._commit_queued()
+        self._log.close()
+        self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_status = dict(self._conn.execute(
+                "SELECT status, count(*) FROM escalations WHERE status != 'resolved' GROUP BY status"
+            ).fetchall())
+        return {**self.counts, "queued": len(self._incoming), "open": by_status}
+
+
+_outbox: Optional[EscalationOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_escalation_outbox() -> EscalationOutbox:
+    """Process-wide outbox on settings.ESCALATION_DB_PATH; its threads start on the first escalation."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            from config.settings import settings
+            tiers = [WebhookSink(url) for url in settings.ESCALATION_WEBHOOKS] or [JsonlReviewQueue(settings.ESCALATION_QUEUE_PATH)]
+            _outbox = EscalationOutbox(
+                settings.ESCALATION_DB_PATH,
+                tiers=tiers,
+                workers=settings.ESCALATION_WORKERS,
+                ack_sla_seconds=settings.ESCALATION_ACK_SLA_SECONDS,
+                retry_seconds=settings.ESCALATION_RETRY_SECONDS,
+                max_attempts=settings.ESCALATION_MAX_ATTEMPTS,
+                lease_seconds=settings.ESCALATION_LEASE_SECONDS,
+                excerpt_chars=settings.ESCALATION_EXCERPT_CHARS,
+            )
+        return _outbox
@@ -7,9 +7,15 @@ class ClinicalSystemException(Exception):
     pass
 
 class CrisisDetectedException(ClinicalSystemException):
-    """Raised when the Safety Shield intercepts a dangerous prompt."""
-    def __init__(self, message="Crisis risk detected. Protocol initiated."):
+    """
+    Raised when the Safety Shield intercepts a dangerous prompt. `message`
+    is the compassionate reply for the user; `source` names the layer that
+    escalated (for the human-review case).
+    """
+    def __init__(self, message="Crisis risk detected. Protocol initiated.", source="safety_shield", risk="HIGH"):
         self.message = message
+        self.source = source
+        self.risk = risk
         super().__init__(self.message)
 
 class ToolExecutionError(ClinicalSystemException):
@@ -0,0 +1,108 @@
+"""
+core/model_tiers.py
+Per-turn model tiering: flash or pro for the specialist agents, chosen from
+cheap local signals (message length, risk score) and recent pro latency.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+
+from config.settings import settings
+
+FLASH = "flash"
+PRO = "pro"
+
+
+def tier_model(tier: str) -> str:
+    return settings.SAFETY_MODEL if tier == FLASH else settings.REASONING_MODEL
+
+
+class TierDecision(NamedTuple):
+    tier: str
+    model: str
+    reason: str   # The signal that decided it
+
+
+# The current turn's decision; TierPlugin (core/plugins.py) applies it to specialist calls
+_turn_tier: contextvars.ContextVar[Optional[TierDecision]] = contextvars.ContextVar("withyou_turn_tier", default=None)
+
+
+class _LatencyWindow:
+    """Time-to-first-response of recent calls to one model, oldest dropped first."""
+
+    def __init__(self):
+        self.samples: Deque[Tuple[float, float]] = deque(maxlen=settings.TIER_LATENCY_SAMPLES)
+
+    def p90(self, now: float) -> Optional[float]:
+        while self.samples and now - self.samples[0][0] > settings.TIER_LATENCY_WINDOW_SECONDS:
+            self.samples.popleft()
+        if len(self.samples) < 5:
+            return None  # Too little recent evidence to call the model slow
+        ordered = sorted(seconds for _, seconds in self.samples)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+
+class TierPolicy:
+    """
+    Picks the model tier for a turn. Pro is kept for turns that need it,
+    long messages or any risk signal; short check-ins go to flash.
+
+    Pro is also skipped while its recent p90 time-to-first-response is over
+    TIER_PRO_TTFT_TARGET_MS. Samples older than TIER_LATENCY_WINDOW_SECONDS
+    expire, so once flash has carried the traffic for a window, pro is
+    tried again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: Dict[str, _LatencyWindow] = {}   # Model name -> window, created on first sample
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+    def choose(self, user_input: str, risk_score: float) -> TierDecision:
+        if risk_score >= settings.TIER_PRO_RISK_SCORE:
+            tier, reason = PRO, "risk_score"
+        elif len(user_input.split()) >= settings.TIER_LONG_MESSAGE_WORDS:
+            tier, reason = PRO, "long_message"
+        else:
+            tier, reason = FLASH, "short_check_in"
+        if tier == PRO and not self.pro_within_target():
+            tier, reason = FLASH, "pro_over_latency_target"
+        with self._lock:
+            self._counts[(tier, reason)] = self._counts.get((tier, reason), 0) + 1
+        return TierDecision(tier, tier_model(tier), reason)
+
+    def pro_within_target(self) -> bool:
+        with self._lock:
+            window = self._latency.get(tier_model(PRO))
+            p90 = window.p90(time.monotonic()) if window is not None else None
+        return p90 is None or p90 * 1000 <= settings.TIER_PRO_TTFT_TARGET_MS
+
+    def observe(self, model: str, seconds: float):
+        with self._lock:
+            window = self._latency.get(model)
+            if window is None:
+                window = self._latency[model] = _LatencyWindow()
+            window.samples.append((time.monotonic(), seconds))
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        with self._lock:
+            p90 = {model: window.p90(now) for model, window in self._latency.items()}
+            counts = dict(self._counts)
+        return {
+            "turns": {f"{tier}/{reason}": count for (tier, reason), count in sorted(counts.items())},
+            "ttft_p90_ms": {model: None if value is None else round(value * 1000, 1) for model, value in p90.items()},
+        }
+
+
+def set_turn_tier(decision: Optional[TierDecision]):
+    _turn_tier.set(decision)
+
+
+def turn_tier() -> Optional[TierDecision]:
+    return _turn_tier.get()
+
+
+tier_policy = TierPolicy()
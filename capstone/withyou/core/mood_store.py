@@ -0,0 +1,230 @@
+"""
+core/mood_store.py
+Columnar mood-log store: per-user append-only, memory-mapped column files.
+Trend queries read running totals, so their cost does not grow with history.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Emotion vocabulary; anything else is stored as "other" (code 0).
+EMOTIONS: Tuple[str, ...] = (
+    "other", "anxious", "sad", "stressed", "angry", "lonely", "tired",
+    "numb", "calm", "content", "hopeful", "happy",
+)
+_EMOTION_CODES = {name: code for code, name in enumerate(EMOTIONS)}
+
+# Append-only "<file name>\t<JSON user id>" lines, one per user, written on first entry
+USER_INDEX = "users.tsv"
+
+_SECONDS_PER_DAY = 86400.0
+# Slope (valence points per day) beyond which a window counts as a trend
+_TREND_SLOPE = 0.05
+
+# Timestamps live in their own contiguous float64 column file (`.ts`) so the
+# window search is a binary search over a memory map with no copying. The
+# record file (`.mood`) has one row per entry. Its layout is fixed: columns
+# added later get their own file, so existing logs stay readable as-is. The cumulative columns hold
+# running totals up to and including the row, so any time window is two row
+# lookups and a subtraction. `t` is days since the user's first entry, which
+# keeps the squared sums exact enough in float64.
+TS_DTYPE = np.dtype("<f8")
+RECORD_DTYPE = np.dtype([
+    ("valence", "<f4"),
+    ("emotion", "<i2"),
+    ("_pad", "<i2"),
+    ("cum_v", "<f8"),
+    ("cum_t", "<f8"),
+    ("cum_tv", "<f8"),
+    ("cum_tt", "<f8"),
+    ("cum_emotions", "<i4", (len(EMOTIONS),)),
+])
+# Hours slept (`.sleep`), NaN when not reported. Logs written before this
+# column existed have a short or missing file; missing rows read as NaN.
+SLEEP_DTYPE = np.dtype("<f4")
+
+
+def user_file_name(user_id: str) -> str:
+    # Hash user ids into file names: no path characters, fixed length.
+    return hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+
+
+def read_sleep(base: str, start: int, count: int) -> np.ndarray:
+    """Sleep hours for entries [start, start + count), NaN-padded where the column is short."""
+    sleep = np.full(count, np.nan, dtype=SLEEP_DTYPE)
+    if os.path.exists(base + ".sleep"):
+        stored = np.fromfile(base + ".sleep", dtype=SLEEP_DTYPE, count=count, offset=start * SLEEP_DTYPE.itemsize)
+        sleep[: len(stored)] = stored
+    return sleep
+
+
+def _write_sleep(base: str, index: int, hours: float):
+    # Pads rows the column lacks (older logs, a crash mid-append) with NaN,
+    # so row `index` lines up with the other column files.
+    path = base + ".sleep"
+    stored = os.path.getsize(path) // SLEEP_DTYPE.itemsize if os.path.exists(path) else 0
+    with open(path, "r+b" if stored else "wb") as handle:
+        if stored < index:
+            handle.seek(stored * SLEEP_DTYPE.itemsize)
+            handle.write(np.full(index - stored, np.nan, dtype=SLEEP_DTYPE).tobytes())
+        handle.seek(index * SLEEP_DTYPE.itemsize)
+        handle.write(np.array([hours], dtype=SLEEP_DTYPE).tobytes())
+        handle.truncate()
+
+
+def emotion_code(emotion: str) -> int:
+    return _EMOTION_CODES.get(emotion.strip().lower(), 0)
+
+
+class MoodWindow(NamedTuple):
+    entries: int
+    average_valence: float
+    slope_per_day: float
+    trend: str
+    primary_emotion: Optional[str]
+
+
+def _map(path: str, dtype: np.dtype, count: int) -> np.ndarray:
+    if not count:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class _UserLog:
+    __slots__ = ("path", "count", "ts", "rows", "tail", "last_ts", "first_ts")
+
+    def __init__(self, path: str):
+        self.path = path
+        # A crash between the two writes of an append leaves the files at
+        # different lengths; the shorter one is authoritative.
+        self.count = min(
+            os.path.getsize(path + suffix) // dtype.itemsize if os.path.exists(path + suffix) else 0
+            for suffix, dtype in ((".ts", TS_DTYPE), (".mood", RECORD_DTYPE))
+        )
+        self.ts = self.rows = None  # Memory maps over the first `count` entries, mapped lazily
+        self.tail = None            # Last record, used to extend the running totals
+        self.last_ts = None
+        self.first_ts = None        # Timestamp of entry 0; `t` is measured from it
+
+    def mapped(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.rows is None or len(self.rows) != self.count:
+            self.ts = _map(self.path + ".ts", TS_DTYPE, self.count)
+            self.rows = _map(self.path + ".mood", RECORD_DTYPE, self.count)
+        return self.ts, self.rows
+
+
+class MoodStore:
+    """
+    Two column files per user: timestamps (TS_DTYPE) and fixed-width records
+    (RECORD_DTYPE). Appends write one value to each; reads memory-map both,
+    so only the pages a query touches are loaded. Sleep hours, when
+    reported, go to a third column file (SLEEP_DTYPE).
+
+    A trend query finds the window start with a binary search on `ts` and
+    reads the running totals at both ends, so its cost is O(log n) in the
+    length of the history and independent of the window size. Timestamps must
+    be non-decreasing per user. Single writer per store directory.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._logs: Dict[str, _UserLog] = {}
+        self._lock = threading.Lock()
+
+    def _log(self, user_id: str) -> _UserLog:
+        log = self._logs.get(user_id)
+        if log is None:
+            log = self._logs[user_id] = _UserLog(os.path.join(self.root, user_file_name(user_id)))
+        return log
+
+    def append(
+        self,
+        user_id: str,
+        valence: float,
+        emotion: str,
+        ts: Optional[float] = None,
+        sleep_hours: Optional[float] = None,
+    ) -> int:
+        """Records one entry and returns the user's entry count."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            log = self._log(user_id)
+            if log.tail is None and log.count:
+                stamps, rows = log.mapped()
+                log.first_ts, log.last_ts, log.tail = float(stamps[0]), float(stamps[-1]), np.array(rows[-1])
+            if log.last_ts is not None and ts < log.last_ts:
+                raise ValueError("Mood entries must be appended in time order.")
+            if log.first_ts is None:
+                log.first_ts = ts
+
+            os.makedirs(self.root, exist_ok=True)
+            record = np.zeros(1, dtype=RECORD_DTYPE)
+            row = record[0]
+            code = emotion_code(emotion)
+            t = (ts - log.first_ts) / _SECONDS_PER_DAY
+            row["valence"], row["emotion"] = valence, code
+            row["cum_v"], row["cum_t"], row["cum_tv"], row["cum_tt"] = valence, t, t * valence, t * t
+            if log.tail is not None:
+                for column in ("cum_v", "cum_t", "cum_tv", "cum_tt", "cum_emotions"):
+                    row[column] += log.tail[column]
+            row["cum_emotions"][code] += 1
+
+            if not log.count:
+                with open(os.path.join(self.root, USER_INDEX), "a", encoding="utf-8") as handle:
+                    handle.write(f"{os.path.basename(log.path)}\t{json.dumps(user_id)}\n")
+            with open(log.path + ".mood", "ab") as handle:
+                handle.write(record.tobytes())
+            with open(log.path + ".ts", "ab") as handle:
+                handle.write(np.array([ts], dtype=TS_DTYPE).tobytes())
+            if sleep_hours is not None:
+                _write_sleep(log.path, log.count, sleep_hours)
+            log.count += 1
+            log.tail, log.last_ts = np.array(row), ts
+            return log.count
+
+    def window(self, user_id: str, days: float, now: Optional[float] = None) -> MoodWindow:
+        """Aggregates for entries in the last `days` days."""
+        now = time.time() if now is None else now
+        with self._lock:
+            log = self._log(user_id)
+            stamps, rows = log.mapped()
+            if not len(rows):
+                return MoodWindow(0, 0.0, 0.0, "insufficient_data", None)
+            start = int(stamps.searchsorted(now - days * _SECONDS_PER_DAY, side="left"))
+            end = int(stamps.searchsorted(now, side="right"))
+            if end <= start:
+                return MoodWindow(0, 0.0, 0.0, "insufficient_data", None)
+            last = rows[end - 1]
+            before = rows[start - 1] if start else None
+
+            def total(column):
+                return last[column] - before[column] if before is not None else np.array(last[column])
+
+            n = end - start
+            sum_v, sum_t = float(total("cum_v")), float(total("cum_t"))
+            sum_tv, sum_tt = float(total("cum_tv")), float(total("cum_tt"))
+            emotions = total("cum_emotions")
+
+        average = sum_v / n
+        spread = n * sum_tt - sum_t * sum_t
+        slope = (n * sum_tv - sum_t * sum_v) / spread if n > 1 and spread > 1e-12 else 0.0
+        if n < 3:
+            trend = "insufficient_data"
+        elif slope <= -_TREND_SLOPE:
+            trend = "deteriorating"
+        elif slope >= _TREND_SLOPE:
+            trend = "improving"
+        else:
+            trend = "stable"
+        named = emotions[1:]
+        primary = EMOTIONS[1 + int(np.argmax(named))] if named.any() else "other"
+        return MoodWindow(n, round(average, 2), round(slope, 3), trend, primary)
+
+    def entries(self, user_id: str) -> int:
+        with self._lock:
+            return self._log(user_id).count
@@ -0,0 +1,78 @@
+"""
+core/registry.py
+Process-wide registry for model clients, agents and runners.
+Each object is built once, on first use, and shared for the life of the process.
+"""
+import threading
+from typing import Any, Callable, Dict
+
+from config.settings import settings
+
+
+class Registry:
+    """
+    Holds one Gemini model object per model name, one agent per agent name and
+    one Runner per agent. Agents on the same model share that model's Gemini
+    object, and with it one API client and its pooled HTTP connections.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._models: Dict[str, Any] = {}
+        self._agents: Dict[str, Any] = {}
+        self._runners: Dict[str, Any] = {}
+        self._session_service = None
+
+    @property
+    def session_service(self):
+        with self._lock:
+            if self._session_service is None:
+                from google.adk.sessions import InMemorySessionService
+                self._session_service = InMemorySessionService()
+            return self._session_service
+
+    def model(self, model_name: str):
+        with self._lock:
+            if model_name not in self._models:
+                from google.adk.models.google_llm import Gemini
+                from google.genai import types
+                retry_options = types.HttpRetryOptions(attempts=settings.MAX_RETRY_ATTEMPTS, exp_base=2)
+                self._models[model_name] = Gemini(model=model_name, retry_options=retry_options)
+            return self._models[model_name]
+
+    def agent(self, agent_name: str, factory: Callable[[], Any]):
+        """Returns the agent registered as `agent_name`, building it with `factory` once."""
+        with self._lock:
+            if agent_name not in self._agents:
+                self._agents[agent_name] = factory()
+            return self._agents[agent_name]
+
+    def runner(self, agent_name: str, factory: Callable[[], Any]):
+        with self._lock:
+            if agent_name not in self._runners:
+                from google.adk.runners import Runner
+                from core.plugins import RUNNER_PLUGINS
+                self._runners[agent_name] = Runner(
+                    agent=self.agent(agent_name, factory),
+                    app_name=settings.APP_NAME,
+                    session_service=self.session_service,
+                    plugins=RUNNER_PLUGINS,
+                )
+            return self._runners[agent_name]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counts of objects held. Each model object owns one API client, so
+        `http_clients` is the number of distinct connection pools in use.
+        """
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "agents": len(self._agents),
+                "runners": len(self._runners),
+                "http_clients": len(self._models),
+            }
+
+
+# Singleton instance
+registry = Registry()
@@ -0,0 +1,114 @@
+"""
+core/safety_cascade.py
+Tiered safety gate: keyword guard -> acknowledgement allowlist -> Safety
+Guardian LLM. Only keyword hits and plain acknowledgements skip the model.
+"""
+import re
+from enum import Enum
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config.settings import settings
+from core.safety_guard import CrisisMatch, CrisisMatcher, scan_for_crisis
+from domain.tools.crisis_tools import lookup_crisis_resources
+
+# Soft risk cues and their weights. None of these escalate on their own; the
+# score feeds model tiering.
+RISK_SIGNALS: Dict[str, float] = {
+    "don't want to be here": 0.8,
+    "dont want to be here": 0.8,
+    "no reason to live": 0.9,
+    "better off without me": 0.9,
+    "can't go on": 0.7,
+    "cant go on": 0.7,
+    "self harm": 0.8,
+    "self-harm": 0.8,
+    "cutting myself": 0.8,
+    "hopeless": 0.5,
+    "no point": 0.5,
+    "give up": 0.4,
+    "giving up": 0.4,
+    "burden": 0.4,
+    "worthless": 0.4,
+    "trapped": 0.4,
+    "disappear": 0.4,
+    "goodbye": 0.3,
+    "pills": 0.3,
+    "die": 0.5,
+    "dying": 0.4,
+    "dead": 0.4,
+    "kill": 0.5,
+    "hurt": 0.3,
+    "hurting": 0.3,
+    "abuse": 0.6,
+    "hit me": 0.6,
+    "unsafe": 0.5,
+    "alone": 0.15,
+    "empty": 0.15,
+}
+
+# Whole messages that are positive evidence of a benign turn. Having no risk
+# cue is not: anything else goes to the safety LLM. Deliberately no "yes" or
+# "no", which can answer a safety question.
+BENIGN_ACKNOWLEDGEMENTS = frozenset({
+    "ok", "okay", "ok thanks", "okay thanks", "ok thank you", "okay thank you",
+    "thanks", "thank you", "thanks a lot", "thank you so much", "thanks so much", "many thanks",
+    "got it", "sounds good", "that sounds good", "will do", "i will try that", "i'll try that",
+    "cool", "great", "nice", "perfect", "makes sense", "that makes sense", "that helps",
+    "hi", "hello", "hey", "good morning", "good afternoon", "good evening",
+})
+_NOT_WORD = re.compile(r"[^\w\s']+")
+
+_risk_matcher = CrisisMatcher({"risk": list(RISK_SIGNALS)})
+_risk_weights = {
+    " ".join(phrase.lower().split()): weight for phrase, weight in RISK_SIGNALS.items()
+}
+
+
+class SafetyTier(str, Enum):
+    ESCALATE = "escalate"  # Hard keyword hit: crisis protocol, no model call
+    PASS = "pass"          # Allowlisted acknowledgement: skip the safety LLM
+    REVIEW = "review"      # Default: ask the Safety Guardian
+
+
+class CascadeResult(NamedTuple):
+    tier: SafetyTier
+    score: float
+    matches: List[CrisisMatch]
+    resources: Optional[Dict[str, Any]] = None
+
+
+def is_acknowledgement(user_input: str) -> bool:
+    """True if the whole message, ignoring case and punctuation, is in BENIGN_ACKNOWLEDGEMENTS."""
+    if len(user_input) > 40:
+        return False
+    return " ".join(_NOT_WORD.sub(" ", user_input.lower().replace("\u2019", "'")).split()) in BENIGN_ACKNOWLEDGEMENTS
+
+
+def score_risk(user_input: str) -> float:
+    """
+    Cheap local risk score in [0, 1], combining matched soft cues as a noisy-or.
+    """
+    remaining = 1.0
+    for match in _risk_matcher.scan(user_input):
+        remaining *= 1.0 - _risk_weights.get(match.phrase, 0.0)
+    return round(1.0 - remaining, 4)
+
+
+def assess(user_input: str, location: Optional[str] = None) -> CascadeResult:
+    """
+    Runs the deterministic tiers of the safety gate.
+
+    Returns ESCALATE (with crisis resources already looked up) on a keyword hit,
+    PASS only for an allowlisted acknowledgement, and REVIEW, which needs the
+    Safety Guardian, for everything else.
+    """
+    matches = scan_for_crisis(user_input)
+    if matches:
+        resources = lookup_crisis_resources(location or settings.DEFAULT_LOCATION)
+        return CascadeResult(SafetyTier.ESCALATE, 1.0, matches, resources)
+
+    score = score_risk(user_input)
+    if score == 0.0 and is_acknowledgement(user_input):
+        return CascadeResult(SafetyTier.PASS, score, [])
+    # No cue is not evidence of safety ("I bought a rope today"): the model decides
+    return CascadeResult(SafetyTier.REVIEW, score, [])
@@ -0,0 +1,216 @@
+"""
+core/safety_guard.py
+Deterministic crisis phrase matching (Layer 0 circuit breaker).
+The lexicon comes from settings.CRISIS_TRIGGER_KEYWORDS and is compiled once.
+"""
+import re
+import unicodedata
+from bisect import bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from config.settings import settings
+
+# Batch scans join messages with a character that is neither a word nor a space
+# character, so no phrase can match across two messages.
+_BATCH_SEPARATOR = "\x00"
+
+
+class CrisisMatch(NamedTuple):
+    phrase: str
+    language: str
+    start: int
+    end: int
+
+
+def _normalize_phrase(phrase: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", phrase).lower().split())
+
+
+def _is_word_char(char: str) -> bool:
+    # Letters, digits and combining marks (e.g. Devanagari vowel signs) all
+    # belong to a word; `\b` alone would split words at combining marks.
+    return char == "_" or unicodedata.category(char)[0] in "LNM"
+
+
+# Combining marks used across scripts; marks of a phrase's own script are
+# added per lexicon (see _word_end)
+_GENERIC_MARK_BLOCKS = ((0x0300, 0x036F), (0x1AB0, 0x1AFF), (0x1DC0, 0x1DFF), (0x20D0, 0x20FF), (0xFE20, 0xFE2F))
+
+
+def _word_end(phrases: Iterable[str]) -> str:
+    """
+    Negative lookahead that holds where a word ends: no letter, digit,
+    underscore or combining mark follows. Python's `\w` has no combining
+    marks, so those of each 128-code-point block the lexicon uses (which
+    covers an Indic script's vowel signs) are listed explicitly.
+
+    It follows the whole trie inside the pattern, so when the longest
+    phrase at a position runs into more of a word ("suicide notes") the
+    regex backtracks to a shorter one ("suicide").
+    """
+    blocks = set(_GENERIC_MARK_BLOCKS)
+    for char in {char for phrase in phrases for char in phrase if not char.isascii()}:
+        start = ord(char) & ~0x7F
+        blocks.add((start, start + 0x7F))
+    marks = [
+        code for first, last in sorted(blocks) for code in range(first, last + 1)
+        if unicodedata.category(chr(code))[0] == "M" and not chr(code).isalnum()
+    ]
+    ranges: List[List[int]] = []
+    for code in marks:
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    spans = "".join(
+        re.escape(chr(first)) if first == last else f"{re.escape(chr(first))}-{re.escape(chr(last))}"
+        for first, last in ranges
+    )
+    return r"(?![\w" + spans + "])"
+
+
+def _compile_trie(phrases: Iterable[str]) -> str:
+    """
+    Builds a single regex alternation shaped as a prefix trie, so the regex
+    engine only follows branches that share the characters already read.
+    """
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict[str, dict]) -> str:
+        terminal = "" in node
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + render(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Greedy optional group: prefer the longest phrase at a position.
+            return "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+class CrisisMatcher:
+    """
+    Single-pass matcher over the whole crisis lexicon.
+
+    All phrases are compiled once into one trie-shaped regex, so each message is
+    scanned exactly once regardless of how many phrases the lexicon holds.
+    """
+
+    def __init__(self, lexicon: Dict[str, Iterable[str]]):
+        self._languages: Dict[str, str] = {}
+        for language, phrases in lexicon.items():
+            for phrase in phrases:
+                normalized = _normalize_phrase(phrase)
+                if normalized:
+                    self._languages.setdefault(normalized, language)
+        if not self._languages:
+            raise ValueError("Crisis lexicon must contain at least one phrase.")
+        # The leading character class rejects most positions before the
+        # alternation is tried at all.
+        first_chars = "".join(sorted({re.escape(phrase[0]) for phrase in self._languages}))
+        self._pattern = re.compile(
+            r"(?<!\w)(?=[" + first_chars + "])(?:" + _compile_trie(self._languages) + ")" + _word_end(self._languages),
+            re.IGNORECASE,
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self._languages)
+
+    def _accept(self, text: str, match: "re.Match[str]") -> bool:
+        # The pattern checks where the phrase ends. `(?<!\w)` does not see a
+        # combining mark before the start, so that is checked here; any
+        # shorter phrase would start at the same place, so none is lost.
+        start = match.start()
+        return not (start > 0 and _is_word_char(text[start - 1]))
+
+    def _to_match(self, match: "re.Match[str]", offset: int = 0) -> CrisisMatch:
+        phrase = _normalize_phrase(match.group())
+        return CrisisMatch(
+            phrase=phrase,
+            language=self._languages.get(phrase, "und"),
+            start=match.start() - offset,
+            end=match.end() - offset,
+        )
+
+    def scan(self, text: str) -> List[CrisisMatch]:
+        """
+        Returns every lexicon phrase found in `text` with its character span.
+        Spans index the NFC-normalized text (identical for ASCII input).
+        """
+        if not text.isascii():
+            text = unicodedata.normalize("NFC", text)
+        return [
+            self._to_match(match)
+            for match in self._pattern.finditer(text)
+            if self._accept(text, match)
+        ]
+
+    def contains(self, text: str) -> bool:
+        """Fast path: stops at the first accepted match."""
+        if not text.isascii():
+            text = unicodedata.normalize("NFC", text)
+        return any(self._accept(text, match) for match in self._pattern.finditer(text))
+
+    def scan_batch(self, texts: Sequence[str]) -> List[List[CrisisMatch]]:
+        """
+        Scans many messages in one regex pass and maps matches back to each
+        message. Spans are relative to the individual message.
+        """
+        normalized = [
+            text if text.isascii() else unicodedata.normalize("NFC", text)
+            for text in texts
+        ]
+        results: List[List[CrisisMatch]] = [[] for _ in normalized]
+        if not normalized:
+            return results
+
+        starts = []
+        position = 0
+        for text in normalized:
+            starts.append(position)
+            position += len(text) + len(_BATCH_SEPARATOR)
+        joined = _BATCH_SEPARATOR.join(normalized)
+
+        for match in self._pattern.finditer(joined):
+            if not self._accept(joined, match):
+                continue
+            index = bisect_right(starts, match.start()) - 1
+            results[index].append(self._to_match(match, offset=starts[index]))
+        return results
+
+
+_matcher: Optional[CrisisMatcher] = None
+
+
+def _default_matcher() -> CrisisMatcher:
+    # Compiled on first use, so importing this module does not read settings
+    global _matcher
+    if _matcher is None:
+        _matcher = CrisisMatcher({"default": settings.CRISIS_TRIGGER_KEYWORDS})
+    return _matcher
+
+
+def scan_for_crisis(user_input: str) -> List[CrisisMatch]:
+    """
+    Returns the crisis phrases found in the input and where they occur.
+    """
+    return _default_matcher().scan(user_input)
+
+
+def contains_crisis_keyword(user_input: str) -> bool:
+    """
+    Returns True if any configured crisis phrase appears in the input.
+    """
+    return _default_matcher().contains(user_input)
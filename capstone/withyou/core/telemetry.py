@@ -2,29 +2,108 @@
 Structured logging for clinical audit.
 Handles tracing of conversation flows and risk detection events.
 """
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+from typing import Optional
+
+from config.settings import settings
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _SheddingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded queue without ever blocking the caller.
+    When the queue is full, records below WARNING are dropped (and counted);
+    WARNING and above (crisis triggers, audit events) evict the oldest queued
+    record instead, so they are never lost to a flood of routine logs.
+    """
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.WARNING:
+                self.dropped += 1
+                return
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+
 
 def setup_telemetry():
     """
     Configures structured logging for Clinical Auditing.
     Format: [TIMESTAMP] [LEVEL] [LOGGER] - MESSAGE
+
+    Log calls only enqueue the record; a background listener thread formats
+    it and writes to stdout and a size-rotated file. Trace spans (the
+    `clinical_trace` logger) go to their own JSON-lines file instead. Safe to
+    call more than once: later calls reuse the existing pipeline instead of
+    adding handlers.
     """
+    global _listener
+
+    audit_logger = logging.getLogger("clinical_audit")
+    if _listener is not None:
+        return audit_logger
+
     formatter = logging.Formatter(
         fmt="[%(asctime)s] [%(levelname)s] [%(name)s] - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S"
     )
-    
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(formatter)
-    
+
+    def is_trace(record: logging.LogRecord) -> bool:
+        return record.name == "clinical_trace"
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(formatter)
+    console.addFilter(lambda record: not is_trace(record))
+    os.makedirs(settings.TELEMETRY_DIR, exist_ok=True)
+    rotating_file = logging.handlers.RotatingFileHandler(
+        os.path.join(settings.TELEMETRY_DIR, "clinical_audit.log"),
+        maxBytes=settings.TELEMETRY_MAX_BYTES,
+        backupCount=settings.TELEMETRY_BACKUPS,
+        encoding="utf-8",
+    )
+    rotating_file.setFormatter(formatter)
+    rotating_file.addFilter(lambda record: not is_trace(record))
+    trace_file = logging.handlers.RotatingFileHandler(
+        os.path.join(settings.TELEMETRY_DIR, "traces.jsonl"),
+        maxBytes=settings.TELEMETRY_MAX_BYTES,
+        backupCount=settings.TELEMETRY_BACKUPS,
+        encoding="utf-8",
+    )
+    trace_file.setFormatter(logging.Formatter("%(message)s"))
+    trace_file.addFilter(is_trace)
+
+    record_queue: queue.Queue = queue.Queue(maxsize=settings.TELEMETRY_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(
+        record_queue, console, rotating_file, trace_file, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+
     # Root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(handler)
-    
+    root_logger.addHandler(_SheddingQueueHandler(record_queue))
+
     # Specific clinical logger
-    audit_logger = logging.getLogger("clinical_audit")
     audit_logger.setLevel(logging.INFO)
-    
-    return audit_logger
\ No newline at end of file
+
+    return audit_logger
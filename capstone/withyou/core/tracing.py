@@ -0,0 +1,323 @@
+"""
+core/tracing.py
+Per-turn latency tracing: spans linked by a turn id, local histograms and a
+Prometheus text endpoint. Spans are written to the `clinical_trace` logger,
+which setup_telemetry() sends to its own file.
+"""
+import contextvars
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Bucket upper bounds in seconds: 1 ms to ~4.5 min, each sqrt(2) times the last
+BUCKETS: Tuple[float, ...] = tuple(0.001 * math.sqrt(2) ** i for i in range(37))
+QUANTILES = (0.5, 0.95, 0.99)
+
+# google-genai retries failed model calls itself (RETRY_CONFIG) and logs each
+# retry on this logger just before it sleeps; that is the only signal it gives.
+_GENAI_LOGGER = "google_genai._api_client"
+
+
+class Histogram:
+    """Fixed log-spaced buckets; quantiles are interpolated within a bucket."""
+
+    __slots__ = ("counts", "total", "count", "maximum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last slot: above the largest bound
+        self.total = 0.0
+        self.count = 0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.maximum = max(self.maximum, seconds)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                low = BUCKETS[index - 1] if index else 0.0
+                high = BUCKETS[index] if index < len(BUCKETS) else self.maximum
+                return min(low + (high - low) * (rank - seen) / bucket_count, self.maximum)
+            seen += bucket_count
+        return self.maximum
+
+
+class Span:
+    __slots__ = ("stage", "name", "turn_id", "span_id", "parent_id", "started_at", "_start", "attributes")
+
+    def __init__(self, stage: str, name: str, turn_id: Optional[str], parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.stage = stage
+        self.name = name
+        self.turn_id = turn_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.attributes = attributes
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+
+class TurnTrace:
+    """The root span of one turn, plus token and retry totals across its stages."""
+
+    def __init__(self, turn_id: str, attributes: Dict[str, Any]):
+        self.root = Span("turn", "", turn_id, None, attributes)
+        self.turn_id = turn_id
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.retries = 0
+
+
+_turn: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar("withyou_turn", default=None)
+# The model call in flight on this task, so retries logged by google-genai land on it
+_model_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("withyou_model_span", default=None)
+
+
+class Tracer:
+    """
+    Spans for the stages of a turn (safety gate, safety LLM, triage,
+    AgentTool specialist calls, tools, individual model calls), all carrying
+    the turn id. Finished spans go to a histogram per (stage, name) and to
+    `sink` as dicts; `prometheus_text()` renders the histograms with p50,
+    p95 and p99 plus token and retry counters. Everything stays in process:
+    no collector is needed.
+
+    The current turn travels in a context variable, so ADK callbacks, the
+    speculative triage task and AgentTool sub-runners all find it without
+    any arguments being threaded through.
+    """
+
+    def __init__(self, sink: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._tokens: Dict[Tuple[str, str], int] = {}   # (agent, prompt|output) -> count
+        self._retries: Dict[str, int] = {}               # agent -> count
+        self.turns = 0
+
+    def reset(self):
+        """Drops all recorded histograms and counters (e.g. after a warm-up)."""
+        with self._lock:
+            self._histograms.clear()
+            self._tokens.clear()
+            self._retries.clear()
+            self.turns = 0
+
+    # --- Turns ------------------------------------------------------------------
+
+    def start_turn(self, **attributes) -> TurnTrace:
+        turn = TurnTrace(uuid.uuid4().hex[:16], attributes)
+        _turn.set(turn)
+        return turn
+
+    def label_turn(self, name: str, **attributes):
+        """
+        Names the current turn's root span (its histogram becomes
+        "turn/<name>", e.g. per model tier) and adds attributes to it.
+        """
+        turn = _turn.get()
+        if turn is not None:
+            turn.root.name = name
+            turn.root.attributes.update(attributes)
+
+    def end_turn(self, turn: TurnTrace, **attributes):
+        turn.root.attributes.update(
+            attributes, prompt_tokens=turn.prompt_tokens, output_tokens=turn.output_tokens, retries=turn.retries,
+        )
+        self._finish(turn.root)
+        self.turns += 1
+        if _turn.get() is turn:
+            _turn.set(None)
+
+    # --- Spans ------------------------------------------------------------------
+
+    def start_span(self, stage: str, name: str = "", **attributes) -> Span:
+        turn = _turn.get()
+        if turn is None:
+            return Span(stage, name, None, None, attributes)
+        return Span(stage, name, turn.turn_id, turn.root.span_id, attributes)
+
+    def end_span(self, span: Span, **attributes):
+        span.attributes.update(attributes)
+        self._finish(span)
+
+    @contextmanager
+    def span(self, stage: str, name: str = "", **attributes) -> Iterator[Span]:
+        span = self.start_span(stage, name, **attributes)
+        try:
+            yield span
+        except BaseException as error:
+            span.attributes["error"] = type(error).__name__
+            raise
+        finally:
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        seconds = span.elapsed()
+        with self._lock:
+            histogram = self._histograms.get((span.stage, span.name))
+            if histogram is None:
+                histogram = self._histograms[(span.stage, span.name)] = Histogram()
+            histogram.observe(seconds)
+        if self.sink is not None:
+            self.sink({
+                "turn_id": span.turn_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "stage": span.stage,
+                "name": span.name,
+                "start": round(span.started_at, 6),
+                "ms": round(seconds * 1000, 2),
+                **span.attributes,
+            })
+
+    # --- Model calls ----------------------------------------------------------------
+
+    def add_tokens(self, agent: str, prompt: int, output: int):
+        turn = _turn.get()
+        if turn is not None:
+            turn.prompt_tokens += prompt
+            turn.output_tokens += output
+        with self._lock:
+            self._tokens[(agent, "prompt")] = self._tokens.get((agent, "prompt"), 0) + prompt
+            self._tokens[(agent, "output")] = self._tokens.get((agent, "output"), 0) + output
+
+    def bind_model_span(self, span: Optional[Span]):
+        """Marks `span` as the model call in flight on this task (None when it ends)."""
+        _model_span.set(span)
+
+    def add_retry(self):
+        span = _model_span.get()
+        agent = span.name if span is not None else "unknown"
+        if span is not None:
+            span.attributes["retries"] = span.attributes.get("retries", 0) + 1
+        turn = _turn.get()
+        if turn is not None:
+            turn.retries += 1
+        with self._lock:
+            self._retries[agent] = self._retries.get(agent, 0) + 1
+
+    # --- Export ---------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """{"stage/name": {"count", "p50", "p95", "p99", "max"}} in milliseconds."""
+        with self._lock:
+            items = list(self._histograms.items())
+        report = {}
+        for (stage, name), histogram in sorted(items):
+            row = {"count": histogram.count}
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}"] = round(histogram.quantile(q) * 1000, 2)
+            row["max"] = round(histogram.maximum * 1000, 2)
+            report[f"{stage}/{name}" if name else stage] = row
+        return report
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            histograms = [(key, list(h.counts), h.total, h.count, h) for key, h in histograms]
+            tokens = sorted(self._tokens.items())
+            retries = sorted(self._retries.items())
+
+        lines: List[str] = [
+            "# HELP withyou_stage_seconds Wall time of each turn stage.",
+            "# TYPE withyou_stage_seconds histogram",
+        ]
+        for (stage, name), counts, total, count, _ in histograms:
+            labels = f'stage="{stage}",name="{_escape(name)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'withyou_stage_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'withyou_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"withyou_stage_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"withyou_stage_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP withyou_stage_seconds_quantile Stage latency quantiles estimated from the histogram.",
+            "# TYPE withyou_stage_seconds_quantile gauge",
+        ]
+        for (stage, name), _, _, _, histogram in histograms:
+            labels = f'stage="{stage}",name="{_escape(name)}"'
+            for q in QUANTILES:
+                lines.append(f'withyou_stage_seconds_quantile{{{labels},quantile="{q}"}} {histogram.quantile(q):.6f}')
+
+        lines += [
+            "# HELP withyou_llm_tokens_total Model tokens by agent and direction.",
+            "# TYPE withyou_llm_tokens_total counter",
+        ]
+        for (agent, kind), value in tokens:
+            lines.append(f'withyou_llm_tokens_total{{agent="{_escape(agent)}",kind="{kind}"}} {value}')
+        lines += [
+            "# HELP withyou_llm_retries_total Model call retries (RETRY_CONFIG) by agent.",
+            "# TYPE withyou_llm_retries_total counter",
+        ]
+        for agent, value in retries:
+            lines.append(f'withyou_llm_retries_total{{agent="{_escape(agent)}"}} {value}')
+        lines += [
+            "# HELP withyou_turns_total Turns traced.",
+            "# TYPE withyou_turns_total counter",
+            f"withyou_turns_total {self.turns}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _RetryCounter(logging.Handler):
+    def __init__(self, tracer: Tracer):
+        super().__init__(logging.INFO)
+        self.tracer = tracer
+
+    def emit(self, record: logging.LogRecord):
+        if record.getMessage().startswith("Retrying"):
+            self.tracer.add_retry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        data = tracer.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not audit events
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves GET /metrics from a daemon thread, so it works beside the REPL."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+_trace_logger = logging.getLogger("clinical_trace")
+tracer = Tracer(sink=lambda record: _trace_logger.info(json.dumps(record, default=str)))
+
+_genai_logger = logging.getLogger(_GENAI_LOGGER)
+_genai_logger.setLevel(logging.INFO)
+_genai_logger.addHandler(_RetryCounter(tracer))
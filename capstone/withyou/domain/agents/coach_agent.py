@@ -3,13 +3,15 @@ Layer 2: CBT Specialist.
 Handles cognitive reframing and empathetic dialogue.
 """
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.genai import types
+from google.adk.tools import FunctionTool
+from domain.tools.mood_tools import get_mood_trend, log_user_mood
+from config.settings import settings
+from core.registry import registry
 
 def create_coach_agent() -> LlmAgent:
     return LlmAgent(
         name="cbt_coach",
-        model=Gemini(model="gemini-1.5-pro"),
+        model=registry.model(settings.REASONING_MODEL),
         description="Empathetic therapist focusing on cognitive reframing.",
         instruction="""
         You are a compassionate CBT (Cognitive Behavioral Therapy) Coach.
@@ -19,8 +21,14 @@ def create_coach_agent() -> LlmAgent:
         2. Validation: Always validate the user's emotion before offering a solution.
         3. Grounding: If anxiety is high, suggest 5-4-3-2-1 sensory exercises.
         
+        MOOD TRACKING:
+        - When the user describes how they feel, call `log_user_mood`.
+        - To see how they have been over time (e.g. "has this week been worse?"),
+          call `get_mood_trend` and reflect the trend back gently.
+        
         TONE:
         Warm, non-judgmental, patient. Use the user's name if known.
         Never diagnose. Always frame advice as "strategies to try."
-        """
+        """,
+        tools=[FunctionTool(log_user_mood), FunctionTool(get_mood_trend)]
     )
\ No newline at end of file
@@ -3,13 +3,13 @@ Layer 2: Behavioral Activation.
 Helps the user plan small, actionable steps.
 """
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from config.settings import settings
+from core.registry import registry
 
 def create_planner_agent() -> LlmAgent:
     return LlmAgent(
         name="behavioral_planner",
-        model=Gemini(model=settings.SAFETY_MODEL), # Flash is sufficient for scheduling
+        model=registry.model(settings.REASONING_MODEL), # Per turn, core/model_tiers may pick flash
         description="Helps users schedule small, manageable habits.",
         instruction="""
         You are a Behavioral Activation Planner.
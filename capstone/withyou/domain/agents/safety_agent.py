@@ -1,17 +1,14 @@
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.tools import FunctionTool
-from google.genai import types
 from domain.tools.crisis_tools import lookup_crisis_resources
 from config.settings import settings
-
-RETRY_CONFIG = types.HttpRetryOptions(attempts=3, exp_base=2)
+from core.registry import registry
 
 def create_safety_agent() -> LlmAgent:
     return LlmAgent(
         name="safety_guardian",
         # FIX: Use settings.SAFETY_MODEL instead of hardcoded string
-        model=Gemini(model=settings.SAFETY_MODEL, retry_options=RETRY_CONFIG),
+        model=registry.model(settings.SAFETY_MODEL),
         description="Primary safety interceptor for risk detection.",
         instruction="""
         You are the Safety Guardian for 'withyou'.
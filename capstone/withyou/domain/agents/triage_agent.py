@@ -3,18 +3,18 @@ Layer 1: The Orchestrator.
 Analyzes intent and routes the conversation to the appropriate specialist (Coach vs Planner).
 """
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.tools import AgentTool
 from .coach_agent import create_coach_agent
 from config.settings import settings # <--- IMPORT SETTINGS
+from core.registry import registry
 
 def create_triage_agent() -> LlmAgent:
-    coach = create_coach_agent()
+    coach = registry.agent("cbt_coach", create_coach_agent)
     
     return LlmAgent(
         name="triage_orchestrator",
         # FIX: Use settings.REASONING_MODEL
-        model=Gemini(model=settings.REASONING_MODEL),
+        model=registry.model(settings.REASONING_MODEL),
         description="Routes users to the correct mental health specialist.",
         instruction="""
         You are the Clinical Triage Router.
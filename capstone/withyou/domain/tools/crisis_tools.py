@@ -6,40 +6,39 @@ domain/tools/crisis_tools.py
 Clinical Safety Tools - Deterministic & Auditable.
 """
 import logging
-from typing import Dict
+from functools import lru_cache
+from typing import Any, Dict
+
+from config.settings import settings
+from core.crisis_registry import CrisisResourceRegistry
 
 # Configure clinical audit logging
 logger = logging.getLogger("clinical_audit")
 
-def lookup_crisis_resources(location: str = "global") -> Dict[str, str]:
+
+@lru_cache(maxsize=None)
+def get_crisis_registry() -> CrisisResourceRegistry:
+    # Loaded once (on first lookup) from settings.CRISIS_RESOURCES_PATH, the
+    # data file shared with withyou_system; edits are picked up without a restart.
+    return CrisisResourceRegistry(settings.CRISIS_RESOURCES_PATH, settings.CRISIS_RESOURCES_RELOAD_SECONDS)
+
+def lookup_crisis_resources(location: str = "global", urgency: str = "immediate") -> Dict[str, Any]:
     """
     Retrieves verified emergency contact numbers based on user location.
     
     Args:
-        location: User's ISO country code or 'global'.
+        location: User's location in any form: ISO code ("IN"), country
+            ("India", "Bharat") or city ("Mumbai"). Defaults to 'global'.
+        urgency: "immediate" (crisis lines) or "informational".
         
     Returns:
-        Dictionary containing verified hotline numbers.
+        Dictionary with the resolved country/region, a one-line `summary` of
+        hotlines, the individual `resources`, and the data file version.
     """
-    logger.warning(f"CRISIS_TOOL_TRIGGERED: Location {location}")
-    
-    # In production, this would query a validated medical database (e.g., SQL/Redis)
-    resources = {
-        "india": {
-            "name": "Vandrevala Foundation",
-            "phone": "1860-266-2345",
-            "service": "24/7 Mental Health Support"
-        },
-        "usa": {
-            "name": "National Suicide Prevention Lifeline",
-            "phone": "988",
-            "service": "24/7 Crisis Support"
-        },
-        "global": {
-            "name": "Befrienders Worldwide",
-            "url": "https://www.befrienders.org/",
-            "note": "Please visit the local emergency room immediately."
-        }
-    }
-    
-    return resources.get(location.lower(), resources["global"])
\ No newline at end of file
+    result = get_crisis_registry().lookup(location, urgency)
+    logger.warning(
+        f"CRISIS_TOOL_TRIGGERED: Location {location} -> {result.country}/{result.region} "
+        f"(resources v{result.version})"
+    )
+    # Unknown locations fall back to global resources, never a guessed country.
+    return result.as_dict()
@@ -7,11 +7,19 @@ domain/tools/mood_tools.py
 Tools for tracking emotional state over time.
 """
 import logging
-from typing import Dict
+from typing import Any, Dict
+
+from google.adk.tools import ToolContext
+
+from config.settings import settings
+from core.mood_store import MoodStore
 
 logger = logging.getLogger("clinical_audit")
 
-def log_user_mood(valence: int, emotion: str, notes: str) -> str:
+# Per-user memory-mapped columns (timestamp, valence, emotion code + running totals)
+mood_store = MoodStore(settings.MOOD_STORE_DIR)
+
+def log_user_mood(valence: int, emotion: str, notes: str, tool_context: ToolContext) -> str:
     """
     Logs a user's current mood into the secure health record.
     
@@ -27,8 +35,23 @@ def log_user_mood(valence: int, emotion: str, notes: str) -> str:
     if not (1 <= valence <= 5):
         return "Error: Valence must be between 1 and 5."
         
-    # In production, this writes to an encrypted SQL/NoSQL store
-    logger.info(f"MOOD_LOG: Valence={valence} | Emotion={emotion} | Notes={notes}")
+    # Notes stay in the audit log only; the store keeps the numeric series.
+    entries = mood_store.append(tool_context.user_id, valence, emotion)
+    logger.info(f"MOOD_LOG: Valence={valence} | Emotion={emotion} | Notes={notes} | Entries={entries}")
     
     # Return a natural language confirmation for the Agent to use
-    return f"Successfully logged mood: {emotion} ({valence}/5). Pattern analysis updated."
\ No newline at end of file
+    return f"Successfully logged mood: {emotion} ({valence}/5). Pattern analysis updated."
+
+def get_mood_trend(days: int, tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Summarizes the user's logged moods over the last `days` days.
+
+    Args:
+        days: Size of the look-back window in days (e.g., 7, 30).
+
+    Returns:
+        Trend ('improving', 'stable', 'deteriorating' or 'insufficient_data'),
+        average valence, change per day, dominant emotion and entry count.
+    """
+    window = mood_store.window(tool_context.user_id, days)
+    return window._asdict()
@@ -3,43 +3,40 @@ The Application Entry Point (Runner).
 """
 import asyncio
 import os
+import time
 from dotenv import load_dotenv 
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai import types
 
 from config.settings import settings
+from core.escalations import get_escalation_outbox
+from core.exceptions import CrisisDetectedException
+from core.model_tiers import set_turn_tier, tier_policy
+from core.registry import registry
+from core.safety_cascade import SafetyTier, assess
 from core.telemetry import setup_telemetry
-
-from domain.agents.safety_agent import create_safety_agent
-from domain.agents.triage_agent import create_triage_agent
+from core.tracing import start_metrics_server, tracer
 
 # Load environment variables
 load_dotenv()
 
+# Agents, the ADK and google-genai load on first use (see main() and
+# _handle_turn), and settings are read on first access, so importing this
+# module stays cheap.
+
 async def main():
-    setup_telemetry()
+    audit_logger = setup_telemetry()
     
     print(f"--- 'withyou' Clinical Agent System Initializing [Env: {settings.ENV}] ---")
+    if settings.METRICS_PORT:
+        start_metrics_server(settings.METRICS_PORT)
+        print(f"[System]: metrics at http://127.0.0.1:{settings.METRICS_PORT}/metrics")
     
-    # 1. Initialize Services
-    session_service = InMemorySessionService()
-    
-    # 2. Initialize Agents
-    safety_guardian = create_safety_agent()
-    triage_brain = create_triage_agent()
-    
-    # 3. Create Runners
-    safety_runner = Runner(
-        agent=safety_guardian,
-        app_name=settings.APP_NAME, 
-        session_service=session_service
-    )
-    triage_runner = Runner(
-        agent=triage_brain,
-        app_name=settings.APP_NAME, 
-        session_service=session_service
-    )
+    # 1. Initialize Services, Agents and Runners (built once, shared process-wide)
+    from domain.agents.safety_agent import create_safety_agent
+    from domain.agents.triage_agent import create_triage_agent
+
+    session_service = registry.session_service
+    safety_runner = registry.runner("safety_guardian", create_safety_agent)
+    triage_runner = registry.runner("triage_orchestrator", create_triage_agent)
     
     # --- SESSION CONTEXT SETUP ---
     session_id = "session_user_001"
@@ -66,38 +63,104 @@ async def main():
         if user_input.lower() in ["exit", "quit"]:
             break
             
-        # --- LAYER 0: SAFETY INTERCEPTION ---
-        is_safe = False
+        turn = tracer.start_turn(user_id=user_id, session_id=session_id)
+        try:
+            await _handle_turn(user_input, user_id, session_id, safety_session_id, safety_runner, triage_runner, audit_logger)
+        except CrisisDetectedException as crisis:
+            await _escalate(crisis, user_input, user_id, session_id, audit_logger)
+        finally:
+            tracer.end_turn(turn)
+
+
+async def _escalate(crisis, user_input, user_id, session_id, audit_logger):
+    """
+    Shows the crisis reply and opens (or adds to) the session's human-review
+    case. Recording syncs the case to the outbox log (on a worker thread,
+    off the event loop) and queues the SQLite write, so the case is durable
+    before the reply is shown; the turn then waits for the group commit
+    before the next prompt.
+    """
+    recorded = await asyncio.to_thread(
+        get_escalation_outbox().record, user_id, session_id, crisis.source, crisis.risk, user_input
+    )
+    print(f"\n[withyou 🛡️]: {crisis.message}")
+    audit_logger.warning(f"CRISIS: source={crisis.source} user={user_id} session={session_id}")
+    done, _ = await asyncio.wait({asyncio.wrap_future(recorded)}, timeout=settings.ESCALATION_COMMIT_WAIT_SECONDS)
+    if not done:
+        audit_logger.error(f"ESCALATION_COMMIT_SLOW: session={session_id}")
+
+
+async def _handle_turn(user_input, user_id, session_id, safety_session_id, safety_runner, triage_runner, audit_logger):
+    """One turn; each layer is a span of the current trace."""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+
+    # --- LAYER 0: SAFETY INTERCEPTION ---
+    print(f"\n[System]: Running Safety Scan...")
+    with tracer.span("safety_gate") as span:
+        verdict = assess(user_input)
+        span.attributes["tier"] = verdict.tier.value
+
+    if verdict.tier is SafetyTier.ESCALATE:
+        # Keyword hit: crisis protocol straight from the resource table, no model call.
+        raise CrisisDetectedException(
+            f"I'm really concerned about your safety. Please reach out now: {verdict.resources['summary']}.",
+            source="safety_cascade",
+        )
+
+    is_safe = verdict.tier is SafetyTier.PASS
+    if verdict.tier is SafetyTier.REVIEW:
         safety_content = types.Content(role="user", parts=[types.Part(text=user_input)])
-        
-        print(f"\n[System]: Running Safety Scan...")
-        
-        async for event in safety_runner.run_async(
-            user_id=user_id,
-            session_id=safety_session_id, 
-            new_message=safety_content
-        ):
-            if event.is_final_response():
-                response_text = event.content.parts[0].text.strip()
-                if "SAFE" in response_text:
-                    is_safe = True
-                else:
-                    print(f"\n[withyou 🛡️]: {response_text}")
-        
-        if not is_safe:
-            continue
+        with tracer.span("safety_llm", "safety_guardian"):
+            async for event in safety_runner.run_async(
+                user_id=user_id,
+                session_id=safety_session_id, 
+                new_message=safety_content
+            ):
+                if event.is_final_response():
+                    response_text = event.content.parts[0].text.strip()
+                    if "SAFE" in response_text:
+                        is_safe = True
+                    else:
+                        raise CrisisDetectedException(response_text, source="safety_guardian")
+    
+    if not is_safe:
+        return
 
-        # --- LAYER 1: CLINICAL TRIAGE ---
-        print(f"[System]: Safety Pass. Routing to Triage...")
-        triage_content = types.Content(role="user", parts=[types.Part(text=user_input)])
-        
+    # --- LAYER 1: CLINICAL TRIAGE ---
+    print(f"[System]: Safety Pass. Routing to Triage...")
+    # Flash or pro for the specialist this turn
+    tier = tier_policy.choose(user_input, verdict.score)
+    set_turn_tier(tier)
+    tracer.label_turn(tier.tier, model=tier.model, tier_reason=tier.reason)
+    audit_logger.info(f"TIER: tier={tier.tier} model={tier.model} reason={tier.reason}")
+    triage_content = types.Content(role="user", parts=[types.Part(text=user_input)])
+    
+    # Stream partial text as it is generated; the safety verdict is already known here.
+    started = time.perf_counter()
+    streamed = False
+    print("\n[withyou]: ", end="", flush=True)
+    with tracer.span("triage", "triage_orchestrator") as span:
         async for event in triage_runner.run_async(
             user_id=user_id,
             session_id=session_id, 
-            new_message=triage_content
+            new_message=triage_content,
+            # Partial text events are emitted as the model generates them
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE)
         ):
-            if event.is_final_response():
-                print(f"\n[withyou]: {event.content.parts[0].text}\n")
+            if not event.content or not event.content.parts or not event.content.parts[0].text:
+                continue
+            if event.partial:
+                if not streamed:
+                    streamed = True
+                    span.attributes["ttft_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                    audit_logger.info(f"TTFT: agent={event.author} ms={(time.perf_counter() - started) * 1000:.1f}")
+                print(event.content.parts[0].text, end="", flush=True)
+            elif event.is_final_response() and not streamed:
+                span.attributes["ttft_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                audit_logger.info(f"TTFT: agent={event.author} ms={(time.perf_counter() - started) * 1000:.1f}")
+                print(event.content.parts[0].text, end="", flush=True)
+    print("\n")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
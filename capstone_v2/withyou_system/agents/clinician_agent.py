@@ -1,21 +1,25 @@
 # Summarization specialist
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from config.settings import MODEL_NAME, RETRY_CONFIG
+from config.settings import MODEL_NAME
+from core.redaction import redact_llm_request
+from core.registry import get_model
 
 # Note: No tools needed, this is a pure reasoning/summarization engine.
 clinician_agent = LlmAgent(
-    model=Gemini(model=MODEL_NAME, retry_options=RETRY_CONFIG),
+    model=get_model(MODEL_NAME),
     name="clinician_bridge",
     description="Generates PII-redacted summaries for human therapists.",
     instruction="""
     You are a Medical Scribe designed for clinical handoff.
     
-    Input: Raw conversation logs from Coach or Planner agents.
+    Input: Conversation logs from Coach or Planner agents, already de-identified:
+    names, places, dates, phone numbers, emails and ID numbers appear as
+    placeholders such as [NAME_1] or [PHONE_1].
     Output: A standard clinical note (SOAP note format preferred).
     
     Strict Rules:
-    1. REDACT ALL PII (Names, Locations, Specific dates).
+    1. Keep placeholders exactly as written; never guess what they stand for.
+       If any PII is still present (Names, Locations, Specific dates), redact it.
     2. Focus on: Presenting problem, interventions used, and user response.
     3. Flag any 'Risk Factors' clearly at the top.
     
@@ -23,5 +27,6 @@ clinician_agent = LlmAgent(
     [RISK LEVEL]: Low/Med/High
     [THEMES]: ...
     [INTERVENTIONS]: ...
-    """
+    """,
+    before_model_callback=redact_llm_request,
 )
\ No newline at end of file
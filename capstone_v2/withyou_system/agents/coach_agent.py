@@ -1,12 +1,12 @@
 # CBT/Empathy specialist
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from config.settings import MODEL_NAME, RETRY_CONFIG
-from tools.clinical_tools import symptom_checker
+from config.settings import MODEL_NAME
+from core.registry import get_model
+from tools.clinical_tools import log_mood, mood_trend_analyzer, record_questionnaire, symptom_checker
 from google.adk.tools import load_memory
 
 coach_agent = LlmAgent(
-    model=Gemini(model=MODEL_NAME, retry_options=RETRY_CONFIG),
+    model=get_model(MODEL_NAME),
     name="cbt_coach",
     description="Provides empathetic support, CBT framing, and grounding exercises.",
     instruction="""
@@ -22,8 +22,12 @@ coach_agent = LlmAgent(
     
     Tools:
     - Use `symptom_checker` if the user describes physical manifestations of stress.
+      It pre-fills PHQ-9/GAD-7 items from their words; if they agree to finish the
+      questionnaire, ask only the remaining items and use `record_questionnaire`.
+    - Use `log_mood` when the user shares how they feel on a 1-5 scale, and
+      `mood_trend_analyzer` to see how their mood has moved over recent days.
     
     Voice: Warm, calm, culturally aware (respectful of global/Indian context).
     """,
-    tools=[symptom_checker, load_memory]
+    tools=[symptom_checker, record_questionnaire, log_mood, mood_trend_analyzer, load_memory]
 )
\ No newline at end of file
@@ -1,11 +1,11 @@
 # Behavioral activation specialist
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from config.settings import MODEL_NAME, RETRY_CONFIG
+from config.settings import MODEL_NAME
+from core.registry import get_model
 from tools.scheduling_tools import schedule_routine
 
 planner_agent = LlmAgent(
-    model=Gemini(model=MODEL_NAME, retry_options=RETRY_CONFIG),
+    model=get_model(MODEL_NAME),
     name="behavioral_planner",
     description="Helps users build healthy routines and sleep hygiene.",
     instruction="""
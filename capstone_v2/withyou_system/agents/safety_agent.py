@@ -1,11 +1,12 @@
 # The Sentinel
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from config.settings import MODEL_NAME, RETRY_CONFIG, SAFETY_SETTINGS
+from google.genai import types
+from config.settings import MODEL_NAME, SAFETY_SETTINGS
+from core.registry import get_model
 from tools.crisis_tools import resource_lookup
 
 safety_agent = LlmAgent(
-    model=Gemini(model=MODEL_NAME, retry_options=RETRY_CONFIG),
+    model=get_model(MODEL_NAME),
     name="safety_sentinel",
     description="Monitors conversation for self-harm, violence, or emergency signals.",
     instruction="""
@@ -24,5 +25,5 @@ safety_agent = LlmAgent(
     Do not engage in therapy. Do not ask follow-up questions. Assess risk only.
     """,
     tools=[resource_lookup],
-    safety_settings=SAFETY_SETTINGS
+    generate_content_config=types.GenerateContentConfig(safety_settings=SAFETY_SETTINGS)
 )
\ No newline at end of file
@@ -1,13 +1,14 @@
 # The Router
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.tools import AgentTool
-from config.settings import ROUTING_MODEL, RETRY_CONFIG
+from config.settings import ROUTING_MODEL
+from core.registry import get_model
 from agents.coach_agent import coach_agent
-# Assuming planner_agent and clinician_agent are similarly defined and imported
+from agents.planner_agent import planner_agent
+from agents.clinician_agent import clinician_agent
 
 triage_agent = LlmAgent(
-    model=Gemini(model=ROUTING_MODEL, retry_options=RETRY_CONFIG),
+    model=get_model(ROUTING_MODEL),
     name="clinical_triage",
     description="Analyzes user intent and routes to the specific specialist.",
     instruction="""
@@ -16,11 +17,11 @@ triage_agent = LlmAgent(
     
     Routing Logic:
     1. Emotional Distress / Need to Talk -> Delegate to `cbt_coach`.
-    2. Routine / Sleep / Habits / Scheduling -> Delegate to `planner_agent`.
-    3. Request for Medical Summary / History -> Delegate to `clinician_agent`.
+    2. Routine / Sleep / Habits / Scheduling -> Delegate to `behavioral_planner`.
+    3. Request for Medical Summary / History -> Delegate to `clinician_bridge`.
     
     Analyze the input carefully. If the user mentions "feeling overwhelmed by schedule", that is likely a Planner task, not just a Coach task.
     """,
     # We wrap the specialists as tools for the router
-    tools=[AgentTool(coach_agent)] # Add Planner/Clinician here in full implementation
+    tools=[AgentTool(coach_agent), AgentTool(planner_agent), AgentTool(clinician_agent)]
 )
\ No newline at end of file
@@ -0,0 +1,164 @@
+# Benchmark: PHQ-9 scoring and change tracking, per-item Python loops vs vectorized, plus a two-upload import;
+# negated symptom mentions in free text
+# Run from withyou_system/: python -m benchmarks.bench_assessments [administrations]
+import csv
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from core.assessments import (
+    BASELINE, CHANGE_LABELS, GAD7, IMPROVED, INCOMPLETE, PHQ9, UNCHANGED, WORSENED, AssessmentStore, extract_items,
+    import_assessments, score, track_changes,
+)
+from tools.clinical_tools import symptom_checker
+
+ADMINISTRATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+USERS = ADMINISTRATIONS // 8
+LOOP_SAMPLE = 100_000   # The loop baseline is timed on a slice and scaled up
+
+
+# Text -> whether PHQ-9 item 9 (thoughts of self-harm) should be suggested
+_ITEM9_CASES = [
+    ("I'd never hurt myself, I'm just stressed", False),
+    ("I\u2019m not suicidal, just exhausted", False),
+    ("I don't want to die, I want this to stop hurting", False),
+    ("I want to die", True),
+    ("I'm not sure I won't hurt myself tonight", True),
+    ("I'm not sleeping and I want to die", True),
+    ("Nothing helps. I want to kill myself but I never would", True),
+]
+
+
+def _check_negation():
+    for text, expected in _ITEM9_CASES:
+        found = 8 in extract_items(text)["phq9"]
+        assert found == expected, f"{text!r}: item 9 suggested={found}, expected {expected}"
+        result = symptom_checker(text)
+        assert (result["severity_indicator"] == "urgent") == expected, (text, result)
+        if expected:
+            assert result["suggested_action"].startswith("Ask directly about safety"), result
+    print(f"negation: {len(_ITEM9_CASES)} item-9 cases ok")
+
+
+def _answers(rng: np.random.Generator, count: int, items: int) -> np.ndarray:
+    answers = rng.integers(0, 4, size=(count, items)).astype(np.float32)
+    answers[rng.random((count, items)) < 0.03] = np.nan
+    return answers
+
+
+def _loop_score(instrument, rows):
+    """What per-row scoring looks like without NumPy: one Python pass per item."""
+    totals, bands = [], []
+    count = len(instrument.items)
+    for row in rows:
+        answered = [value for value in row if not math.isnan(value)]
+        if len(answered) < count - instrument.max_missing:
+            totals.append(math.nan)
+            bands.append(INCOMPLETE)
+            continue
+        total = float(np.round(sum(answered) * count / len(answered)))
+        band = 0
+        for index, floor in enumerate(instrument.band_floors):
+            if total >= floor:
+                band = index
+        totals.append(total)
+        bands.append(band)
+    return totals, bands
+
+
+def _loop_changes(instrument, users, times, totals):
+    last = {}
+    status = [0] * len(users)
+    for i in sorted(range(len(users)), key=lambda i: (users[i], times[i])):
+        change = totals[i] - last.get(users[i], math.nan)
+        if math.isnan(change):
+            status[i] = BASELINE
+        elif change <= -instrument.reliable_change:
+            status[i] = IMPROVED
+        elif change >= instrument.reliable_change:
+            status[i] = WORSENED
+        else:
+            status[i] = UNCHANGED
+        if not math.isnan(totals[i]):
+            last[users[i]] = totals[i]
+    return status
+
+
+def _write_csv(path, users, times, keys, answers):
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["user_id", "administered_at", "instrument"] + [f"item_{i + 1}" for i in range(9)])
+        for user, when, key, row in zip(users, times, keys, answers.tolist()):
+            items = ["" if math.isnan(value) else int(value) for value in row]
+            writer.writerow([user, f"{when:.0f}", key] + items)
+
+
+def main():
+    _check_negation()
+    rng = np.random.default_rng(11)
+    answers = _answers(rng, ADMINISTRATIONS, len(PHQ9.items))
+    users = [f"user-{i}" for i in rng.integers(0, USERS, size=ADMINISTRATIONS)]
+    times = (1.7e9 + rng.random(ADMINISTRATIONS) * 3.0e7).tolist()
+
+    began = time.perf_counter()
+    scores = score(PHQ9, answers)
+    changes = track_changes(PHQ9, users, times, scores.totals)
+    vectorized = time.perf_counter() - began
+
+    sample = slice(0, LOOP_SAMPLE)
+    began = time.perf_counter()
+    loop_totals, loop_bands = _loop_score(PHQ9, answers[sample].tolist())
+    loop_status = _loop_changes(PHQ9, users[sample], times[sample], loop_totals)
+    looped = (time.perf_counter() - began) * ADMINISTRATIONS / LOOP_SAMPLE
+
+    print(f"{ADMINISTRATIONS} PHQ-9 administrations across {USERS} users")
+    print(f"{'scoring + change':<22} | {'seconds':>8} | {'per second':>12}")
+    print("-" * 48)
+    print(f"{'per-item loops (est.)':<22} | {looped:>8.1f} | {ADMINISTRATIONS / looped:>12.0f}")
+    print(f"{'vectorized':<22} | {vectorized:>8.2f} | {ADMINISTRATIONS / vectorized:>12.0f}")
+
+    np.testing.assert_array_equal(scores.totals[sample], np.array(loop_totals))
+    np.testing.assert_array_equal(scores.bands[sample], np.array(loop_bands))
+    sampled = track_changes(PHQ9, users[sample], times[sample], scores.totals[sample])
+    np.testing.assert_array_equal(sampled.status, np.array(loop_status))
+    incomplete = np.isnan(scores.totals)
+    assert (changes.status[~incomplete] == BASELINE).sum() <= len(set(users)), "more than one baseline per user"
+
+    # Two clinic uploads: the second one's first rows compare against the first upload
+    uploads = min(ADMINISTRATIONS, 200_000)
+    keys = np.where(rng.random(uploads) < 0.7, "PHQ-9", "GAD-7")
+    half = uploads // 2
+    ordered = np.argsort(np.asarray(times[:uploads]))
+    first, second = ordered[:half], ordered[half:]
+    with tempfile.TemporaryDirectory() as root:
+        store = AssessmentStore(os.path.join(root, "assessments.db"))
+        took, imported = [], {}
+        for part, rows in (("first", first), ("second", np.sort(second)[::-1])):
+            path = os.path.join(root, f"{part}.csv")
+            _write_csv(path, [users[i] for i in rows], [times[i] for i in rows], keys[rows], answers[rows])
+            began = time.perf_counter()
+            summary = import_assessments(path, store)
+            took.append(time.perf_counter() - began)
+            print(f"{part} upload: {len(rows)} rows in {took[-1]:.1f} s; PHQ-9 {summary['PHQ-9']['changes']}")
+            for name, counts in summary.items():
+                totals = imported.setdefault(name, dict.fromkeys(counts["changes"], 0))
+                for label, count in counts["changes"].items():
+                    totals[label] += count
+
+        # Expected: change tracked over the whole history at once, per instrument
+        for key, instrument in (("PHQ-9", PHQ9), ("GAD-7", GAD7)):
+            rows = np.flatnonzero(keys == key)
+            whole = track_changes(
+                instrument, [users[i] for i in rows], [times[i] for i in rows],
+                score(instrument, answers[rows, :len(instrument.items)]).totals,
+            )
+            expected = dict(zip(CHANGE_LABELS, np.bincount(whole.status, minlength=len(CHANGE_LABELS)).tolist()))
+            assert imported[instrument.name] == expected, f"{key}: {imported[instrument.name]} != {expected}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# Benchmark: bulk safety screening, one message per call vs packed prompts, long entries in segments, plus an interrupted run resumed
+# Run from withyou_system/: python -m benchmarks.bench_bulk_screen [messages]
+import os
+
+os.environ.setdefault("WITHYOU_FAKE_LLM", "1")
+os.environ.setdefault("WITHYOU_LOG_CONSOLE", "0")
+
+import asyncio
+import json
+import random
+import sys
+import tempfile
+from typing import Dict, List
+
+from google.genai import errors
+
+from config.settings import BULK_SCREEN_SEGMENT_OVERLAP, MODEL_NAME, ROUTER_TRAINING_PATH
+from core.bulk_screen import ESCALATE, MODEL_BLOCKED, SAFE, ScreenItem, load_checkpoint, screen_backlog, split
+from core.fake_llm import _RISK, FakeGemini, FakeProfile, configure
+from core.registry import registry
+from core.safety_guard import run_pre_computation_safety_check
+from core.scheduled_llm import NO_RETRY, ScheduledLlm
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+PER_MESSAGE_SAMPLE = 120     # One call each at the configured rpm: keep it short
+UNREADABLE = "[unreadable]"  # The simulated model leaves these out of multi-item replies
+LONG_EVERY = 500             # Every so often a journal import: one entry longer than a segment
+LONG_CHARS = 9000
+
+# Soft cues that reach the model, some of which it escalates, and hard keywords that never do
+_SOFT = [
+    "I feel hopeless about work and can't see it changing",
+    "Honestly everyone would be better off without me",
+    "I don't want to be here anymore",
+    "I feel like such a burden on my family",
+    "My partner hit me again last night",
+    "I'm worthless at everything I try",
+]
+_HARD = ["I want to die", "I keep thinking about suicide", "I might hurt myself tonight"]
+
+
+class BacklogGemini(FakeGemini):
+    """
+    FakeGemini whose time grows with the verdicts it writes, which skips
+    UNREADABLE items in multi-item prompts (and refuses them alone), and
+    which fails every call once `fail_after` calls have been made.
+    """
+
+    fail_after: int = 1 << 30
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        object.__setattr__(self, "_calls", [0])
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self._calls[0] += 1
+        if self._calls[0] > self.fail_after:
+            await asyncio.sleep(0.05)
+            raise errors.ClientError(400, {"error": {"code": 400, "message": "Bad request (simulated).", "status": "INVALID_ARGUMENT"}})
+        lines = llm_request.contents[-1].parts[0].text.splitlines()
+        await asyncio.sleep(0.005 * len(lines))
+        async for response in super().generate_content_async(llm_request, stream):
+            if response.content is not None and response.content.parts[0].text:
+                reply = json.loads(response.content.parts[0].text)
+                unreadable = {json.loads(line)["id"] for line in lines if UNREADABLE in line}
+                if len(lines) == 1 and unreadable:
+                    response.content.parts[0].text = ""
+                else:
+                    reply["results"] = [entry for entry in reply["results"] if entry["id"] not in unreadable]
+                    response.content.parts[0].text = json.dumps(reply)
+            yield response
+
+
+def _use_model(fail_after: int = 1 << 30):
+    inner = BacklogGemini(model=MODEL_NAME, retry_options=NO_RETRY, fail_after=fail_after)
+    registry._models[MODEL_NAME] = ScheduledLlm(model=MODEL_NAME, inner=inner)
+
+
+def _backlog(count: int) -> List[ScreenItem]:
+    rng = random.Random(7)
+    with open(ROUTER_TRAINING_PATH, encoding="utf-8") as handle:
+        benign = [json.loads(line)["text"] for line in handle if line.strip()]
+    items = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.02:
+            text = rng.choice(_HARD)
+        elif roll < 0.30:
+            text = rng.choice(_SOFT)
+        else:
+            text = rng.choice(benign)
+        if i % LONG_EVERY == LONG_EVERY // 2:
+            text = _journal_entry(rng, benign, risky=rng.random() < 0.5)
+        elif rng.random() < 0.002:
+            text += " " + UNREADABLE
+        items.append(ScreenItem(f"m{i}", f"{text} (entry {i})"))
+    return items
+
+
+def _journal_entry(rng: random.Random, benign: List[str], risky: bool) -> str:
+    """Benign lines around LONG_CHARS, with a soft cue in the middle if `risky`."""
+    lines = []
+    while sum(len(line) + 1 for line in lines) < LONG_CHARS:
+        line = rng.choice(benign)
+        if not _RISK.search(line):
+            lines.append(line)
+    if risky:
+        lines.insert(len(lines) // 2, "Tonight I am going to take all my pills and end it.")
+    return " ".join(lines)
+
+
+def _check_long_entry(root: str):
+    """The cue sits past the first segment, where a head-and-tail cut would drop it."""
+    with open(ROUTER_TRAINING_PATH, encoding="utf-8") as handle:
+        benign = [json.loads(line)["text"] for line in handle if line.strip()]
+    text = _journal_entry(random.Random(3), benign, risky=True)
+    item = ScreenItem("journal", text)
+    segments = split(item)
+    assert not run_pre_computation_safety_check(text)
+    assert "end it." not in segments[0].text and "end it." not in segments[-1].text
+    assert "".join(segment.text[:len(segment.text) - BULK_SCREEN_SEGMENT_OVERLAP] for segment in segments[:-1]) + segments[-1].text == text
+    out = os.path.join(root, "journal.jsonl")
+    asyncio.run(screen_backlog([item, ScreenItem("calm", _journal_entry(random.Random(4), benign, risky=False))], out))
+    verdicts = _verdicts(out)
+    assert verdicts["journal"]["verdict"] == ESCALATE, "a cue in the middle of a long entry was not screened"
+    assert verdicts["calm"]["verdict"] == SAFE
+    print(f"long entry: {len(text)} chars in {len(segments)} segments -> {verdicts['journal']['verdict']}")
+
+
+def _expected(item: ScreenItem) -> str:
+    if run_pre_computation_safety_check(item.text):
+        return ESCALATE
+    return ESCALATE if UNREADABLE in item.text or _RISK.search(item.text) else SAFE
+
+
+def _verdicts(path: str) -> Dict[str, dict]:
+    verdicts: Dict[str, dict] = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            record = json.loads(line)
+            assert record["id"] not in verdicts, f"{record['id']} screened twice"
+            verdicts[record["id"]] = record
+    return verdicts
+
+
+def _row(label: str, summary, screened: int):
+    calls = max(summary.model_calls, 1)
+    print(
+        f"{label:<22} | {summary.messages_per_minute:>9.0f} | {summary.model_calls:>6} | "
+        f"{(summary.prompt_tokens + summary.output_tokens) / max(screened, 1):>10.1f} | "
+        f"{summary.cost_usd / max(screened, 1) * 1000:>10.4f} | {screened / calls:>8.1f}"
+    )
+
+
+def main():
+    configure(FakeProfile(ttft_ms=800.0, ttft_sigma=0.2))
+    backlog = _backlog(MESSAGES)
+    review = [item for item in backlog if not run_pre_computation_safety_check(item.text)]
+    sample = review[:PER_MESSAGE_SAMPLE]
+
+    print(f"{MESSAGES} messages, {len(review)} past the crisis-keyword pass")
+    print(f"{'run':<22} | {'msgs/min':>9} | {'calls':>6} | {'tok/msg':>10} | {'$/1k msgs':>10} | {'per call':>8}")
+    print("-" * 82)
+    with tempfile.TemporaryDirectory() as root:
+        _use_model()
+        single = asyncio.run(screen_backlog(sample, os.path.join(root, "single.jsonl"), max_items=1))
+        _row("one per call (sample)", single, len(sample))
+        packed = asyncio.run(screen_backlog(sample, os.path.join(root, "packed.jsonl")))
+        _row("packed (sample)", packed, len(sample))
+        _check_long_entry(root)
+
+        # Full backlog: the model starts failing partway, then the run is resumed
+        out = os.path.join(root, "verdicts.jsonl")
+        _use_model(fail_after=20)
+        first = asyncio.run(screen_backlog(backlog, out))
+        with open(out, "a", encoding="utf-8") as handle:
+            handle.write('{"id": "m0", "verd')   # Torn write from a crash
+        written = len(load_checkpoint(out))
+        _use_model()
+        second = asyncio.run(screen_backlog(backlog, out))
+        _row("packed (full, resumed)", second, second.model_screened)
+        print(f"first run: {first.failed} left unscreened after model errors; resume skipped {second.resumed}")
+
+        verdicts = _verdicts(out)
+        assert first.failed > 0 and second.failed == 0
+        assert second.resumed == written == MESSAGES - first.failed
+        assert set(verdicts) == {item.id for item in backlog}, "a message has no verdict"
+        wrong = [item.id for item in backlog if verdicts[item.id]["verdict"] != _expected(item)]
+        assert not wrong, f"verdicts mapped to the wrong messages: {wrong[:5]}"
+        assert all(verdicts[item.id]["source"] == MODEL_BLOCKED for item in review if UNREADABLE in item.text)
+        sources: Dict[str, int] = {}
+        for record in verdicts.values():
+            sources[record["source"]] = sources.get(record["source"], 0) + 1
+        print(f"verdict sources: {sources}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Benchmark: prompt size per turn with and without context compaction
+# Run from withyou_system/: python -m benchmarks.bench_compaction
+import random
+import time
+
+from google.adk.events import Event
+from google.genai import types
+
+from config.settings import COMPACTION_KEEP_TURNS, COMPACTION_SUMMARY_MAX_CHARS
+from core.compaction import ContextCompactor, compaction_report
+
+TURNS = 200
+REPORT_EVERY = 25
+SAFETY_TURNS = {40, 41, 120}  # Turns that must survive compaction verbatim
+
+_USER_LINES = [
+    "I slept badly again and the deadline at work is tomorrow.",
+    "The breathing exercise helped a bit this morning.",
+    "My mother called and we argued about the holidays.",
+    "I skipped lunch because I was too anxious to eat.",
+    "Can we plan a small routine for the evening?",
+]
+_SAFETY_LINE = "Honestly I feel hopeless and like a burden to everyone."
+
+
+def _event(author: str, text: str) -> Event:
+    role = "user" if author == "user" else "model"
+    return Event(author=author, content=types.Content(role=role, parts=[types.Part(text=text)]))
+
+
+def _session_events(rng: random.Random):
+    events = []
+    for turn in range(1, TURNS + 1):
+        text = _SAFETY_LINE if turn in SAFETY_TURNS else rng.choice(_USER_LINES)
+        events.append(_event("user", text))
+        events.append(_event("clinical_triage", "Thanks for sharing that. " + " ".join(
+            rng.choice(["Let's", "try", "a", "short", "grounding", "step", "together", "tonight."])
+            for _ in range(rng.randint(30, 80))
+        )))
+    return events
+
+
+def main():
+    events = _session_events(random.Random(11))
+    compactor = ContextCompactor(COMPACTION_KEEP_TURNS, COMPACTION_SUMMARY_MAX_CHARS)
+    report = compaction_report(compactor, events)
+
+    print(f"{'turn':>5} | {'tokens before':>13} | {'tokens after':>12} | {'saved':>6}")
+    print("-" * 46)
+    for row in report:
+        if row["turn"] % REPORT_EVERY == 0 or row["turn"] == 1:
+            saved = 1 - row["tokens_after"] / max(row["tokens_before"], 1)
+            print(f"{row['turn']:>5} | {row['tokens_before']:>13} | {row['tokens_after']:>12} | {saved:>6.0%}")
+
+    key = ("bench", "u", "s")
+    start = time.perf_counter()
+    compacted = ContextCompactor(COMPACTION_KEEP_TURNS, COMPACTION_SUMMARY_MAX_CHARS).compact_events(key, events)
+    cold_ms = (time.perf_counter() - start) * 1e3
+    runs = 1000
+    warm = ContextCompactor(COMPACTION_KEEP_TURNS, COMPACTION_SUMMARY_MAX_CHARS)
+    warm.compact_events(key, events)
+    start = time.perf_counter()
+    for _ in range(runs):
+        warm.compact_events(key, events)
+    warm_ms = (time.perf_counter() - start) * 1e3 / runs
+    print(f"\ncompact {len(events)} events: cold {cold_ms:.2f} ms | cached {warm_ms:.3f} ms")
+
+    kept = sum(1 for event in compacted if event.content.parts[0].text == _SAFETY_LINE)
+    print(f"safety turns kept verbatim: {kept}/{len(SAFETY_TURNS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Benchmark: local triage routing accuracy, fallback rate and latency
+# Run from withyou_system/: python -m benchmarks.bench_intent_router
+import random
+import statistics
+import time
+
+from config.settings import ROUTER_CONFIDENCE_THRESHOLD, ROUTER_TRAINING_PATH
+from core.intent_router import IntentRouter, load_transcripts
+
+FOLDS = 5
+THRESHOLDS = [0.4, 0.5, ROUTER_CONFIDENCE_THRESHOLD, 0.7, 0.8]
+
+
+def _cross_validate(texts, labels, threshold, rng):
+    order = list(range(len(texts)))
+    rng.shuffle(order)
+    routed = correct = 0
+    for fold in range(FOLDS):
+        held_out = set(order[fold::FOLDS])
+        train = [i for i in order if i not in held_out]
+        router = IntentRouter(threshold=threshold).fit([texts[i] for i in train], [labels[i] for i in train])
+        for i in held_out:
+            decision = router.route(texts[i])
+            if not decision.fallback:
+                routed += 1
+                correct += decision.agent == labels[i]
+    return routed / len(texts), correct / max(routed, 1)
+
+
+def main():
+    texts, labels = load_transcripts(ROUTER_TRAINING_PATH)
+    print(f"{len(texts)} labelled examples, {FOLDS}-fold cross-validation")
+    print(f"{'threshold':>9} | {'routed locally':>14} | {'accuracy when routed':>20}")
+    print("-" * 51)
+    for threshold in THRESHOLDS:
+        coverage, accuracy = _cross_validate(texts, labels, threshold, random.Random(5))
+        print(f"{threshold:>9.2f} | {coverage:>14.0%} | {accuracy:>20.1%}")
+
+    router = IntentRouter(threshold=ROUTER_CONFIDENCE_THRESHOLD).fit(texts, labels)
+    latencies = []
+    for text in texts * 10:
+        start = time.perf_counter()
+        router.route(text)
+        latencies.append(time.perf_counter() - start)
+    print(f"\ntraining {router.training_seconds * 1e3:.1f} ms | "
+          f"route p50 {statistics.median(latencies) * 1e3:.3f} ms (vs one router LLM call)")
+
+
+if __name__ == "__main__":
+    main()
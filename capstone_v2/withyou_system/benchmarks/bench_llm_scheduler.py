@@ -0,0 +1,146 @@
+# Benchmark: crisis-call latency during a coaching burst, shared scheduler vs per-call retries
+# Run from withyou_system/: python -m benchmarks.bench_llm_scheduler
+import os
+
+# Quota for the simulated model, requests per minute; the scheduler is
+# configured a little under it, as it would be in production.
+QUOTA_RPM = 600
+os.environ.setdefault("WITHYOU_PRO_RPM", str(int(QUOTA_RPM * 0.9)))
+
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import errors, types
+
+from config.settings import MODEL_NAME, RETRY_ATTEMPTS, RETRY_EXP_BASE
+from core.fake_llm import FakeGemini, FakeProfile, configure
+from core.llm_scheduler import BULK, CRISIS, NORMAL, LlmScheduler, crisis_priority, llm_scheduler
+from core.scheduled_llm import NO_RETRY, ScheduledLlm
+
+COACH_CALLS = 400        # Arriving all at once
+CRISIS_CALLS = 20        # One every CRISIS_EVERY seconds during the burst
+CRISIS_EVERY = 0.5
+
+
+class QuotaGemini(FakeGemini):
+    """FakeGemini behind a server-side per-minute quota: over it, 429 with RetryInfo."""
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        object.__setattr__(self, "_window", [time.monotonic(), 0])
+
+    async def generate_content_async(self, llm_request, stream=False):
+        window = self._window
+        now = time.monotonic()
+        if now - window[0] >= 1.0:
+            window[0], window[1] = now, 0
+        window[1] += 1
+        if window[1] > QUOTA_RPM / 60:
+            await asyncio.sleep(0.02)
+            raise errors.ClientError(429, {"error": {
+                "code": 429, "message": "Quota exceeded (simulated).", "status": "RESOURCE_EXHAUSTED",
+                "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{1.0 - (now - window[0]):.3f}s"}],
+            }})
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+async def _independent_retries(llm, request):
+    # What each Gemini object did before (RETRY_CONFIG): its own exponential backoff per call
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        try:
+            return [response async for response in llm.generate_content_async(request)]
+        except errors.ClientError:
+            if attempt == RETRY_ATTEMPTS:
+                raise
+            await asyncio.sleep(min(RETRY_EXP_BASE ** (attempt - 1), 60.0) + random.uniform(0, 1.0))
+
+
+async def _scheduled(llm, request):
+    return [response async for response in llm.generate_content_async(request)]
+
+
+def _request(text: str) -> LlmRequest:
+    return LlmRequest(model=MODEL_NAME, contents=[types.Content(role="user", parts=[types.Part(text=text)])])
+
+
+async def _run(mode: str) -> Dict[str, List[float]]:
+    if mode == "scheduled":
+        llm = ScheduledLlm(model=MODEL_NAME, inner=QuotaGemini(model=MODEL_NAME, retry_options=NO_RETRY))
+        call = _scheduled
+    else:
+        llm = QuotaGemini(model=MODEL_NAME, retry_options=NO_RETRY)
+        call = _independent_retries
+    results: Dict[str, List[float]] = {"coach": [], "crisis": [], "failed_coach": [], "failed_crisis": []}
+
+    async def one(kind: str):
+        started = time.perf_counter()
+        try:
+            if kind == "crisis":
+                with crisis_priority():
+                    await call(llm, _request("I don't want to be here anymore"))
+            else:
+                await call(llm, _request("help me unwind before bed"))
+        except Exception:
+            results[f"failed_{kind}"].append(time.perf_counter() - started)
+            return
+        results[kind].append(time.perf_counter() - started)
+
+    async def crisis_stream():
+        tasks = []
+        for _ in range(CRISIS_CALLS):
+            await asyncio.sleep(CRISIS_EVERY)
+            tasks.append(asyncio.create_task(one("crisis")))
+        await asyncio.gather(*tasks)
+
+    await asyncio.gather(*[one("coach") for _ in range(COACH_CALLS)], crisis_stream())
+    return results
+
+
+def _pct(samples: List[float], q: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+
+
+async def _low_rpm_calls():
+    """At a low per-model rate every lane must still get a first slot straight away."""
+    scheduler = LlmScheduler({"low-rpm-model": 30.0}, default_rpm=30.0)
+    for lane in (NORMAL, BULK, CRISIS):
+        await asyncio.wait_for(scheduler.acquire("low-rpm-model", lane), timeout=5.0)
+
+
+def main():
+    logging.getLogger("withyou_llm_scheduler").propagate = False
+    asyncio.run(_low_rpm_calls())
+    print("30 rpm model: normal, bulk and crisis calls each started")
+    random.seed(0)
+    configure(FakeProfile(ttft_ms=300.0, ttft_sigma=0.3, reply_words=20))
+    print(f"{COACH_CALLS} coaching calls at once + {CRISIS_CALLS} crisis calls, quota {QUOTA_RPM} rpm")
+    print(f"{'mode':<22} | {'crisis p50':>10} | {'crisis p95':>10} | {'coach p95':>10} | {'failed':>13}")
+    print("-" * 78)
+    report = {}
+    for mode in ("independent_retries", "scheduled"):
+        results = asyncio.run(_run(mode))
+        report[mode] = results
+        failed = f"{len(results['failed_crisis'])} crisis/{len(results['failed_coach'])}"
+        print(
+            f"{mode:<22} | {_pct(results['crisis'], 0.5):>10.0f} | {_pct(results['crisis'], 0.95):>10.0f}"
+            f" | {_pct(results['coach'], 0.95):>10.0f} | {failed:>13}"
+        )
+    print(f"scheduler: {llm_scheduler.stats()}")
+
+    scheduled = report["scheduled"]
+    assert not scheduled["failed_crisis"], "a crisis call failed under the scheduler"
+    assert len(scheduled["crisis"]) == CRISIS_CALLS
+    # A crisis call should wait for at most about one slot, not for the coaching queue
+    assert _pct(scheduled["crisis"], 0.95) < 1500, "crisis calls queued behind coaching traffic"
+
+
+if __name__ == "__main__":
+    main()
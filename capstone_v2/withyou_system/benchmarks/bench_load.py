@@ -0,0 +1,219 @@
+# Offline end-to-end load test: simulated Gemini, real orchestration, many concurrent sessions
+# Run from withyou_system/: python -m benchmarks.bench_load --conversations 200 --concurrency 50
+import os
+import tempfile
+
+# The fake backend and a scratch state directory must be chosen before
+# settings are imported.
+os.environ.setdefault("WITHYOU_FAKE_LLM", "1")
+os.environ.setdefault("WITHYOU_LOG_CONSOLE", "0")
+os.environ.setdefault("WITHYOU_STATE_DIR", tempfile.mkdtemp(prefix="withyou_load_"))
+# Measure the orchestrator, not the production quota; set these to see queueing
+os.environ.setdefault("WITHYOU_PRO_RPM", "1000000")
+os.environ.setdefault("WITHYOU_FLASH_RPM", "1000000")
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import random
+import resource
+import time
+from collections import Counter
+from typing import Dict, List
+
+from config.settings import DATA_DIR, MODEL_NAME
+from core.fake_llm import FakeProfile, configure
+from core.model_tiers import tier_policy
+from core.tracing import tracer
+from main import stream_user_interaction
+
+# Turns that reach the safety LLM (REVIEW tier) or escalate straight away
+_REVIEW_TURNS = [
+    "I feel hopeless and I'm so tired of everything",
+    "Nothing matters anymore, I just feel empty",
+    "I don't know how much longer I can keep going like this",
+]
+_CRISIS_TURNS = ["I want to end it all tonight"]
+
+
+class _UnknownAgentWarnings(logging.Handler):
+    """Counts ADK's "Event from an unknown agent" warnings (runners sharing a session)."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        if "unknown agent" in record.getMessage():
+            self.count += 1
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, not current
+
+
+def load_corpus(path: str, conversations: int, turns: int, rng: random.Random) -> List[List[str]]:
+    """
+    `path` is JSONL. Lines with "turns" are replayed as conversations; lines
+    with only "text" (like the triage transcripts) are sampled into
+    conversations of `turns` messages, mixed with some risky turns.
+    """
+    scripted: List[List[str]] = []
+    messages: List[str] = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if "turns" in row:
+                scripted.append([str(turn) for turn in row["turns"]])
+            elif "text" in row:
+                messages.append(str(row["text"]))
+    if scripted:
+        return [scripted[i % len(scripted)] for i in range(conversations)]
+
+    corpus = []
+    for _ in range(conversations):
+        conversation = []
+        for _ in range(turns):
+            roll = rng.random()
+            if roll < 0.02:
+                conversation.append(rng.choice(_CRISIS_TURNS))
+            elif roll < 0.2:
+                conversation.append(rng.choice(_REVIEW_TURNS))
+            else:
+                conversation.append(rng.choice(messages))
+        corpus.append(conversation)
+    return corpus
+
+
+async def _conversation(index: int, turns: List[str], slots: asyncio.Semaphore, results: Dict[str, list]):
+    user_id = session_id = f"load-{index:06d}"
+    async with slots:
+        for text in turns:
+            started = time.perf_counter()
+            ttft = None
+            try:
+                async for _ in stream_user_interaction(text, user_id, session_id):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+            except Exception as error:
+                results["errors"].append(type(error).__name__)
+                continue
+            results["total"].append(time.perf_counter() - started)
+            if ttft is not None:
+                results["ttft"].append(ttft)
+
+
+async def _abandoned_turn() -> int:
+    """Tasks a turn leaves running when its client goes away after the first chunk."""
+    before = asyncio.all_tasks()
+    stream = stream_user_interaction(_REVIEW_TURNS[0], "load-abandoned", "load-abandoned", speculative=True)
+    async for _ in stream:
+        break
+    await stream.aclose()   # What the server does on a disconnect, before releasing the session lane
+    return sum(1 for task in asyncio.all_tasks() - before if not task.done())
+
+
+def _percentiles(samples: List[float]) -> str:
+    if not samples:
+        return "n/a"
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+    return f"p50 {pick(0.5):8.1f} | p95 {pick(0.95):8.1f} | p99 {pick(0.99):8.1f} ms"
+
+
+async def run(args) -> Dict[str, object]:
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    profile = FakeProfile(
+        ttft_ms=args.ttft_ms,
+        ttft_sigma=args.ttft_sigma,
+        chunk_ms=args.chunk_ms,
+        reply_words=args.reply_words,
+        error_429=args.error_429,
+        error_503=args.error_503,
+    )
+    # A slower pro model exercises the tier policy's fallback to flash
+    per_model = {MODEL_NAME: profile._replace(ttft_ms=args.pro_ttft_ms)} if args.pro_ttft_ms else None
+    configure(profile, per_model)
+    corpus = load_corpus(args.corpus, args.conversations, args.turns, rng)
+
+    # Warm up imports, agents and the router outside the measurement
+    await _conversation(-1, ["hello"], asyncio.Semaphore(1), {"total": [], "ttft": [], "errors": []})
+    tracer.reset()
+    gc.collect()
+    rss_before = _rss_bytes()
+
+    results: Dict[str, list] = {"total": [], "ttft": [], "errors": []}
+    unknown_agents = _UnknownAgentWarnings()
+    logging.getLogger().addHandler(unknown_agents)
+    slots = asyncio.Semaphore(args.concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*[_conversation(i, turns, slots, results) for i, turns in enumerate(corpus)])
+    elapsed = time.perf_counter() - started
+    logging.getLogger().removeHandler(unknown_agents)
+    abandoned_tasks = await _abandoned_turn()
+    gc.collect()
+    rss_after = _rss_bytes()
+
+    turns = sum(len(turns) for turns in corpus)
+    return {
+        "conversations": len(corpus),
+        "turns": turns,
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 2),
+        "turns_per_second": round(turns / elapsed, 1),
+        "ttft": _percentiles(results["ttft"]),
+        "total": _percentiles(results["total"]),
+        "errors": dict(Counter(results["errors"])),
+        "unknown_agent_warnings": unknown_agents.count,
+        "abandoned_turn_tasks": abandoned_tasks,
+        "rss_delta_mb": round((rss_after - rss_before) / 1e6, 1),
+        "kb_per_session": round((rss_after - rss_before) / 1024 / len(corpus), 1),
+        "model_tiers": tier_policy.stats()["turns"],
+        "stages_ms": tracer.snapshot(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay conversations through the orchestrator against a simulated Gemini.")
+    parser.add_argument("--corpus", default=os.path.join(DATA_DIR, "triage_transcripts.jsonl"))
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=5, help="Turns per sampled conversation")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--ttft-ms", type=float, default=400.0)
+    parser.add_argument("--pro-ttft-ms", type=float, default=0.0, help="Separate median TTFT for the pro model")
+    parser.add_argument("--ttft-sigma", type=float, default=0.5)
+    parser.add_argument("--chunk-ms", type=float, default=30.0)
+    parser.add_argument("--reply-words", type=int, default=60)
+    parser.add_argument("--error-429", type=float, default=0.02)
+    parser.add_argument("--error-503", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    # Simulated retries are logged like real ones; keep them out of the report
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.WARNING)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    stages = report.pop("stages_ms")
+    for key, value in report.items():
+        print(f"{key:<18} {value}")
+    print(f"\n{'stage':<34} | {'count':>6} | {'p50':>8} | {'p95':>8} | {'p99':>8}  (ms)")
+    print("-" * 78)
+    for stage, row in stages.items():
+        print(f"{stage:<34} | {row['count']:>6} | {row['p50']:>8.1f} | {row['p95']:>8.1f} | {row['p99']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Benchmark: load_memory query latency as a user's history grows, and per-turn indexing cost
+# Run from withyou_system/: python -m benchmarks.bench_memory_index
+import asyncio
+import random
+import statistics
+import time
+
+import numpy as np
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.genai import types
+
+from core.memory_index import IndexedMemoryService
+
+HISTORY_SIZES = [1_000, 10_000, 50_000]  # ~50k memories is years of daily check-ins
+QUERIES = 500
+DIMENSIONS = 64
+
+_VOCABULARY = (
+    "sleep anxious breathing walk journal presentation work deadline family friend tired calm "
+    "grounding exercise panic morning night coffee music meditation stretch phone scrolling "
+    "exam mother father office commute rain lonely hopeful proud stuck overwhelmed gratitude "
+    "5-4-3-2-1 box breathing helped worked tried again better worse headache appetite"
+).split()
+
+
+def _hash_embed(text: str) -> np.ndarray:
+    # Deterministic bag-of-words hashing embedding; stands in for a real encoder.
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for token in text.lower().split():
+        vector[hash(token) % DIMENSIONS] += 1.0
+    return vector
+
+
+def _events(count: int, rng: random.Random):
+    for i in range(count):
+        words = " ".join(rng.choice(_VOCABULARY) for _ in range(rng.randint(6, 24)))
+        yield Event(author="user", content=types.Content(role="user", parts=[types.Part(text=words)]))
+
+
+def _measure(service: IndexedMemoryService, rng: random.Random) -> tuple:
+    latencies = []
+    for _ in range(QUERIES):
+        query = " ".join(rng.choice(_VOCABULARY) for _ in range(3))
+        start = time.perf_counter()
+        service.search("bench", "u", query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies) * 1e3, latencies[int(len(latencies) * 0.99)] * 1e3
+
+
+async def _per_turn_indexing(rng: random.Random, turns: int = 5_000):
+    """Re-adds one growing session after every turn, as the orchestrator does."""
+    service = IndexedMemoryService()
+    session = Session(id="s", app_name="bench", user_id="u", events=[])
+    samples = []
+    for _ in range(turns):
+        session.events.extend(_events(2, rng))
+        start = time.perf_counter()
+        await service.add_session_to_memory(session)
+        samples.append(time.perf_counter() - start)
+    early = statistics.median(samples[:500]) * 1e6
+    late = statistics.median(samples[-500:]) * 1e6
+    print(f"per-turn add_session_to_memory: {early:.1f} us early, {late:.1f} us after {turns * 2} events")
+    assert service.stats()["memories"] == turns * 2
+    assert late < early * 3, "indexing a turn should not scale with the session history"
+
+
+async def main():
+    rng = random.Random(3)
+    await _per_turn_indexing(rng)
+    print(f"{'memories':>9} | {'insert us/doc':>13} | {'bm25 p50/p99 ms':>16} | {'hybrid p50/p99 ms':>18}")
+    print("-" * 66)
+    for size in HISTORY_SIZES:
+        events = list(_events(size, rng))
+        bm25 = IndexedMemoryService()
+        hybrid = IndexedMemoryService(embed=_hash_embed, dimensions=DIMENSIONS)
+
+        start = time.perf_counter()
+        await bm25.add_events_to_memory(app_name="bench", user_id="u", events=events)
+        insert_us = (time.perf_counter() - start) / size * 1e6
+        await hybrid.add_events_to_memory(app_name="bench", user_id="u", events=events)
+
+        bm25_p50, bm25_p99 = _measure(bm25, rng)
+        hybrid_p50, hybrid_p99 = _measure(hybrid, rng)
+        print(f"{size:>9} | {insert_us:>13.1f} | {bm25_p50:>7.3f} / {bm25_p99:<6.3f} | {hybrid_p50:>8.3f} / {hybrid_p99:<6.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+# Benchmark: mood_trend_analyzer latency as a user's mood history grows; logs from before the sleep column
+# Run from withyou_system/: python -m benchmarks.bench_mood_store
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from core.mood_store import EMOTIONS, RECORD_DTYPE, MoodStore, read_sleep, user_file_name
+
+HISTORY_SIZES = [100, 10_000, 50_000]  # 50k entries is ~7 years of hourly check-ins
+WINDOWS_DAYS = [7, 30, 365]
+QUERIES = 5_000
+
+
+def _check_legacy_logs():
+    """A log written before sleep hours existed reads the same, and later sleep entries line up."""
+    # `.mood` rows must keep the layout existing files were written with
+    assert RECORD_DTYPE.itemsize == 88, RECORD_DTYPE.itemsize
+    with tempfile.TemporaryDirectory() as root:
+        store = MoodStore(root)
+        now = time.time()
+        for i in range(5):
+            store.append("u", 1 + i % 5, "calm", now - (5 - i) * 3600.0)
+        before = MoodStore(root).window("u", 1, now)
+        base = os.path.join(root, user_file_name("u"))
+        assert not os.path.exists(base + ".sleep")
+
+        reopened = MoodStore(root)
+        assert reopened.window("u", 1, now) == before, "a pre-sleep log was misread"
+        reopened.append("u", 4, "hopeful", now, sleep_hours=6.5)
+        sleep = read_sleep(base, 0, reopened.entries("u"))
+        assert all(math.isnan(value) for value in sleep[:5]) and sleep[5] == 6.5, sleep
+    print("legacy log: read unchanged; sleep column padded to line up")
+
+
+def main():
+    _check_legacy_logs()
+    rng = random.Random(2)
+    print(f"{'entries':>8} | {'append us':>9} | " + " | ".join(f"{f'{days}d p50 us':>11}" for days in WINDOWS_DAYS))
+    print("-" * 60)
+    for size in HISTORY_SIZES:
+        with tempfile.TemporaryDirectory() as root:
+            store = MoodStore(root)
+            now = time.time()
+            start_ts = now - size * 3600.0
+            started = time.perf_counter()
+            for i in range(size):
+                store.append("u", rng.randint(1, 5), rng.choice(EMOTIONS), start_ts + i * 3600.0)
+            append_us = (time.perf_counter() - started) / size * 1e6
+
+            # A fresh store maps the files from disk, as after a restart
+            reader = MoodStore(root)
+            columns = []
+            for days in WINDOWS_DAYS:
+                latencies = []
+                for _ in range(QUERIES):
+                    started = time.perf_counter()
+                    reader.window("u", days, now)
+                    latencies.append(time.perf_counter() - started)
+                columns.append(f"{statistics.median(latencies) * 1e6:>11.1f}")
+            print(f"{size:>8} | {append_us:>9.1f} | " + " | ".join(columns))
+
+
+if __name__ == "__main__":
+    main()
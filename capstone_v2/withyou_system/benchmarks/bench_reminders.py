@@ -0,0 +1,137 @@
+# Benchmark: reminder ticks with a million active reminders, vs scanning them all every tick;
+# schedule_routine under speculative triage
+# Run from withyou_system/: python -m benchmarks.bench_reminders [reminders]
+import os
+import tempfile
+
+os.environ.setdefault("WITHYOU_LOG_CONSOLE", "0")
+os.environ.setdefault("WITHYOU_STATE_DIR", tempfile.mkdtemp(prefix="withyou-bench-"))
+
+import asyncio
+import random
+import sys
+import time
+
+from core.reminders import DAILY, HOURLY, WEEKLY, Recurrence, ReminderEngine, get_reminder_engine, parse_recurrence
+from core.speculation import hold_side_effects
+from tools.scheduling_tools import schedule_routine
+
+REMINDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+USERS = REMINDERS // 4
+SIMULATED_SECONDS = 1800   # Ticks of one second; short enough that no reminder fires twice
+
+
+def _recurrence(rng: random.Random) -> Recurrence:
+    hour, minute = rng.randrange(24), rng.randrange(60)
+    roll = rng.random()
+    if roll < 0.6:
+        return Recurrence(DAILY, hour, minute)
+    if roll < 0.8:
+        return Recurrence(WEEKLY, hour, minute, weekdays=(0, 1, 2, 3, 4))
+    if roll < 0.9:
+        return Recurrence(HOURLY, hour, minute, interval=rng.randrange(2, 5))
+    return Recurrence(DAILY, hour, minute, interval=2)
+
+
+def _pct(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+
+
+async def _check_speculative_schedule():
+    """A reminder asked for during speculative triage is written only once the verdict is SAFE."""
+    engine = get_reminder_engine()
+    for safe in (False, True):
+        safe_verdict = asyncio.get_running_loop().create_future()
+
+        async def triage():
+            hold_side_effects(safe_verdict)
+            return await schedule_routine("Morning walk", "07:30", "daily", timezone="Asia/Kolkata")
+
+        task = asyncio.create_task(triage())
+        await asyncio.sleep(0.05)
+        assert not engine.reminders_for("local_user"), "written before the safety verdict"
+        if not safe:
+            safe_verdict.cancel()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            assert not engine.reminders_for("local_user"), "written after a crisis verdict"
+            continue
+        safe_verdict.set_result(None)
+        result = await task
+        assert result["timezone"] == "Asia/Kolkata", result
+    (reminder,) = engine.reminders_for("local_user")
+    assert reminder.next_due_local().strftime("%H:%M") == "07:30"
+    unknown = await schedule_routine("Stretch", "21:00", "daily")
+    assert "time zone is not known" in unknown["message"], unknown
+    print("speculative triage: reminder held until SAFE, dropped on crisis; per-user time zone applied")
+
+
+def _check_parser():
+    cases = {
+        ("7:30pm", "monday to friday"): "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;AT=19:30",
+        ("7:30pm", "friday to monday"): "FREQ=WEEKLY;BYDAY=MO,FR,SA,SU;AT=19:30",
+        ("8am", "sat-tue and thursday"): "FREQ=WEEKLY;BYDAY=MO,TU,TH,SA,SU;AT=08:00",
+        ("8am", "tuesdays and thursdays"): "FREQ=WEEKLY;BYDAY=TU,TH;AT=08:00",
+        ("8am", "every other day"): "FREQ=DAILY;INTERVAL=2;AT=08:00",
+    }
+    for (time_text, frequency), expected in cases.items():
+        rule = parse_recurrence(time_text, frequency).rule
+        assert rule == expected, f"{frequency!r}: {rule} != {expected}"
+    print(f"parser: {len(cases)} frequencies ok")
+
+
+def main():
+    _check_parser()
+    asyncio.run(_check_speculative_schedule())
+    rng = random.Random(3)
+    delivered = []
+    with tempfile.TemporaryDirectory() as root:
+        engine = ReminderEngine(os.path.join(root, "reminders.db"), sink=delivered.extend, timezone="Europe/London")
+        start = time.time()
+        started = time.perf_counter()
+        for offset in range(0, REMINDERS, 50_000):
+            engine.add_many(
+                ((f"user-{rng.randrange(USERS)}", "micro-habit", _recurrence(rng))
+                 for _ in range(min(50_000, REMINDERS - offset))),
+                now=start,
+            )
+        print(f"stored {REMINDERS} reminders in {time.perf_counter() - started:.1f} s")
+
+        expected = engine._conn.execute(
+            "SELECT count(*) FROM reminders WHERE next_due > ? AND next_due <= ?", (start, start + SIMULATED_SECONDS)
+        ).fetchone()[0]
+        scan = []
+        for second in (60, 600, 1200):
+            began = time.perf_counter()
+            engine._conn.execute(
+                "SELECT id FROM reminders NOT INDEXED WHERE next_due <= ?", (start + second,)
+            ).fetchall()
+            scan.append(time.perf_counter() - began)
+
+        ticks, heap_peak = [], 0
+        for second in range(1, SIMULATED_SECONDS + 1):
+            began = time.perf_counter()
+            engine.tick(start + second)
+            ticks.append(time.perf_counter() - began)
+            heap_peak = max(heap_peak, len(engine._heap))
+        stats = engine.stats()
+        engine.close()
+
+    per_tick = len(delivered) / SIMULATED_SECONDS
+    print(f"{SIMULATED_SECONDS} one-second ticks: {len(delivered)} delivered (~{per_tick:.0f} per tick)")
+    print(f"{'':<26} | {'p50 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 60)
+    print(f"{'tick (heap + due index)':<26} | {_pct(ticks, 0.5):>8.2f} | {_pct(ticks, 0.99):>8.2f} | {max(ticks) * 1000:>8.2f}")
+    print(f"{'full scan, per tick':<26} | {_pct(scan, 0.5):>8.2f} | {_pct(scan, 0.99):>8.2f} | {max(scan) * 1000:>8.2f}")
+    print(f"near-tier heap peak: {heap_peak} entries; engine: {stats}")
+
+    ids = [reminder.id for reminder in delivered]
+    assert len(ids) == len(set(ids)), "a reminder was delivered twice"
+    assert len(ids) == expected, f"delivered {len(ids)}, expected {expected}"
+    assert all(reminder.late <= 1.0 for reminder in delivered)
+    assert heap_peak < REMINDERS / 50, "the near tier held more than the horizon"
+
+
+if __name__ == "__main__":
+    main()
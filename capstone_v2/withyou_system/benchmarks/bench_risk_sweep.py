@@ -0,0 +1,89 @@
+# Benchmark: full and incremental risk sweeps over a synthetic population
+# Run from withyou_system/: python -m benchmarks.bench_risk_sweep [users]
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from core.mood_store import RECORD_DTYPE, SLEEP_DTYPE, TS_DTYPE, USER_INDEX, MoodStore, user_file_name
+from core.risk_sweep import run_sweep
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+ENTRIES = 30            # Roughly a month of daily check-ins per user
+DECLINING = 0.01        # Share of users whose mood drops over the last two weeks
+CHANGED = 0.01          # Share of users with a new entry before the second run
+QUIET_DAYS = 60         # Some declining users stopped logging this long ago
+
+
+def _write_population(root: str, rng: np.random.Generator) -> tuple:
+    """
+    Writes mood files directly in the store's format (much faster than
+    USERS * ENTRIES appends). Running-total columns are left at zero; the
+    sweep reads only the raw columns. Returns (declining, went quiet): every
+    other declining user's history ends QUIET_DAYS ago.
+    """
+    now = time.time()
+    declining, quiet = [], []
+    with open(os.path.join(root, USER_INDEX), "w", encoding="utf-8") as index:
+        for u in range(USERS):
+            user_id = f"user-{u}"
+            name = user_file_name(user_id)
+            index.write(f"{name}\t{json.dumps(user_id)}\n")
+            stamps = now - (ENTRIES - np.arange(ENTRIES)) * 86400.0 + rng.uniform(0, 3600, ENTRIES)
+            records = np.zeros(ENTRIES, dtype=RECORD_DTYPE)
+            sleep = rng.normal(7.0, 1.0, ENTRIES)
+            valence = 3.5 + 0.4 * (sleep - 7.0) + rng.normal(0, 0.4, ENTRIES)
+            if u % int(1 / DECLINING) == 0:
+                valence[-14:] -= np.linspace(0, 2.0, 14)
+                if u % int(2 / DECLINING) == 0:
+                    stamps -= QUIET_DAYS * 86400.0
+                    quiet.append(user_id)
+                else:
+                    declining.append(user_id)
+            records["valence"] = np.clip(valence, 1, 5)
+            sleep = np.where(rng.random(ENTRIES) < 0.7, sleep, np.nan)
+            stamps.astype(TS_DTYPE).tofile(os.path.join(root, name + ".ts"))
+            records.tofile(os.path.join(root, name + ".mood"))
+            if u % 10 != 5:  # Every tenth user predates the sleep column
+                sleep.astype(SLEEP_DTYPE).tofile(os.path.join(root, name + ".sleep"))
+    return declining, quiet
+
+
+def main():
+    rng = np.random.default_rng(4)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir, out_dir = os.path.join(tmp, "mood"), os.path.join(tmp, "sweep")
+        os.makedirs(store_dir)
+        started = time.perf_counter()
+        declining, quiet = _write_population(store_dir, rng)
+        print(f"population:  {USERS:,} users x {ENTRIES} entries written in {time.perf_counter() - started:.1f}s")
+
+        full = run_sweep(store_dir, out_dir, queue_size=len(declining))
+        print(f"full sweep:  {full.seconds:.2f}s ({full.users / full.seconds:,.0f} users/s, {os.cpu_count()} CPUs) "
+              f"recomputed {full.recomputed:,}")
+        with open(full.queue_path, encoding="utf-8") as handle:
+            rows = [json.loads(line) for line in handle]
+        queued = {row["user_id"] for row in rows}
+        with open(full.quiet_path, encoding="utf-8") as handle:
+            went_quiet = {row["user_id"]: row for row in map(json.loads, handle)}
+        print(f"recall:      {len(queued & set(declining)) / len(declining):.0%} of declining users "
+              f"in the top {len(declining)}")
+        print(f"went quiet:  {len(went_quiet.keys() & set(quiet))}/{len(quiet)} declining users who stopped "
+              f"{QUIET_DAYS} days ago listed apart, none in the review queue")
+        assert not queued & set(quiet), "a user who stopped logging is ranked with active users"
+        assert set(quiet) <= went_quiet.keys()
+        assert all(row["days_since_last"] < 7 for row in rows)
+        assert all(went_quiet[user]["days_since_last"] >= QUIET_DAYS for user in quiet)
+
+        store = MoodStore(store_dir)
+        for u in rng.choice(USERS, int(USERS * CHANGED), replace=False):
+            store.append(f"user-{u}", 3.0, "calm", sleep_hours=7.0)
+        rerun = run_sweep(store_dir, out_dir, queue_size=len(declining))
+        print(f"re-run:      {rerun.seconds:.2f}s, recomputed {rerun.recomputed:,}, reused {rerun.reused:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Benchmark: per-message cost of the crisis matcher as the lexicon grows
+# Run from withyou_system/: python -m benchmarks.bench_safety_guard
+import random
+import re
+import time
+from typing import Dict, List
+
+from core.safety_cascade import SafetyTier, assess
+from core.safety_guard import CRISIS_LEXICON, CrisisMatcher
+
+LEXICON_SIZES = [10, 100, 1_000, 5_000]
+MESSAGES = 2_000
+
+# Alphabets for synthetic phrases in several scripts
+_ALPHABETS = {
+    "en": "abcdefghijklmnopqrstuvwxyz",
+    "hi": "कखगघचछजझटठडढतथदधनपफबभमयरलवशसह",
+    "ta": "கஙசஞடணதநபமயரலவழளறன",
+}
+
+_SAMPLE_MESSAGES = [
+    "I can't sleep because I'm worried about my job presentation tomorrow.",
+    "Had a decent day, went for a walk after lunch and felt calmer.",
+    "मुझे आज बहुत थकान महसूस हो रही है और नींद नहीं आ रही",
+    "Feeling overwhelmed by my schedule, can we plan the week?",
+    "I don't want to be here anymore. I'm thinking of hurting myself.",
+]
+
+
+def _synthetic_lexicon(size: int, rng: random.Random) -> Dict[str, List[str]]:
+    lexicon = {language: list(phrases) for language, phrases in CRISIS_LEXICON.items()}
+    languages = list(_ALPHABETS)
+    for i in range(size):
+        language = languages[i % len(languages)]
+        alphabet = _ALPHABETS[language]
+        words = [
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(3, 8)))
+            for _ in range(rng.randint(1, 3))
+        ]
+        lexicon.setdefault(f"{language}-synthetic", []).append(" ".join(words))
+    return lexicon
+
+
+def _legacy_check(patterns: List["re.Pattern[str]"], text: str) -> bool:
+    normalized_text = text.lower()
+    for pattern in patterns:
+        if pattern.search(normalized_text):
+            return True
+    return False
+
+
+# Overlapping phrases: when the longest one runs into more of a word, the
+# shorter phrase at the same position must still be found
+_OVERLAP_CASES = [
+    (["suicide", "suicide note"], "I wrote suicide notes", ["suicide"]),
+    (["suicide", "suicide note"], "I wrote a suicide note", ["suicide note"]),
+    (["end it", "end it all"], "I want to end it allready", ["end it"]),
+    (["end it", "end it all"], "I want to end it all.", ["end it all"]),
+    (["overdose", "overdosed on"], "I think I will overdose once more", ["overdose"]),
+    (["overdose", "overdosed on"], "She overdosed on pills", ["overdosed on"]),
+    (["suicide"], "suicidal thoughts", []),
+    (["मरना", "मरना चाहता"], "मैं मरना चाहताी", ["मरना"]),   # Trailing vowel sign continues the word
+    (["मरना", "मरना चाहता"], "मैं मरना चाहता हूँ", ["मरना चाहता"]),
+]
+
+
+def _check_overlaps():
+    for phrases, text, expected in _OVERLAP_CASES:
+        matcher = CrisisMatcher({"test": phrases})
+        found = [match.phrase for match in matcher.scan(text)]
+        assert found == expected, f"{phrases} on {text!r}: {found} != {expected}"
+        assert matcher.contains(text) == bool(expected)
+        assert [m.phrase for m in matcher.scan_batch(["", text])[1]] == expected
+    print(f"overlapping phrases: {len(_OVERLAP_CASES)} cases ok")
+
+
+# The cascade may only skip the safety LLM on positive benign evidence: none
+# of these carries a risk cue, and each must still reach the model
+_CASCADE_CASES = [
+    ("I am going to jump off the bridge tonight", SafetyTier.REVIEW),
+    ("I have been saving my sleeping tablets for a week", SafetyTier.REVIEW),
+    ("मैं अब और नहीं जी सकता", SafetyTier.REVIEW),
+    ("I bought a rope today, this is the last message you will get from me", SafetyTier.REVIEW),
+    ("yes", SafetyTier.REVIEW),
+    ("Thanks!", SafetyTier.PASS),
+    ("ok thank you", SafetyTier.PASS),
+    ("I keep thinking about suicide", SafetyTier.ESCALATE),
+]
+
+
+def _check_cascade():
+    for text, expected in _CASCADE_CASES:
+        tier = assess(text).tier
+        assert tier is expected, f"{text!r}: {tier.value} != {expected.value}"
+    print(f"safety cascade tiers: {len(_CASCADE_CASES)} cases ok")
+
+
+def _per_message_us(fn, messages: List[str]) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    _check_overlaps()
+    _check_cascade()
+    rng = random.Random(7)
+    messages = [rng.choice(_SAMPLE_MESSAGES) for _ in range(MESSAGES)]
+
+    print(f"{'patterns':>9} | {'build ms':>9} | {'scan us/msg':>11} | {'batch us/msg':>12} | {'legacy us/msg':>13}")
+    print("-" * 66)
+    for size in LEXICON_SIZES:
+        lexicon = _synthetic_lexicon(size, rng)
+        phrases = [phrase for group in lexicon.values() for phrase in group]
+
+        start = time.perf_counter()
+        matcher = CrisisMatcher(lexicon)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        legacy = [re.compile(r"\b" + re.escape(phrase) + r"\b") for phrase in phrases]
+
+        scan_us = _per_message_us(matcher.scan, messages)
+        start = time.perf_counter()
+        matcher.scan_batch(messages)
+        batch_us = (time.perf_counter() - start) / len(messages) * 1e6
+        legacy_us = _per_message_us(lambda text: _legacy_check(legacy, text), messages)
+
+        print(f"{matcher.size:>9} | {build_ms:>9.1f} | {scan_us:>11.2f} | {batch_us:>12.2f} | {legacy_us:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# Benchmark: SQLite session service append throughput, cold vs warm loads, cache bounds and failed commits
+# Run from withyou_system/: python -m benchmarks.bench_session_store
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from google.adk.events import Event
+from google.genai import types
+
+from core.session_store import SqliteSessionService
+
+APP = "bench"
+SESSIONS = 200
+EVENTS_PER_SESSION = 50
+HISTORY_EVENTS = 500
+
+
+def _event(text: str, author: str = "user") -> Event:
+    return Event(author=author, content=types.Content(role="user", parts=[types.Part(text=text)]))
+
+
+async def _append_many(service: SqliteSessionService, session_id: str, latencies: list):
+    session = await service.create_session(app_name=APP, user_id="u", session_id=session_id)
+    for i in range(EVENTS_PER_SESSION):
+        start = time.perf_counter()
+        await service.append_event(session, _event(f"turn {i}: I could not sleep again last night."))
+        latencies.append(time.perf_counter() - start)
+
+
+class _FailingCommits(SqliteSessionService):
+    """Fails the next `fail_next` group commits, as a full disk or I/O error would."""
+
+    fail_next = 0
+
+    def _execute_batch(self, statements):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise sqlite3.OperationalError("disk I/O error (simulated)")
+        super()._execute_batch(statements)
+
+
+async def _check_bounds_and_failures(tmp: str):
+    service = _FailingCommits(os.path.join(tmp, "bounded.db"), cache_size=16)
+    for i in range(200):
+        session = await service.create_session(app_name=APP, user_id=f"user-{i}", state={"user:name": f"n{i}"})
+        await service.append_event(session, _event("hello"))
+    stats = service.stats()
+    assert stats["cached_sessions"] == 16 and stats["cached_user_states"] <= 16, stats
+
+    session = await service.create_session(app_name=APP, user_id="fails", session_id="f", state={"user:mood": "low"})
+    await service.append_event(session, _event("first"))
+    service.fail_next = 1
+    event = _event("lost")
+    event.actions.state_delta = {"user:mood": "lost", "note": "lost"}
+    try:
+        await service.append_event(session, event)
+        raise AssertionError("the failed commit was not reported")
+    except sqlite3.OperationalError:
+        pass
+    reloaded = await service.get_session(app_name=APP, user_id="fails", session_id="f")
+    assert [e.content.parts[0].text for e in reloaded.events] == ["first"], reloaded.events
+    assert reloaded.state.get("user:mood") == "low" and "note" not in reloaded.state, reloaded.state
+    await service.flush()
+    service.close()
+    print(f"cache bounds:   {stats['cached_sessions']} sessions, {stats['cached_user_states']} user states "
+          f"cached after 200 users; failed commit reloaded from disk")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        await _check_bounds_and_failures(tmp)
+        db_path = os.path.join(tmp, "sessions.db")
+
+        service = SqliteSessionService(db_path)
+        latencies: list = []
+        start = time.perf_counter()
+        await asyncio.gather(*[_append_many(service, f"s{i}", latencies) for i in range(SESSIONS)])
+        elapsed = time.perf_counter() - start
+        total = SESSIONS * EVENTS_PER_SESSION
+        latencies.sort()
+        print(f"appends:        {total} events from {SESSIONS} concurrent sessions in {elapsed:.2f}s")
+        print(f"throughput:     {total / elapsed:,.0f} appends/s over {service.commits} commits "
+              f"({total / max(service.commits, 1):.1f} events/commit)")
+        print(f"under load:     append p50 {statistics.median(latencies) * 1e3:.2f} ms | "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms")
+
+        session = await service.create_session(app_name=APP, user_id="u", session_id="history")
+        single = []
+        for i in range(HISTORY_EVENTS):
+            start = time.perf_counter()
+            await service.append_event(session, _event(f"history turn {i}"))
+            single.append(time.perf_counter() - start)
+        single.sort()
+        print(f"uncontended:    p50 {statistics.median(single) * 1e3:.2f} ms | "
+              f"p99 {single[int(len(single) * 0.99)] * 1e3:.2f} ms per append")
+        await service.flush()
+        service.close()
+
+        # Fresh service (empty cache) per cold load; the median skips first-call warmup
+        cold_samples = []
+        for _ in range(5):
+            cold_service = SqliteSessionService(db_path)
+            start = time.perf_counter()
+            cold = await cold_service.get_session(app_name=APP, user_id="u", session_id="history")
+            cold_samples.append((time.perf_counter() - start) * 1e3)
+            cold_service.close()
+        cold_ms = statistics.median(cold_samples)
+
+        cold_service = SqliteSessionService(db_path)
+        await cold_service.get_session(app_name=APP, user_id="u", session_id="history")
+        runs = 100
+        start = time.perf_counter()
+        for _ in range(runs):
+            await cold_service.get_session(app_name=APP, user_id="u", session_id="history")
+        warm_ms = (time.perf_counter() - start) * 1e3 / runs
+        print(f"load ({len(cold.events)} events): cold {cold_ms:.2f} ms | warm {warm_ms:.3f} ms")
+        cold_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
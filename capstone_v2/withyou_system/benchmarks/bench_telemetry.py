@@ -0,0 +1,88 @@
+# Benchmark: event-loop cost of telemetry calls, queued pipeline vs synchronous logging
+# Run from withyou_system/: python -m benchmarks.bench_telemetry
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from core.telemetry import TelemetryPipeline
+
+EVENTS = 200_000
+TASKS = 200
+BURST = 5            # Events per task between awaits
+PAUSE_SECONDS = 0.01  # ~100k events/s offered across all tasks
+
+
+def _synchronous_logger(path: str) -> logging.Logger:
+    # The previous design: json.dumps + a logging handler write on the caller's thread
+    sync_logger = logging.getLogger("bench_sync")
+    sync_logger.propagate = False
+    sync_logger.setLevel(logging.INFO)
+    sync_logger.addHandler(logging.FileHandler(path))
+    return sync_logger
+
+
+async def _load(emit, lags: list):
+    """TASKS coroutines emit EVENTS records while a ticker measures loop lag."""
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    async def worker(worker_id: int):
+        for i in range(EVENTS // TASKS):
+            emit(worker_id, i)
+            if i % BURST == 0:
+                await asyncio.sleep(PAUSE_SECONDS)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(w) for w in range(TASKS)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    return elapsed
+
+
+def _report(name: str, elapsed: float, lags: list):
+    lags.sort()
+    print(f"{name:<12} | {EVENTS / elapsed:>10,.0f} | {statistics.median(lags) * 1e3:>8.2f} | "
+          f"{lags[int(len(lags) * 0.99)] * 1e3:>8.2f} | {lags[-1] * 1e3:>8.2f}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'pipeline':<12} | {'events/s':>10} | {'lag p50':>8} | {'lag p99':>8} | {'lag max':>8}  (ms)")
+        print("-" * 62)
+
+        lags: list = []
+        elapsed = asyncio.run(_load(lambda w, i: None, lags))
+        _report("no logging", elapsed, lags)
+
+        sync_logger = _synchronous_logger(os.path.join(tmp, "sync.log"))
+        lags = []
+        elapsed = asyncio.run(_load(
+            lambda w, i: sync_logger.info(json.dumps({"agent": "bench", "event": "LATENCY", "meta": {"w": w, "i": i}})),
+            lags,
+        ))
+        _report("synchronous", elapsed, lags)
+
+        pipeline = TelemetryPipeline(os.path.join(tmp, "logs"), console=False)
+        lags = []
+        elapsed = asyncio.run(_load(
+            lambda w, i: pipeline.emit(logging.INFO, "bench", "LATENCY", {"w": w, "i": i}), lags
+        ))
+        _report("queued", elapsed, lags)
+        pipeline.close()
+        # Bursts beyond the writer's throughput are shed, not queued without bound
+        print(f"\nqueued pipeline: {pipeline.stats()}")
+
+
+if __name__ == "__main__":
+    main()
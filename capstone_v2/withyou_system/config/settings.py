@@ -1,24 +1,178 @@
 # API Keys, Model Configs, Thresholds
 import os
-from google.genai import types
 
 # Safety thresholds are strict for mental health
-SAFETY_SETTINGS = [
-    types.SafetySetting(
-        category="HARM_CATEGORY_DANGEROUS_CONTENT",
-        threshold="BLOCK_LOW_AND_ABOVE"
-    ),
-    types.SafetySetting(
-        category="HARM_CATEGORY_SELF_HARM",
-        threshold="BLOCK_LOW_AND_ABOVE"
-    ),
-]
+SAFETY_THRESHOLDS = {
+    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_LOW_AND_ABOVE",
+    "HARM_CATEGORY_SELF_HARM": "BLOCK_LOW_AND_ABOVE",
+}
 
 MODEL_NAME = "gemini-1.5-pro-002" # High reasoning for therapy
 ROUTING_MODEL = "gemini-1.5-flash-002" # Fast for triage
+# Offline load testing: every model is a simulated backend (core/fake_llm.py)
+FAKE_LLM = os.getenv("WITHYOU_FAKE_LLM", "0") == "1"
 
-RETRY_CONFIG = types.HttpRetryOptions(
-    attempts=3,
-    exp_base=2,
-    http_status_codes=[429, 500, 503]
-)
\ No newline at end of file
+RETRY_ATTEMPTS = 3
+RETRY_EXP_BASE = 2
+RETRY_STATUS_CODES = (429, 500, 503)
+
+# Per-turn model tiering (core/model_tiers.py): these agents run on flash or
+# pro per turn; the safety sentinel, triage router and clinician bridge keep
+# their configured model.
+TIERED_AGENTS = frozenset({"cbt_coach", "behavioral_planner"})
+TIER_LONG_MESSAGE_WORDS = 40       # At or above: pro
+TIER_PRO_RISK_SCORE = 0.3          # Local risk score at or above: pro
+TIER_MIN_ROUTE_CONFIDENCE = 0.75   # Router less sure than this: pro
+TIER_PRO_TTFT_TARGET_MS = 2500.0   # Pro p90 time to first response above this: use flash
+TIER_LATENCY_WINDOW_SECONDS = 60.0
+TIER_LATENCY_SAMPLES = 200
+
+# Shared LLM scheduler (core/llm_scheduler.py): one token bucket per model.
+# RETRY_STATUS_CODES and RETRY_EXP_BASE shape its backoff; model clients
+# themselves do not retry.
+LLM_REQUESTS_PER_MINUTE = {
+    MODEL_NAME: float(os.getenv("WITHYOU_PRO_RPM", "360")),
+    ROUTING_MODEL: float(os.getenv("WITHYOU_FLASH_RPM", "1000")),
+}
+LLM_DEFAULT_RPM = 300.0
+LLM_BURST_SECONDS = 1.0            # Bucket depth, in seconds of the per-model rate
+LLM_CRISIS_RESERVE = 0.2           # Share of the bucket only the crisis lane may use
+LLM_MAX_ATTEMPTS = 5               # Per call, including the first
+LLM_MAX_BACKOFF_SECONDS = 30.0
+LLM_QUEUE_TIMEOUT_SECONDS = 60.0   # Normal lane only; crisis and bulk calls wait as long as it takes
+
+# Safety cascade: hard crisis keywords escalate without a model call; only
+# allowlisted acknowledgements ("ok", "thanks") skip the safety LLM. A risk
+# score at or above SAFETY_PASS_THRESHOLD marks a message as carrying risk
+# cues (kept verbatim by compaction, never served from the verdict cache).
+SAFETY_PASS_THRESHOLD = 0.2
+DEFAULT_LOCATION = "Global"
+
+APP_NAME = "withyou_wellness_system"
+# Start triage while the safety LLM is still screening; its output is held
+# until the verdict is SAFE and rolled back on ESCALATE_CRISIS.
+SPECULATIVE_TRIAGE = True
+
+# Local server front end (server.py)
+SERVER_HOST = os.getenv("WITHYOU_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("WITHYOU_PORT", "8080"))
+MAX_CONCURRENT_TURNS = 256   # Turns executing at once across all sessions
+MAX_QUEUED_TURNS = 4096      # Turns admitted but waiting; beyond this -> 503
+MAX_SESSION_QUEUE = 8        # Pending turns per session; beyond this -> 429
+
+# Local runtime state (sessions, stores, logs). Not checked in.
+STATE_DIR = os.getenv("WITHYOU_STATE_DIR", "state")
+SESSION_BACKEND = os.getenv("WITHYOU_SESSION_BACKEND", "sqlite")  # "sqlite" | "memory"
+SESSION_DB_PATH = os.path.join(STATE_DIR, "sessions.db")
+SESSION_CACHE_SIZE = 1024      # Hot sessions kept in memory (LRU)
+SESSION_WRITE_BATCH = 256      # Max appended events per commit
+MEMORY_TOP_K = 5               # Memories returned per load_memory query
+
+# Context compaction for agent runners: older turns fold into one summary
+COMPACTION_KEEP_TURNS = 6            # Most recent turns sent verbatim
+COMPACTION_SUMMARY_MAX_CHARS = 2000  # Rolling summary budget (newest lines kept)
+
+# Safety verdict cache: SAFE verdicts only, keyed on normalized text + safety-session digest.
+# Only messages this short and scoring below SAFETY_PASS_THRESHOLD are cached.
+VERDICT_CACHE_SIZE = 50_000
+VERDICT_CACHE_TTL_SECONDS = 3600
+VERDICT_CACHE_MAX_CHARS = 80
+
+# Local triage router: confident turns go straight to a specialist runner
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+ROUTER_TRAINING_PATH = os.path.join(DATA_DIR, "triage_transcripts.jsonl")
+ROUTER_CONFIDENCE_THRESHOLD = 0.6   # Below this, the LLM router (triage_agent) decides
+
+# Mood logs: per-user memory-mapped column files
+MOOD_STORE_DIR = os.path.join(STATE_DIR, "mood")
+
+# Nightly risk sweep over all mood histories (python -m core.risk_sweep)
+SWEEP_DIR = os.path.join(STATE_DIR, "sweep")
+SWEEP_WINDOW_DAYS = 14
+SWEEP_SHARDS = 64
+SWEEP_WORKERS = None          # None -> one process per CPU
+REVIEW_QUEUE_SIZE = 500
+SWEEP_QUIET_DAYS = 7.0        # No entry for longer: listed in went_quiet.jsonl instead of the review queue
+
+# PHQ-9 / GAD-7 administrations per user (core/assessments.py)
+ASSESSMENT_DB_PATH = os.path.join(STATE_DIR, "assessments.db")
+
+# Vetted crisis resources (versioned data file, hot-reloaded on change). The
+# only copy: capstone/withyou reads this file too.
+CRISIS_RESOURCES_PATH = os.path.join(DATA_DIR, "crisis_resources.json")
+CRISIS_RESOURCES_RELOAD_SECONDS = 5.0
+
+# Telemetry pipeline: queued on the hot path, written in batches by a background thread
+TELEMETRY_DIR = os.path.join(STATE_DIR, "logs")
+TELEMETRY_QUEUE_SIZE = 65536        # Routine events beyond this are dropped (audit events have 4x)
+TELEMETRY_MAX_BYTES = 50 * 1024 * 1024
+TELEMETRY_BACKUPS = 5
+TELEMETRY_FLUSH_SECONDS = 0.25
+TELEMETRY_CONSOLE = os.getenv("WITHYOU_LOG_CONSOLE", "1") == "1"   # Mirror records to stdout
+
+# PII redaction ahead of clinician handoff and log sinks
+PII_GAZETTEER_PATH = os.path.join(DATA_DIR, "pii_gazetteer.json")
+REDACTION_SESSIONS = 10_000         # Per-user placeholder tables kept in memory
+
+# Reminders set by schedule_routine (core/reminders.py). Times are the user's
+# local time in REMINDER_TIMEZONE; due reminders are appended to the outbox.
+REMINDER_DB_PATH = os.path.join(STATE_DIR, "reminders.db")
+REMINDER_OUTBOX_PATH = os.path.join(STATE_DIR, "reminder_outbox.jsonl")
+REMINDER_TIMEZONE = os.getenv("WITHYOU_TIMEZONE", "UTC")
+REMINDER_HORIZON_SECONDS = 300.0   # Reminders due this soon are held in memory
+REMINDER_TICK_SECONDS = 1.0
+REMINDER_GRACE_SECONDS = 900.0     # Missed by more than this (e.g. node down): skip to the next one
+
+# Crisis escalations for human review (core/escalations.py). One open case
+# per session; each reviewer tier gets ESCALATION_ACK_SLA_SECONDS to
+# acknowledge before the case moves to the next tier. Tiers are webhook URLs
+# (comma-separated, first tier first); without any, cases go to the JSONL queue.
+ESCALATION_DB_PATH = os.path.join(STATE_DIR, "escalations.db")
+ESCALATION_QUEUE_PATH = os.path.join(STATE_DIR, "escalation_queue.jsonl")
+ESCALATION_WEBHOOKS = tuple(url.strip() for url in os.getenv("WITHYOU_ESCALATION_WEBHOOKS", "").split(",") if url.strip())
+ESCALATION_WORKERS = 4
+ESCALATION_ACK_SLA_SECONDS = 300.0
+ESCALATION_RETRY_SECONDS = 5.0       # First retry after a failed delivery; doubles per attempt
+ESCALATION_MAX_ATTEMPTS = 3          # Failed deliveries before the case moves to the next tier
+ESCALATION_LEASE_SECONDS = 60.0      # A delivery not finished by then is retried (e.g. worker died)
+ESCALATION_COMMIT_WAIT_SECONDS = 5.0 # How long a turn waits, after its reply, for the case to be on disk
+ESCALATION_EXCERPT_CHARS = 500
+# Bearer token for POST /v1/escalations/{case_id}/ack|resolve; unset disables those endpoints
+ESCALATION_REVIEWER_TOKEN = os.getenv("WITHYOU_REVIEWER_TOKEN", "")
+
+# Bulk safety screening of message backlogs (python -m core.bulk_screen).
+# Messages the deterministic tiers cannot settle are packed into one prompt
+# until either limit is hit; the item limit bounds the JSON the model writes.
+BULK_SCREEN_PROMPT_TOKENS = 32_000  # Estimated message tokens per prompt
+BULK_SCREEN_MAX_ITEMS = 100         # Messages per prompt
+BULK_SCREEN_ITEM_CHARS = 4000       # Longer messages are screened as overlapping segments
+BULK_SCREEN_SEGMENT_OVERLAP = 400   # Chars each segment repeats from the one before
+BULK_SCREEN_CONCURRENCY = 8         # Prompts in flight
+# List prices in USD per million (prompt, output) tokens, for cost reports
+MODEL_PRICES_PER_MTOK = {
+    MODEL_NAME: (1.25, 5.00),
+    ROUTING_MODEL: (0.075, 0.30),
+}
+
+# Cold start: load agents, runners and SDKs before serving (core/startup.py)
+PREWARM_ON_START = os.getenv("WITHYOU_PREWARM", "1") == "1"
+
+
+def __getattr__(name):
+    # google-genai objects are built on first access, so importing settings
+    # does not load the SDK (about 0.7 s of a cold start).
+    if name == "SAFETY_SETTINGS":
+        from google.genai import types
+        value = [
+            types.SafetySetting(category=category, threshold=threshold)
+            for category, threshold in SAFETY_THRESHOLDS.items()
+        ]
+    elif name == "RETRY_CONFIG":
+        from google.genai import types
+        value = types.HttpRetryOptions(
+            attempts=RETRY_ATTEMPTS, exp_base=RETRY_EXP_BASE, http_status_codes=list(RETRY_STATUS_CODES)
+        )
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
@@ -0,0 +1,468 @@
+# PHQ-9 / GAD-7 scoring: vectorized totals and severity bands, per-user change, symptom pre-fill from text
+# Bulk import from withyou_system/: python -m core.assessments --input assessments.csv
+import csv
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.safety_guard import CrisisMatcher
+
+
+class Instrument(NamedTuple):
+    name: str
+    items: Tuple[str, ...]
+    band_floors: Tuple[int, ...]      # Lowest total in each band
+    bands: Tuple[str, ...]
+    max_missing: int                  # Up to this many unanswered items: total is prorated
+    reliable_change: int              # Smallest change in total treated as real
+    remission_below: int
+    flag_item: Optional[int] = None   # Index of an item that is flagged whenever it is above 0
+
+
+PHQ9 = Instrument(
+    name="PHQ-9",
+    items=(
+        "Little interest or pleasure in doing things",
+        "Feeling down, depressed, or hopeless",
+        "Trouble falling or staying asleep, or sleeping too much",
+        "Feeling tired or having little energy",
+        "Poor appetite or overeating",
+        "Feeling bad about yourself, or that you are a failure",
+        "Trouble concentrating on things",
+        "Moving or speaking slowly, or being fidgety or restless",
+        "Thoughts that you would be better off dead or of hurting yourself",
+    ),
+    band_floors=(0, 5, 10, 15, 20),
+    bands=("minimal", "mild", "moderate", "moderately severe", "severe"),
+    max_missing=2,
+    reliable_change=5,
+    remission_below=5,
+    flag_item=8,
+)
+
+GAD7 = Instrument(
+    name="GAD-7",
+    items=(
+        "Feeling nervous, anxious, or on edge",
+        "Not being able to stop or control worrying",
+        "Worrying too much about different things",
+        "Trouble relaxing",
+        "Being so restless that it is hard to sit still",
+        "Becoming easily annoyed or irritable",
+        "Feeling afraid as if something awful might happen",
+    ),
+    band_floors=(0, 5, 10, 15),
+    bands=("minimal", "mild", "moderate", "severe"),
+    max_missing=1,
+    reliable_change=4,
+    remission_below=5,
+)
+
+INSTRUMENTS: Dict[str, Instrument] = {"phq9": PHQ9, "gad7": GAD7}
+
+INCOMPLETE = -1   # Band code when too many items are unanswered
+
+# Change from the same user's previous complete administration. BASELINE
+# means there is nothing to compare: no earlier complete administration, or
+# this one is incomplete.
+BASELINE, IMPROVED, WORSENED, UNCHANGED = 0, 1, 2, 3
+CHANGE_LABELS = ("baseline", "improved", "worsened", "no reliable change")
+
+
+def instrument_for(name: str) -> Instrument:
+    key = re.sub(r"[^a-z0-9]", "", name.lower())
+    if key not in INSTRUMENTS:
+        raise ValueError(f"Unknown instrument {name!r}; use PHQ-9 or GAD-7.")
+    return INSTRUMENTS[key]
+
+
+class Scores(NamedTuple):
+    totals: np.ndarray     # float; prorated when items are missing, NaN when incomplete
+    bands: np.ndarray      # int8 index into instrument.bands, INCOMPLETE when incomplete
+    answered: np.ndarray   # int8 items answered
+    flagged: np.ndarray    # bool; the instrument's flag item is above 0
+
+    def band_labels(self, instrument: Instrument) -> List[str]:
+        labels = np.array(instrument.bands + ("incomplete",), dtype=object)
+        return labels[self.bands].tolist()   # INCOMPLETE (-1) picks the last label
+
+
+def score(instrument: Instrument, answers) -> Scores:
+    """
+    Scores one administration (shape (items,)) or many (shape (n, items)).
+    Answers are 0-3; NaN (or -1) marks an unanswered item. Totals with up to
+    `instrument.max_missing` unanswered items are prorated and rounded;
+    beyond that they are NaN and the band is INCOMPLETE.
+    """
+    values = np.array(answers, dtype=np.float32, ndmin=2)
+    if values.shape[1] != len(instrument.items):
+        raise ValueError(f"{instrument.name} has {len(instrument.items)} items, got {values.shape[1]}")
+    values[values == -1] = np.nan
+    answered_mask = ~np.isnan(values)
+    valid = values[answered_mask]
+    if valid.size and ((valid < 0).any() or (valid > 3).any() or (valid != np.round(valid)).any()):
+        raise ValueError(f"{instrument.name} answers must be whole numbers from 0 to 3")
+
+    count = len(instrument.items)
+    answered = answered_mask.sum(axis=1)
+    raw = np.where(answered_mask, values, 0.0).sum(axis=1)
+    totals = np.round(raw * count / np.maximum(answered, 1))
+    complete = answered >= count - instrument.max_missing
+    totals = np.where(complete, totals, np.nan)
+
+    bands = np.searchsorted(np.asarray(instrument.band_floors), np.where(complete, totals, 0), side="right") - 1
+    bands = np.where(complete, bands, INCOMPLETE).astype(np.int8)
+    if instrument.flag_item is None:
+        flagged = np.zeros(len(values), dtype=bool)
+    else:
+        flagged = np.nan_to_num(values[:, instrument.flag_item]) > 0
+    return Scores(totals, bands, answered.astype(np.int8), flagged)
+
+
+class Changes(NamedTuple):
+    previous: np.ndarray   # The user's prior total (NaN at baseline)
+    change: np.ndarray     # total - previous
+    status: np.ndarray     # int8 index into CHANGE_LABELS
+    response: np.ndarray   # bool; at least a 50% drop from the previous total
+    remission: np.ndarray  # bool; total below instrument.remission_below
+
+
+def track_changes(
+    instrument: Instrument,
+    user_ids: Sequence[str],
+    administered_at: Sequence[float],
+    totals: np.ndarray,
+    prior: Optional[Dict[str, float]] = None,
+) -> Changes:
+    """
+    Change from each user's previous administration, for a batch in any
+    order. Rows are sorted by (user, time) once; each row's previous total
+    is the latest complete row before it for the same user, or
+    `prior[user]` (e.g. from the store) when there is none in the batch.
+    Results are in the input order.
+    """
+    users, codes = np.unique(np.asarray(user_ids, dtype=object).astype(str), return_inverse=True)
+    when = np.asarray(administered_at, dtype=np.float64)
+    totals = np.asarray(totals, dtype=np.float64)
+    order = np.lexsort((when, codes))
+    sorted_codes = codes[order]
+    sorted_totals = totals[order]
+
+    positions = np.arange(len(order))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    group_start = np.maximum.accumulate(np.where(first, positions, 0))
+    # Position of the latest complete row strictly before each row (-1 if none)
+    last_complete = np.maximum.accumulate(np.where(np.isnan(sorted_totals), -1, positions))
+    before = np.full(len(order), -1)
+    before[1:] = last_complete[:-1]
+    in_group = before >= group_start
+    prior_by_code = np.array([(prior or {}).get(user, np.nan) for user in users], dtype=np.float64)
+    previous = np.where(in_group, sorted_totals[np.maximum(before, 0)], prior_by_code[sorted_codes])
+
+    change = sorted_totals - previous
+    status = np.full(len(order), UNCHANGED, dtype=np.int8)
+    status[change <= -instrument.reliable_change] = IMPROVED
+    status[change >= instrument.reliable_change] = WORSENED
+    status[np.isnan(change)] = BASELINE
+    with np.errstate(invalid="ignore"):
+        response = (previous > 0) & (sorted_totals <= previous / 2)
+        remission = sorted_totals < instrument.remission_below
+
+    unsorted = np.empty_like(order)
+    unsorted[order] = np.arange(len(order))
+    return Changes(previous[unsorted], change[unsorted], status[unsorted], response[unsorted], remission[unsorted])
+
+
+# --- Free-text pre-fill ------------------------------------------------------------
+
+# Phrases that suggest a questionnaire item, as (instrument key, item index).
+# Contractions are also matched without the apostrophe.
+SYMPTOM_PHRASES: Dict[str, Tuple[Tuple[str, int], ...]] = {}
+
+
+def _symptoms(key: str, item: int, *phrases: str):
+    for phrase in phrases:
+        for variant in {phrase, phrase.replace("'", "")}:
+            SYMPTOM_PHRASES[variant] = SYMPTOM_PHRASES.get(variant, ()) + ((key, item),)
+
+
+_symptoms("phq9", 0, "lost interest", "no interest", "don't enjoy", "can't enjoy", "nothing is fun",
+          "no pleasure", "don't care about anything", "no motivation")
+_symptoms("phq9", 1, "depressed", "feeling down", "feel down", "hopeless", "feeling low", "feel low",
+          "sad all the time", "empty inside")
+_symptoms("phq9", 2, "can't sleep", "cannot sleep", "insomnia", "trouble sleeping", "can't fall asleep",
+          "waking up at night", "wake up at night", "sleeping too much", "oversleeping", "sleep all day")
+_symptoms("phq9", 3, "tired", "exhausted", "no energy", "low energy", "fatigue", "fatigued", "drained")
+_symptoms("phq9", 4, "no appetite", "lost my appetite", "poor appetite", "not eating", "overeating",
+          "eating too much", "binge eating", "skipping meals")
+_symptoms("phq9", 5, "failure", "worthless", "useless", "hate myself", "let everyone down", "guilty")
+_symptoms("phq9", 6, "can't concentrate", "can't focus", "trouble concentrating", "hard to focus",
+          "hard to concentrate", "brain fog", "distracted")
+_symptoms("phq9", 7, "moving slowly", "slowed down", "restless", "fidgety", "can't sit still")
+_symptoms("phq9", 8, "better off dead", "better off without me", "hurt myself", "hurting myself",
+          "self harm", "self-harm", "want to die", "kill myself", "suicidal", "no reason to live")
+_symptoms("gad7", 0, "anxious", "anxiety", "nervous", "on edge", "panic", "panicking", "heart racing",
+          "racing heart", "shaking", "sweating")
+_symptoms("gad7", 1, "can't stop worrying", "constant worry", "constantly worried", "worrying all the time",
+          "can't control my worry")
+_symptoms("gad7", 2, "worry about everything", "worrying about everything", "worry too much", "overthinking")
+_symptoms("gad7", 3, "can't relax", "trouble relaxing", "tense", "wound up", "can't switch off")
+_symptoms("gad7", 4, "restless", "can't sit still", "fidgety")
+_symptoms("gad7", 5, "irritable", "easily annoyed", "snapping at", "short tempered", "short-tempered")
+_symptoms("gad7", 6, "something awful", "something terrible", "sense of doom", "dread", "afraid")
+
+# How often, from the same sentence: 0-3 on the questionnaires' scale
+FREQUENCY_PHRASES: Dict[str, int] = {
+    "sometimes": 1, "a few days": 1, "several days": 1, "occasionally": 1, "now and then": 1, "lately": 1,
+    "most days": 2, "more than half the days": 2, "often": 2, "a lot": 2, "frequently": 2,
+    "every day": 3, "everyday": 3, "nearly every day": 3, "all the time": 3, "constantly": 3, "always": 3,
+}
+_DEFAULT_FREQUENCY = 1   # Mentioned without saying how often
+
+_symptom_matcher = CrisisMatcher({"symptoms": list(SYMPTOM_PHRASES)})
+_frequency_matcher = CrisisMatcher({"frequency": list(FREQUENCY_PHRASES)})
+_symptom_items = {" ".join(phrase.lower().split()): items for phrase, items in SYMPTOM_PHRASES.items()}
+_SENTENCE_END = re.compile(r"[.!?;\n]+")
+
+# A cue within a few words before a symptom, in the same clause, cancels it:
+# "I'd never hurt myself", "I'm not suicidal", "I don't want to die".
+# Uncertainty in the clause ("I'm not sure I won't hurt myself") keeps it.
+_CLAUSE_BREAK = re.compile(r"[.!?;,:\n]+|\b(?:but|though|although|however|except)\b", re.IGNORECASE)
+_NEGATIONS = frozenset("never not don't dont didn't won't wouldn't isn't wasn't aren't".split())
+_NEGATION_WINDOW = 3
+_UNSURE = re.compile(r"\b(?:not sure|unsure|not certain|don'?t know|can'?t promise)\b", re.IGNORECASE)
+_WORD = re.compile(r"[\w']+")
+
+
+def _negated(text: str, breaks: List[int], start: int) -> bool:
+    clause = breaks[bisect_right(breaks, start) - 1] if breaks and breaks[0] <= start else 0
+    before = text[clause:start].replace("\u2019", "'")
+    if _UNSURE.search(before):
+        return False
+    return any(word.lower() in _NEGATIONS for word in _WORD.findall(before)[-_NEGATION_WINDOW:])
+
+
+def extract_items(text: str) -> Dict[str, Dict[int, int]]:
+    """
+    Suggested answers from free text: {"phq9": {item: 0-3}, "gad7": {...}}.
+    Each item mentioned is scored from a frequency phrase in the same
+    sentence ("every day" -> 3), else 1. A mention negated in its own clause
+    ("I'd never hurt myself") does not count. Items not mentioned are left
+    out, so totals built from these are lower bounds.
+    """
+    ends = [match.end() for match in _SENTENCE_END.finditer(text)]
+    breaks = [match.end() for match in _CLAUSE_BREAK.finditer(text)]
+    sentence_frequency: Dict[int, int] = {}
+    for match in _frequency_matcher.scan(text):
+        sentence = bisect_right(ends, match.start)
+        sentence_frequency[sentence] = max(sentence_frequency.get(sentence, 0), FREQUENCY_PHRASES[match.phrase])
+
+    found: Dict[str, Dict[int, int]] = {key: {} for key in INSTRUMENTS}
+    for match in _symptom_matcher.scan(text):
+        if _negated(text, breaks, match.start):
+            continue
+        value = sentence_frequency.get(bisect_right(ends, match.start), _DEFAULT_FREQUENCY)
+        for key, item in _symptom_items.get(match.phrase, ()):
+            found[key][item] = max(found[key].get(item, 0), value)
+    return found
+
+
+def prefill(instrument: Instrument, suggested: Dict[int, int]) -> np.ndarray:
+    """Answers array with suggested items filled in and the rest NaN."""
+    answers = np.full(len(instrument.items), np.nan, dtype=np.float32)
+    for item, value in suggested.items():
+        answers[item] = value
+    return answers
+
+
+# --- History store and bulk import -------------------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    user_id TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    administered_at REAL NOT NULL,
+    answers TEXT NOT NULL,          -- encode_answers: "3210-2103"
+    total REAL,
+    band INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assessments_by_user ON assessments (user_id, instrument, administered_at);
+"""
+
+_PRIOR_CHUNK = 400   # Users per prior-total lookup
+
+
+def encode_answers(answers) -> np.ndarray:
+    """Rows of answers as digit strings, "-" for unanswered ("3210-2103"), without a per-item loop."""
+    values = np.array(answers, dtype=np.float32, ndmin=2)
+    codes = np.where(np.isnan(values) | (values < 0), ord("-"), values + ord("0")).astype(np.uint8)
+    return np.ascontiguousarray(codes).view(f"S{values.shape[1]}").ravel().astype(str)
+
+
+def decode_answers(text: str) -> np.ndarray:
+    return np.array([np.nan if char == "-" else int(char) for char in text], dtype=np.float32)
+
+
+class ScoredBatch(NamedTuple):
+    scores: Scores
+    changes: Changes
+
+
+class AssessmentStore:
+    """
+    Administrations per user, so change is measured against the last one
+    even when it came from an earlier upload. Batches are scored and
+    compared in NumPy; SQLite supplies only each user's latest prior total
+    (one indexed lookup per user) and takes the rows in one transaction.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _prior_totals(self, instrument: Instrument, user_ids: np.ndarray, when: np.ndarray) -> Dict[str, float]:
+        """Each user's latest stored total before their earliest administration in the batch."""
+        users, codes = np.unique(user_ids, return_inverse=True)
+        earliest = np.full(len(users), np.inf)
+        np.minimum.at(earliest, codes, when)
+        prior: Dict[str, float] = {}
+        for start in range(0, len(users), _PRIOR_CHUNK):
+            chunk = list(zip(users[start:start + _PRIOR_CHUNK].tolist(), earliest[start:start + _PRIOR_CHUNK].tolist()))
+            values = ",".join("(?, ?)" for _ in chunk)
+            query = (
+                f"WITH batch(user_id, first_at) AS (VALUES {values}) "
+                "SELECT b.user_id, (SELECT a.total FROM assessments a WHERE a.user_id = b.user_id"
+                " AND a.instrument = ? AND a.administered_at < b.first_at AND a.total IS NOT NULL"
+                " ORDER BY a.administered_at DESC LIMIT 1) FROM batch b"
+            )
+            params = [value for pair in chunk for value in pair] + [instrument.name]
+            for user_id, total in self._conn.execute(query, params):
+                if total is not None:
+                    prior[user_id] = total
+        return prior
+
+    def add_batch(
+        self, instrument: Instrument, user_ids: Sequence[str], administered_at: Sequence[float], answers
+    ) -> ScoredBatch:
+        scores = score(instrument, answers)
+        user_array = np.asarray(user_ids, dtype=object).astype(str)
+        when = np.asarray(administered_at, dtype=np.float64)
+        with self._lock:
+            prior = self._prior_totals(instrument, user_array, when)
+            changes = track_changes(instrument, user_array, when, scores.totals, prior)
+            rows = zip(
+                user_array.tolist(),
+                when.tolist(),
+                encode_answers(answers).tolist(),
+                (None if np.isnan(total) else total for total in scores.totals.tolist()),
+                scores.bands.tolist(),
+            )
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO assessments (user_id, instrument, administered_at, answers, total, band)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    ((user_id, instrument.name, at, encoded, total, band)
+                     for user_id, at, encoded, total, band in rows),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return ScoredBatch(scores, changes)
+
+    def add(self, instrument: Instrument, user_id: str, answers, administered_at: Optional[float] = None) -> ScoredBatch:
+        return self.add_batch(instrument, [user_id], [time.time() if administered_at is None else administered_at], [answers])
+
+
+_store: Optional[AssessmentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_assessment_store() -> AssessmentStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            from config.settings import ASSESSMENT_DB_PATH
+            _store = AssessmentStore(ASSESSMENT_DB_PATH)
+        return _store
+
+
+def read_csv(path: str) -> Dict[str, Tuple[List[str], List[float], np.ndarray]]:
+    """
+    Clinic export: user_id, administered_at (epoch seconds or ISO 8601),
+    instrument, then item_1 ... item_9 (blank = unanswered; GAD-7 uses the
+    first 7). Returns rows grouped by instrument key.
+    """
+    from datetime import datetime
+
+    grouped: Dict[str, Tuple[List[str], List[float], List[List[float]]]] = {}
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            key = re.sub(r"[^a-z0-9]", "", row["instrument"].lower())
+            instrument = instrument_for(key)
+            stamp = row["administered_at"].strip()
+            try:
+                when = float(stamp)
+            except ValueError:
+                when = datetime.fromisoformat(stamp).timestamp()
+            items = [row.get(f"item_{i + 1}", "").strip() for i in range(len(instrument.items))]
+            users, times, answers = grouped.setdefault(key, ([], [], []))
+            users.append(row["user_id"])
+            times.append(when)
+            answers.append([float(value) if value else np.nan for value in items])
+    return {key: (users, times, np.array(answers, dtype=np.float32)) for key, (users, times, answers) in grouped.items()}
+
+
+def import_assessments(path: str, store: AssessmentStore, batch_size: int = 50_000) -> Dict[str, Dict[str, object]]:
+    """Scores and stores a clinic CSV; returns per-instrument counts by band and change."""
+    summary: Dict[str, Dict[str, object]] = {}
+    for key, (users, times, answers) in read_csv(path).items():
+        instrument = INSTRUMENTS[key]
+        bands = np.zeros(len(instrument.bands) + 1, dtype=np.int64)
+        changes = np.zeros(len(CHANGE_LABELS), dtype=np.int64)
+        flagged = 0
+        # Time order across batches, so each batch's prior totals are already stored
+        order = np.argsort(np.asarray(times), kind="stable")
+        for start in range(0, len(order), batch_size):
+            index = order[start:start + batch_size]
+            batch = store.add_batch(instrument, [users[i] for i in index], [times[i] for i in index], answers[index])
+            bands += np.bincount(batch.scores.bands + 1, minlength=len(bands))
+            changes += np.bincount(batch.changes.status, minlength=len(changes))
+            flagged += int(batch.scores.flagged.sum())
+        summary[instrument.name] = {
+            "administrations": len(users),
+            "bands": dict(zip(("incomplete",) + instrument.bands, bands.tolist())),
+            "changes": dict(zip(CHANGE_LABELS, changes.tolist())),
+            "flagged": flagged,
+        }
+    return summary
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    import argparse
+
+    from config.settings import ASSESSMENT_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Score and store a clinic's historical PHQ-9/GAD-7 export.")
+    parser.add_argument("--input", required=True, help="CSV: user_id, administered_at, instrument, item_1..item_9")
+    parser.add_argument("--db", default=ASSESSMENT_DB_PATH)
+    args = parser.parse_args(argv)
+    print(json.dumps(import_assessments(args.input, AssessmentStore(args.db)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+# Bulk safety screening of message backlogs: crisis keywords, then packed multi-message prompts
+# Run from withyou_system/: python -m core.bulk_screen --input backlog.jsonl --out verdicts.jsonl
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from config.settings import (
+    BULK_SCREEN_CONCURRENCY,
+    BULK_SCREEN_ITEM_CHARS,
+    BULK_SCREEN_MAX_ITEMS,
+    BULK_SCREEN_PROMPT_TOKENS,
+    BULK_SCREEN_SEGMENT_OVERLAP,
+    MODEL_NAME,
+    MODEL_PRICES_PER_MTOK,
+)
+from core.llm_scheduler import bulk_priority
+from core.safety_guard import CRISIS_MATCHER
+from core.telemetry import log_agent_action
+
+SAFE = "SAFE"
+ESCALATE = "ESCALATE_CRISIS"
+
+# How each verdict was reached, recorded with it
+KEYWORD = "keyword"            # Hard crisis keyword (run_pre_computation_safety_check)
+MODEL = "model"
+MODEL_BLOCKED = "model_blocked"  # The model would not answer for this message alone: fail closed
+
+SCREEN_INSTRUCTION = """
+You are the Safety Sentinel for 'withyou', screening a backlog of past messages.
+Each input line is one message as JSON: {"id": <number>, "text": <message>}.
+
+For every message, independently decide whether it shows a safety risk:
+suicidal ideation, self-harm, harm to others, or abuse.
+
+Reply with JSON only: {"results": [{"id": <number>, "risk": true or false}, ...]}
+with exactly one entry for every input id. Do not answer the messages.
+"""
+
+_CHARS_PER_TOKEN = 4
+_INSTRUCTION_TOKENS = len(SCREEN_INSTRUCTION) // _CHARS_PER_TOKEN
+_OUTPUT_TOKENS_PER_ITEM = 12   # {"id": 37, "risk": false},
+
+
+class ScreenItem(NamedTuple):
+    id: str
+    text: str
+
+
+class Segment(NamedTuple):
+    item: ScreenItem
+    part: int     # 1-based
+    parts: int
+    text: str
+
+
+class ScreenSummary(NamedTuple):
+    messages: int
+    resumed: int          # Already in the output file from an earlier run
+    keyword: int
+    model_screened: int
+    escalated: int        # This run, all tiers
+    failed: int           # Not screened (model errors); rerun to resume
+    model_calls: int
+    prompt_tokens: int
+    output_tokens: int
+    cost_usd: float
+    seconds: float
+    messages_per_minute: float
+    out_path: str
+
+
+def read_messages(path: str) -> Iterator[ScreenItem]:
+    """JSONL of {"id": ..., "text": ...}; lines without an id use their line number."""
+    with open(path, encoding="utf-8") as handle:
+        for number, line in enumerate(handle, 1):
+            if line.strip():
+                record = json.loads(line)
+                yield ScreenItem(str(record.get("id", number)), record["text"])
+
+
+def load_checkpoint(out_path: str) -> Set[str]:
+    """
+    Ids already screened. The output file is the checkpoint: each finished
+    prompt appends its verdicts, so anything written survives a crash. A
+    torn last line (killed mid-write) is cut off and rescreened.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(out_path):
+        return done
+    good = 0
+    with open(out_path, "rb") as handle:
+        for line in handle:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError):
+                break
+            good += len(line)
+    if good < os.path.getsize(out_path):
+        with open(out_path, "r+b") as handle:
+            handle.truncate(good)
+    return done
+
+
+def split(item: ScreenItem, limit: int = BULK_SCREEN_ITEM_CHARS, overlap: int = BULK_SCREEN_SEGMENT_OVERLAP) -> List[Segment]:
+    """
+    Nothing is cut: a message longer than `limit` becomes segments of
+    `limit` chars, each starting `overlap` chars before the previous one
+    ends, so a sentence shorter than the overlap is whole in some segment.
+    """
+    text = item.text
+    if len(text) <= limit:
+        return [Segment(item, 1, 1, text)]
+    step = limit - overlap
+    starts = range(0, len(text) - overlap, step)
+    return [Segment(item, part, len(starts), text[start:start + limit]) for part, start in enumerate(starts, 1)]
+
+
+def _item_line(index: int, segment: Segment) -> str:
+    return json.dumps({"id": index, "text": segment.text}, ensure_ascii=False)
+
+
+def pack(segments: Sequence[Segment], max_tokens: int, max_items: int) -> List[List[Segment]]:
+    """Greedy, in input order: a prompt is closed when the next segment would overflow it."""
+    batches: List[List[Segment]] = []
+    batch: List[Segment] = []
+    tokens = 0
+    for segment in segments:
+        cost = len(_item_line(len(batch) + 1, segment)) // _CHARS_PER_TOKEN + 1
+        if batch and (tokens + cost > max_tokens or len(batch) >= max_items):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(segment)
+        tokens += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def parse_verdicts(text: str, size: int) -> Dict[int, bool]:
+    """
+    Index (1-based, as in the prompt) -> risk, for the entries that parse.
+    Anything malformed is dropped, so the caller rescreens those messages.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").partition("\n")[2]
+    try:
+        results = json.loads(text).get("results", [])
+    except (ValueError, AttributeError):
+        return {}
+    verdicts: Dict[int, bool] = {}
+    for entry in results if isinstance(results, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        index, risk = entry.get("id"), entry.get("risk")
+        if isinstance(index, int) and 1 <= index <= size and isinstance(risk, bool):
+            verdicts[index] = risk
+    return verdicts
+
+
+class BulkScreener:
+    """
+    Screens a backlog, tuned for messages per minute and per dollar rather
+    than latency:
+
+    1. One crisis-keyword pass over the whole backlog (CRISIS_MATCHER.scan_batch,
+       the batched form of run_pre_computation_safety_check) escalates hits.
+       These are the only verdicts reached without the model; a low local
+       risk score is not evidence that a message is safe.
+    2. Everything else is packed into JSONL prompts of up to BULK_SCREEN_MAX_ITEMS
+       messages / BULK_SCREEN_PROMPT_TOKENS tokens, so the instruction is
+       paid once per prompt. Verdicts come back keyed by the item's index.
+       A message longer than BULK_SCREEN_ITEM_CHARS goes in as overlapping
+       segments (see `split`), each its own item: it is escalated as soon
+       as any segment is flagged and SAFE only once every segment was
+       screened.
+
+    Segments missing from a reply, or in a prompt the model refused, are
+    rescreened in halves until each one has a verdict; one the model still
+    refuses on its own is escalated. Calls go through the shared scheduler
+    on its bulk lane, so a backlog never delays live turns.
+    """
+
+    def __init__(
+        self,
+        out_path: str,
+        model_name: str = MODEL_NAME,
+        concurrency: int = BULK_SCREEN_CONCURRENCY,
+        prompt_tokens: int = BULK_SCREEN_PROMPT_TOKENS,
+        max_items: int = BULK_SCREEN_MAX_ITEMS,
+    ):
+        self.out_path = out_path
+        self.model_name = model_name
+        self.prompt_tokens = prompt_tokens
+        self.max_items = max_items
+        self.counts = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "escalated": 0, "failed": 0}
+        self._slots = asyncio.Semaphore(concurrency)
+        self._screened: Dict[str, int] = {}   # Message id -> segments with a verdict
+        self._settled: Set[str] = set()       # Message ids with a verdict written
+        self._unscreened: Set[str] = set()    # Message ids with a segment lost to model errors
+
+    async def run(self, messages: Iterable[ScreenItem]) -> ScreenSummary:
+        started = time.perf_counter()
+        done = load_checkpoint(self.out_path)
+        items, seen = [], set(done)
+        for item in messages:
+            if item.id not in seen:
+                seen.add(item.id)
+                items.append(item)
+        resumed = len(seen) - len(items)
+
+        records, review = self._keyword_hits(items)
+        self._append(records)
+
+        segments = [segment for item in review for segment in split(item)]
+        batches = pack(segments, self.prompt_tokens, self.max_items)
+        with bulk_priority():
+            await asyncio.gather(*(self._run_batch(batch) for batch in batches))
+        self.counts["failed"] = len(self._unscreened - self._settled)
+
+        seconds = time.perf_counter() - started
+        prompt_price, output_price = MODEL_PRICES_PER_MTOK.get(self.model_name, (0.0, 0.0))
+        summary = ScreenSummary(
+            messages=len(seen),
+            resumed=resumed,
+            keyword=len(records),
+            model_screened=len(review) - self.counts["failed"],
+            escalated=self.counts["escalated"] + len(records),
+            failed=self.counts["failed"],
+            model_calls=self.counts["calls"],
+            prompt_tokens=self.counts["prompt_tokens"],
+            output_tokens=self.counts["output_tokens"],
+            cost_usd=round(
+                (self.counts["prompt_tokens"] * prompt_price + self.counts["output_tokens"] * output_price) / 1e6, 4
+            ),
+            seconds=round(seconds, 2),
+            messages_per_minute=round(len(items) / seconds * 60, 1) if seconds else 0.0,
+            out_path=self.out_path,
+        )
+        log_agent_action("bulk_screen", "SCREENED", summary._asdict())
+        return summary
+
+    def _keyword_hits(self, items: List[ScreenItem]) -> Tuple[List[dict], List[ScreenItem]]:
+        records, review = [], []
+        hits = CRISIS_MATCHER.scan_batch([item.text for item in items])
+        for item, matches in zip(items, hits):
+            if matches:
+                records.append(_record(item, ESCALATE, KEYWORD, 1.0))
+            else:
+                review.append(item)
+        return records, review
+
+    async def _run_batch(self, batch: List[Segment]):
+        try:
+            verdicts = await self._screen(batch)
+        except Exception as error:
+            # Left out of the checkpoint, so the next run picks these up
+            self._unscreened.update(segment.item.id for segment in batch)
+            log_agent_action("bulk_screen", "BATCH_FAILED", {"segments": len(batch), "error": repr(error)})
+            return
+        self._append(self._settle(verdicts))
+
+    def _settle(self, verdicts: List[Tuple[Segment, str, str]]) -> List[dict]:
+        """Message records for the segment verdicts that decide a message."""
+        records = []
+        for segment, verdict, source in verdicts:
+            item = segment.item
+            if item.id in self._settled:
+                continue
+            screened = self._screened[item.id] = self._screened.get(item.id, 0) + 1
+            if verdict == ESCALATE:
+                self.counts["escalated"] += 1
+            elif screened < segment.parts:
+                continue
+            self._settled.add(item.id)
+            self._screened.pop(item.id, None)
+            records.append(_record(item, verdict, source))
+        return records
+
+    async def _screen(self, batch: List[Segment]) -> List[Tuple[Segment, str, str]]:
+        async with self._slots:
+            verdicts = await self._call(batch)
+        results = [
+            (segment, ESCALATE if verdicts[index] else SAFE, MODEL)
+            for index, segment in enumerate(batch, 1)
+            if index in verdicts
+        ]
+        missing = [segment for index, segment in enumerate(batch, 1) if index not in verdicts]
+        if not missing:
+            return results
+        if len(batch) == 1:
+            return [(batch[0], ESCALATE, MODEL_BLOCKED)]
+        middle = (len(missing) + 1) // 2
+        halves = [half for half in (missing[:middle], missing[middle:]) if half]
+        for part in await asyncio.gather(*(self._screen(half) for half in halves)):
+            results.extend(part)
+        return results
+
+    async def _call(self, batch: List[Segment]) -> Dict[int, bool]:
+        from google.adk.models.llm_request import LlmRequest
+        from google.genai import types
+
+        from config.settings import SAFETY_SETTINGS
+        from core.registry import registry
+
+        prompt = "\n".join(_item_line(index, segment) for index, segment in enumerate(batch, 1))
+        request = LlmRequest(
+            model=self.model_name,
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+            config=types.GenerateContentConfig(
+                system_instruction=SCREEN_INSTRUCTION,
+                temperature=0.0,
+                response_mime_type="application/json",
+                response_schema=_response_schema(),
+                max_output_tokens=max(256, 2 * _OUTPUT_TOKENS_PER_ITEM * len(batch)),
+                safety_settings=SAFETY_SETTINGS,
+            ),
+        )
+        text, usage = "", None
+        async for response in registry.model(self.model_name).generate_content_async(request):
+            if response.content is not None:
+                text += "".join(part.text or "" for part in response.content.parts or [])
+            usage = response.usage_metadata or usage
+        self.counts["calls"] += 1
+        if usage is not None and usage.prompt_token_count:
+            self.counts["prompt_tokens"] += usage.prompt_token_count
+            self.counts["output_tokens"] += usage.candidates_token_count or 0
+        else:
+            self.counts["prompt_tokens"] += _INSTRUCTION_TOKENS + len(prompt) // _CHARS_PER_TOKEN
+            self.counts["output_tokens"] += len(text) // _CHARS_PER_TOKEN
+        # A refused prompt (error_code set, no text) parses to {} and is split
+        return parse_verdicts(text, len(batch))
+
+    def _append(self, records: List[dict]):
+        if not records:
+            return
+        with open(self.out_path, "a", encoding="utf-8") as handle:
+            handle.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+def _record(item: ScreenItem, verdict: str, source: str, score: Optional[float] = None) -> dict:
+    return {"id": item.id, "verdict": verdict, "source": source, "score": score}
+
+
+def _response_schema():
+    from google.genai import types
+
+    return types.Schema(
+        type=types.Type.OBJECT,
+        properties={"results": types.Schema(
+            type=types.Type.ARRAY,
+            items=types.Schema(
+                type=types.Type.OBJECT,
+                properties={"id": types.Schema(type=types.Type.INTEGER), "risk": types.Schema(type=types.Type.BOOLEAN)},
+                required=["id", "risk"],
+            ),
+        )},
+        required=["results"],
+    )
+
+
+async def screen_backlog(messages: Iterable[ScreenItem], out_path: str, **options) -> ScreenSummary:
+    """
+    Screens `messages` and appends one verdict per message to `out_path`
+    (JSONL: id, verdict, source, score; in completion order, not input
+    order). Rerunning with the same `out_path` skips what is already there.
+    """
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    return await BulkScreener(out_path, **options).run(messages)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Safety-screen a backlog of messages (JSONL of id, text).")
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--out", required=True, help="Verdicts JSONL; also the checkpoint for resuming")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--concurrency", type=int, default=BULK_SCREEN_CONCURRENCY)
+    parser.add_argument("--prompt-tokens", type=int, default=BULK_SCREEN_PROMPT_TOKENS)
+    parser.add_argument("--max-items", type=int, default=BULK_SCREEN_MAX_ITEMS)
+    args = parser.parse_args(argv)
+    summary = asyncio.run(screen_backlog(
+        read_messages(args.input), args.out, model_name=args.model, concurrency=args.concurrency,
+        prompt_tokens=args.prompt_tokens, max_items=args.max_items,
+    ))
+    print(json.dumps(summary._asdict(), indent=2))
+    if summary.failed:
+        raise SystemExit(f"{summary.failed} messages were not screened; rerun the same command to resume.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# Rolling context compaction for long-running sessions
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.genai import types
+
+from config.settings import SAFETY_PASS_THRESHOLD
+from core.safety_cascade import score_risk
+from core.safety_guard import run_pre_computation_safety_check
+from core.telemetry import log_agent_action
+
+SUMMARY_AUTHOR = "user"
+SUMMARY_HEADER = "[Summary of earlier conversation, oldest first]"
+_LINE_CHARS = 160
+_CHARS_PER_TOKEN = 4  # Rough Gemini tokenization estimate for English text
+
+
+class _FoldState(NamedTuple):
+    boundary: int               # Events before this index have been folded
+    boundary_event_id: str      # Id of the event at boundary - 1 (detects rollbacks)
+    lines: Tuple[str, ...]      # Summary lines for folded, non-safety turns
+    preserved: Tuple[int, ...]  # Start indices of folded safety-relevant turns
+    summary: Optional[Event]
+
+
+def _event_text(event: Event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return " ".join(part.text for part in event.content.parts if part.text).strip()
+
+
+def estimate_tokens(events: List[Event]) -> int:
+    return sum(len(_event_text(event)) for event in events) // _CHARS_PER_TOKEN
+
+
+def _split_turns(events: List[Event]) -> List[Tuple[int, int]]:
+    """A turn starts at each user-authored event and runs until the next one."""
+    starts = [i for i, event in enumerate(events) if event.author == "user"]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return [(start, end) for start, end in zip(starts, starts[1:] + [len(events)]) if start < end]
+
+
+def _is_safety_relevant(events: List[Event], start: int, end: int) -> bool:
+    for event in events[start:end]:
+        text = _event_text(event)
+        if not text:
+            continue
+        if "ESCALATE_CRISIS" in text or run_pre_computation_safety_check(text):
+            return True
+        if event.author == "user" and score_risk(text) >= SAFETY_PASS_THRESHOLD:
+            return True
+    return False
+
+
+def _summarize_turn(events: List[Event], start: int, end: int) -> str:
+    user_text = ""
+    reply_text = ""
+    reply_author = ""
+    for event in events[start:end]:
+        text = _event_text(event)
+        if not text:
+            continue
+        if event.author == "user" and not user_text:
+            user_text = text
+        elif event.author != "user":
+            reply_text, reply_author = text, event.author
+    line = f"- user: {user_text[:_LINE_CHARS]}"
+    if reply_text:
+        line += f" | {reply_author}: {reply_text[:_LINE_CHARS]}"
+    return line
+
+
+class ContextCompactor:
+    """
+    Keeps the last `keep_turns` turns verbatim and folds older turns into one
+    summary event. Turns that touch safety (crisis keywords, ESCALATE_CRISIS,
+    or a local risk score at or above SAFETY_PASS_THRESHOLD) are never folded;
+    they are kept exactly, in order, after the summary.
+
+    Fold state is cached per session and extended incrementally, so each turn
+    is classified and summarized once, when it first leaves the window.
+    """
+
+    def __init__(self, keep_turns: int = 6, summary_max_chars: int = 2000, cache_size: int = 4096):
+        self.keep_turns = keep_turns
+        self.summary_max_chars = summary_max_chars
+        self._cache: "OrderedDict[Tuple[str, str, str], _FoldState]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def _fold(self, key, events: List[Event], boundary: int) -> _FoldState:
+        cached = self._cache.get(key)
+        resume_from = 0
+        lines: List[str] = []
+        preserved: List[int] = []
+        if (
+            cached is not None
+            and cached.boundary <= boundary
+            and events[cached.boundary - 1].id == cached.boundary_event_id
+        ):
+            if cached.boundary == boundary:
+                self._cache.move_to_end(key)
+                return cached
+            resume_from = cached.boundary
+            lines = list(cached.lines)
+            preserved = list(cached.preserved)
+
+        for start, end in _split_turns(events[resume_from:boundary]):
+            start, end = start + resume_from, end + resume_from
+            if _is_safety_relevant(events, start, end):
+                preserved.append(start)
+            else:
+                lines.append(_summarize_turn(events, start, end))
+
+        # Rolling window: keep the newest lines that fit the summary budget.
+        kept: List[str] = []
+        budget = self.summary_max_chars
+        for line in reversed(lines):
+            budget -= len(line) + 1
+            if budget < 0:
+                break
+            kept.append(line)
+        kept.reverse()
+
+        summary = None
+        if kept:
+            summary = Event(
+                author=SUMMARY_AUTHOR,
+                invocation_id="context_compaction",
+                timestamp=events[boundary - 1].timestamp,
+                content=types.Content(
+                    role="user", parts=[types.Part(text="\n".join([SUMMARY_HEADER] + kept))]
+                ),
+            )
+        state = _FoldState(boundary, events[boundary - 1].id, tuple(kept), tuple(preserved), summary)
+        self._cache[key] = state
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return state
+
+    def compact_events(self, key, events: List[Event]) -> List[Event]:
+        turns = _split_turns(events)
+        if len(turns) <= self.keep_turns:
+            return events
+        boundary = turns[-self.keep_turns][0]
+        state = self._fold(key, events, boundary)
+
+        compacted: List[Event] = [state.summary] if state.summary is not None else []
+        if state.preserved:
+            for start, end in _split_turns(events[:boundary]):
+                if start in state.preserved:
+                    compacted.extend(events[start:end])
+        compacted.extend(events[boundary:])
+        return compacted
+
+    def compact(self, session: Session) -> Session:
+        """Returns a copy of `session` whose events are compacted."""
+        key = (session.app_name, session.user_id, session.id)
+        events = self.compact_events(key, session.events)
+        if events is session.events:
+            return session
+        return session.model_copy(update={"events": events})
+
+
+def compaction_report(compactor: ContextCompactor, events: List[Event]) -> List[Dict[str, Any]]:
+    """
+    Estimated prompt tokens per turn, before and after compaction, as the
+    session grows turn by turn.
+    """
+    report = []
+    key = ("report", "report", str(id(events)))
+    for number, (_, end) in enumerate(_split_turns(events), start=1):
+        history = events[:end]
+        report.append({
+            "turn": number,
+            "tokens_before": estimate_tokens(history),
+            "tokens_after": estimate_tokens(compactor.compact_events(key, history)),
+        })
+    return report
+
+
+class CompactingSessionService(BaseSessionService):
+    """
+    Session service wrapper used by the agent runners: reads return compacted
+    sessions, everything else (including appends) goes to the wrapped service,
+    which keeps the full history.
+    """
+
+    def __init__(self, inner: BaseSessionService, compactor: ContextCompactor):
+        self.inner = inner
+        self.compactor = compactor
+
+    async def create_session(self, **kwargs) -> Session:
+        return await self.inner.create_session(**kwargs)
+
+    async def get_session(self, **kwargs) -> Optional[Session]:
+        session = await self.inner.get_session(**kwargs)
+        if session is None:
+            return None
+        compacted = self.compactor.compact(session)
+        if compacted is session:
+            return session
+        tokens_before = estimate_tokens(session.events)
+        tokens_after = estimate_tokens(compacted.events)
+        if tokens_after >= tokens_before:
+            # Short turns: the summary header costs more than it saves.
+            return session
+        log_agent_action("session_service", "CONTEXT_COMPACTION", {
+            "events_before": len(session.events),
+            "events_after": len(compacted.events),
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+        })
+        return compacted
+
+    async def list_sessions(self, **kwargs):
+        return await self.inner.list_sessions(**kwargs)
+
+    async def delete_session(self, **kwargs) -> None:
+        await self.inner.delete_session(**kwargs)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        return await self.inner.append_event(session, event)
+
+    async def flush(self) -> None:
+        await self.inner.flush()
+
+    def __getattr__(self, name):
+        # ensure_session / checkpoint / rollback / stats of the wrapped service
+        return getattr(self.inner, name)
@@ -0,0 +1,245 @@
+# Crisis resource registry: loaded once from a versioned data file, indexed for lookup
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("withyou_telemetry")
+
+URGENCIES = ("immediate", "informational")
+_SEPARATORS = re.compile(r"[,;/|()]+")
+_MAX_ALIAS_WORDS = 4
+_RESOLVE_CACHE_SIZE = 4096
+
+
+def normalize_location(text: str) -> str:
+    """Case-folded, accent-stripped, single-spaced; keeps dots for "U.S."."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w\s.]", " ", text).split())
+
+
+class CrisisResource(NamedTuple):
+    id: str
+    name: str
+    country: str
+    region: Optional[str]
+    urgency: str
+    languages: Tuple[str, ...]
+    details: Dict[str, str]  # phone / url / text / service / note, as given in the file
+
+    @property
+    def contact(self) -> str:
+        return self.details.get("phone") or self.details.get("text") or self.details.get("url") or ""
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"name": self.name, **self.details}
+
+
+class ResourceLookup(NamedTuple):
+    version: str
+    country: str
+    region: Optional[str]
+    urgency: str
+    resources: List[CrisisResource]
+
+    @property
+    def summary(self) -> str:
+        """One line, e.g. "Tele-MANAS: 14416 | AASRA: 9820466726"."""
+        return " | ".join(f"{resource.name}: {resource.contact}" for resource in self.resources)
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "version": self.version,
+            "country": self.country,
+            "region": self.region,
+            "urgency": self.urgency,
+            "summary": self.summary,
+            "resources": [resource.as_dict() for resource in self.resources],
+        }
+
+
+class _Snapshot(NamedTuple):
+    version: str
+    default_country: str
+    aliases: Dict[str, Tuple[str, Optional[str]]]  # alias -> (country, region)
+    by_key: Dict[Tuple[str, Optional[str], str], List[CrisisResource]]  # (country, region, urgency)
+
+
+def _build_snapshot(data: dict) -> _Snapshot:
+    default_country = data["default_country"]
+    countries = data["countries"]
+    if default_country not in countries:
+        raise ValueError(f"default_country {default_country!r} is not defined.")
+
+    aliases: Dict[str, Tuple[str, Optional[str]]] = {}
+
+    def add_alias(alias: str, target: Tuple[str, Optional[str]]):
+        key = normalize_location(alias)
+        if key in aliases and aliases[key] != target:
+            raise ValueError(f"Alias {alias!r} maps to both {aliases[key]} and {target}.")
+        aliases[key] = target
+
+    for code, country in countries.items():
+        add_alias(code, (code, None))
+        add_alias(country["name"], (code, None))
+        for alias in country.get("aliases", []):
+            add_alias(alias, (code, None))
+        for region_code, region in country.get("regions", {}).items():
+            add_alias(region["name"], (code, region_code))
+            for alias in region.get("aliases", []):
+                add_alias(alias, (code, region_code))
+
+    by_key: Dict[Tuple[str, Optional[str], str], List[CrisisResource]] = {}
+    for entry in data["resources"]:
+        entry = dict(entry)
+        resource = CrisisResource(
+            id=entry.pop("id"),
+            name=entry.pop("name"),
+            country=entry.pop("country"),
+            region=entry.pop("region", None),
+            urgency=entry.pop("urgency"),
+            languages=tuple(entry.pop("languages", ())),
+            details=entry,
+        )
+        if resource.country not in countries:
+            raise ValueError(f"Resource {resource.id!r} has unknown country {resource.country!r}.")
+        if resource.urgency not in URGENCIES:
+            raise ValueError(f"Resource {resource.id!r} has unknown urgency {resource.urgency!r}.")
+        by_key.setdefault((resource.country, resource.region, resource.urgency), []).append(resource)
+
+    for urgency in URGENCIES:
+        if not by_key.get((default_country, None, urgency)):
+            raise ValueError(f"No {urgency} resources for the default country {default_country!r}.")
+    return _Snapshot(str(data["version"]), default_country, aliases, by_key)
+
+
+class CrisisResourceRegistry:
+    """
+    All crisis resources, loaded from a JSON data file into immutable
+    indexes: an alias table (free-form place names and ISO codes to country
+    and region) and resource lists keyed by (country, region, urgency).
+
+    A lookup is a few dict reads. The file's mtime is checked at most once
+    per `reload_interval` seconds. A changed file is parsed and validated
+    off to the side and swapped in whole; if it is invalid, the last good
+    version stays in service and the error is logged.
+
+    Unknown locations resolve to the file's default country (global
+    resources), never to a guessed country.
+    """
+
+    def __init__(self, path: str, reload_interval: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._resolved: "OrderedDict[str, Tuple[str, Optional[str]]]" = OrderedDict()
+        self._mtime = os.stat(path).st_mtime_ns
+        self._snapshot = self._load()
+        self._next_check = time.monotonic() + reload_interval
+
+    def _load(self) -> _Snapshot:
+        with open(self.path, encoding="utf-8") as handle:
+            return _build_snapshot(json.load(handle))
+
+    @property
+    def version(self) -> str:
+        return self._snapshot.version
+
+    def reload(self) -> bool:
+        """Re-reads the data file. Returns False (and keeps serving) if it is invalid."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            snapshot = self._load()
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            logger.error(f"CRISIS_RESOURCES_RELOAD_FAILED: {self.path}: {error}")
+            return False
+        with self._lock:
+            self._snapshot, self._mtime = snapshot, mtime
+            self._resolved.clear()
+        logger.info(f"CRISIS_RESOURCES_LOADED: version {snapshot.version}")
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            changed = os.stat(self.path).st_mtime_ns != self._mtime
+        except OSError:
+            return
+        if changed:
+            self.reload()
+
+    def resolve(self, location: Optional[str]) -> Tuple[str, Optional[str]]:
+        """
+        Maps a free-form location ("Mumbai", "IN", "Pune, Bharat") to
+        (ISO country, region code or None). Tries the whole string, then each
+        comma-separated part, then the longest known phrase inside it.
+        """
+        self._maybe_reload()
+        snapshot = self._snapshot
+        key = normalize_location(location or "")
+        cached = self._resolved.get(key)
+        if cached is not None:
+            return cached
+
+        target = snapshot.aliases.get(key)
+        if target is None:
+            for part in _SEPARATORS.split(key):
+                target = snapshot.aliases.get(part.strip())
+                if target is not None:
+                    break
+        if target is None:
+            target = _longest_phrase(key.replace(".", " ").split(), snapshot.aliases)
+        if target is None:
+            target = (snapshot.default_country, None)
+
+        with self._lock:
+            if snapshot is self._snapshot:
+                self._resolved[key] = target
+                while len(self._resolved) > _RESOLVE_CACHE_SIZE:
+                    self._resolved.popitem(last=False)
+        return target
+
+    def lookup(self, location: Optional[str], urgency: str = "immediate", language: Optional[str] = None) -> ResourceLookup:
+        """
+        Resources for `location` at `urgency`: region-specific ones first,
+        then national ones, then (if the country has none at this urgency)
+        the global defaults. With `language`, matching resources come first.
+        """
+        if urgency not in URGENCIES:
+            urgency = "immediate"
+        country, region = self.resolve(location)
+        snapshot = self._snapshot
+        resources = list(snapshot.by_key.get((country, region, urgency), ())) if region else []
+        resources += snapshot.by_key.get((country, None, urgency), ())
+        if not resources:
+            country, region = snapshot.default_country, None
+            resources = list(snapshot.by_key[(country, None, urgency)])
+        if language:
+            language = language.split("-")[0].lower()
+            resources.sort(key=lambda resource: language not in resource.languages)
+        return ResourceLookup(snapshot.version, country, region, urgency, resources)
+
+
+def _longest_phrase(words: List[str], aliases: Dict[str, Tuple[str, Optional[str]]]):
+    # Two-letter ISO codes only count as a whole location, so "in" or "us"
+    # inside a sentence is not read as India or the United States.
+    best, best_length = None, 0
+    for start in range(len(words)):
+        for length in range(min(_MAX_ALIAS_WORDS, len(words) - start), best_length, -1):
+            phrase = " ".join(words[start:start + length])
+            if len(phrase) <= 2:
+                continue
+            target = aliases.get(phrase)
+            if target is not None:
+                best, best_length = target, length
+                break
+    return best
@@ -0,0 +1,210 @@
+# Simulated Gemini backend for offline load tests (WITHYOU_FAKE_LLM=1)
+import asyncio
+import json
+import logging
+import random
+import re
+from typing import AsyncGenerator, Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors, types
+
+# Same logger and message prefix google-genai uses for its retries, so the
+# tracer's retry counter sees simulated retries too.
+_retry_logger = logging.getLogger("google_genai._api_client")
+
+
+class FakeProfile(NamedTuple):
+    ttft_ms: float = 400.0          # Median time to the first chunk (log-normal)
+    ttft_sigma: float = 0.5         # Log-normal shape; 0 makes the latency fixed
+    chunk_ms: float = 30.0          # Gap between streamed chunks
+    words_per_chunk: int = 4
+    reply_words: int = 60
+    error_429: float = 0.0          # Chance that one attempt fails with 429
+    error_503: float = 0.0          # Chance that one attempt fails with 503
+    retry_delay_scale: float = 0.01  # Multiplies RETRY_CONFIG backoff (1.0 = real delays)
+
+
+class ScriptRule(NamedTuple):
+    pattern: Pattern[str]
+    tool: str
+    args: Dict[str, str]   # Values may contain "{text}", the latest user message
+
+
+def _rule(pattern: str, tool: str, **args: str) -> ScriptRule:
+    return ScriptRule(re.compile(pattern, re.IGNORECASE), tool, args)
+
+
+# First rule whose tool the agent actually has, and whose pattern matches the
+# latest user message, becomes a function call. Triage routes through its
+# AgentTools; the catch-all coach rule only applies where cbt_coach is a tool.
+SCRIPT: List[ScriptRule] = [
+    _rule(r"\b(remind|schedule|every (day|morning|night)|at \d)", "schedule_routine",
+          activity="{text}", time="22:00", frequency="daily"),
+    _rule(r"\b(helpline|hotline|number to call|resources?)\b", "resource_lookup",
+          location="Global", urgency="informational"),
+    _rule(r"\b(routine|sleep|habit|schedule|plan|morning|bed)", "behavioral_planner", request="{text}"),
+    _rule(r"\b(summary|therapist|history|report|clinician)\b", "clinician_bridge", request="{text}"),
+    _rule(r"", "cbt_coach", request="{text}"),
+]
+
+# What the safety sentinel escalates on (its instruction asks for ESCALATE_CRISIS)
+_RISK = re.compile(r"hurt(ing)? myself|kill|suicid|want to die|end it|don'?t want to be here|no reason to live", re.I)
+
+_WORDS = (
+    "that sounds really hard and it makes sense you feel this way let's slow down together "
+    "and notice one small thing you can do right now maybe a short walk or a glass of water "
+    "you have handled difficult days before and we can take this one step at a time"
+).split()
+
+_profile = FakeProfile()
+_per_model: Dict[str, FakeProfile] = {}
+
+
+def configure(profile: FakeProfile, per_model: Optional[Dict[str, FakeProfile]] = None):
+    """Sets the latency/error profile for all fake models (or per model name)."""
+    global _profile, _per_model
+    _profile = profile
+    _per_model = dict(per_model or {})
+
+
+def _latest_user_text(request: LlmRequest) -> str:
+    for content in reversed(request.contents or []):
+        if content.role == "user":
+            text = " ".join(part.text for part in content.parts or [] if part.text)
+            if text:
+                return text
+    return ""
+
+
+def _instruction(request: LlmRequest) -> str:
+    instruction = request.config.system_instruction if request.config else None
+    if instruction is None:
+        return ""
+    if isinstance(instruction, str):
+        return instruction
+    if isinstance(instruction, types.Content):
+        return " ".join(part.text or "" for part in instruction.parts or [])
+    return str(instruction)
+
+
+class FakeGemini(BaseLlm):
+    """
+    Drop-in stand-in for `Gemini(model=..., retry_options=...)`. No network:
+    it sleeps for a sampled latency, streams canned text in chunks, injects
+    429/503 errors and retries them the way RETRY_CONFIG would, and follows
+    SCRIPT to emit tool calls (resource_lookup, schedule_routine, the
+    triage AgentTools) so every orchestration path gets exercised.
+
+    The safety sentinel is recognised by its instruction: it answers "SAFE",
+    or for risky text looks up resources and ends with "ESCALATE_CRISIS".
+    Requests for JSON (the bulk screener's) get a risk verdict for each
+    {"id", "text"} line of the prompt.
+    """
+
+    retry_options: Optional[types.HttpRetryOptions] = None
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [r"gemini-.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        profile = _per_model.get(llm_request.model or self.model, _profile)
+        await self._wait_for_first_token(profile)
+
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=sum(len(str(content)) for content in llm_request.contents or []) // 4,
+            candidates_token_count=0,
+        )
+        call = self._scripted_call(llm_request)
+        if call is not None:
+            name, args = call
+            usage.candidates_token_count = 10
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))]),
+                usage_metadata=usage,
+            )
+            return
+
+        text = self._reply_text(llm_request, profile)
+        usage.candidates_token_count = len(text) // 4
+        if stream:
+            words = text.split(" ")
+            for start in range(0, len(words), profile.words_per_chunk):
+                if start:
+                    await asyncio.sleep(profile.chunk_ms / 1000)
+                chunk = " ".join(words[start:start + profile.words_per_chunk])
+                if start + profile.words_per_chunk < len(words):
+                    chunk += " "
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]), partial=True)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), usage_metadata=usage)
+
+    async def _wait_for_first_token(self, profile: FakeProfile):
+        options = self.retry_options
+        attempts = (options.attempts if options and options.attempts else 1)
+        retry_codes = set(options.http_status_codes or (408, 429, 500, 502, 503, 504)) if options else set()
+        delay = options.initial_delay if options and options.initial_delay else 1.0
+        for attempt in range(1, attempts + 1):
+            latency = profile.ttft_ms * random.lognormvariate(0.0, profile.ttft_sigma) if profile.ttft_sigma else profile.ttft_ms
+            roll = random.random()
+            if roll < profile.error_429:
+                error: Optional[errors.APIError] = errors.ClientError(
+                    429, {"error": {"code": 429, "message": "Resource exhausted (simulated).", "status": "RESOURCE_EXHAUSTED"}}
+                )
+                latency *= 0.1  # Rejections come back fast
+            elif roll < profile.error_429 + profile.error_503:
+                error = errors.ServerError(
+                    503, {"error": {"code": 503, "message": "Service unavailable (simulated).", "status": "UNAVAILABLE"}}
+                )
+            else:
+                error = None
+            await asyncio.sleep(latency / 1000)
+            if error is None:
+                return
+            if attempt == attempts or error.code not in retry_codes:
+                raise error
+            backoff = min(delay * (options.exp_base or 2) ** (attempt - 1), options.max_delay or 60.0)
+            backoff += random.uniform(0, options.jitter if options.jitter is not None else 1.0)
+            _retry_logger.info(f"Retrying {self.model} in {backoff:.2f} seconds as it raised {type(error).__name__}.")
+            await asyncio.sleep(backoff * profile.retry_delay_scale)
+
+    def _scripted_call(self, request: LlmRequest) -> Optional[Tuple[str, Dict[str, str]]]:
+        last = request.contents[-1] if request.contents else None
+        if last is not None and any(part.function_response for part in last.parts or []):
+            return None  # A tool just answered: reply in text
+        text = _latest_user_text(request)
+        tools = request.tools_dict or {}
+        if "ESCALATE_CRISIS" in _instruction(request):
+            if _RISK.search(text) and "resource_lookup" in tools:
+                return "resource_lookup", {"location": "Global", "urgency": "immediate"}
+            return None
+        for rule in SCRIPT:
+            if rule.tool in tools and rule.pattern.search(text):
+                return rule.tool, {key: value.format(text=text[:200]) for key, value in rule.args.items()}
+        return None
+
+    def _reply_text(self, request: LlmRequest, profile: FakeProfile) -> str:
+        if request.config and request.config.response_mime_type == "application/json":
+            return _screen_verdicts(_latest_user_text(request))
+        if "ESCALATE_CRISIS" in _instruction(request):
+            if _RISK.search(_latest_user_text(request)):
+                return "I'm really concerned about your safety. Please reach out to a crisis line now. ESCALATE_CRISIS"
+            return "SAFE"
+        start = random.randrange(len(_WORDS))
+        return " ".join(_WORDS[(start + i) % len(_WORDS)] for i in range(profile.reply_words))
+
+
+def _screen_verdicts(prompt: str) -> str:
+    results = []
+    for line in prompt.splitlines():
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(item, dict) and "id" in item:
+            results.append({"id": item["id"], "risk": bool(_RISK.search(str(item.get("text", ""))))})
+    return json.dumps({"results": results})
@@ -0,0 +1,169 @@
+# Local intent classifier: routes confident turns straight to a specialist
+import json
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class RouteDecision(NamedTuple):
+    agent: Optional[str]  # Specialist agent name, or None to fall back to the LLM router
+    label: str            # Best label, even when not confident enough to use it
+    confidence: float
+    fallback: bool
+
+
+def _features(text: str) -> List[str]:
+    """Word unigrams and bigrams plus character trigrams within words."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    words = _WORD.findall(text)
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams.extend(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return grams
+
+
+class IntentRouter:
+    """
+    Hashed TF-IDF features and a multinomial logistic regression, trained on
+    labelled (text, agent) examples at startup.
+
+    A turn is routed locally when the top class probability reaches
+    `threshold`; everything else goes to the LLM router. Only hash buckets
+    seen in training get a weight row, so the model stays small and features
+    never seen in training are ignored at prediction time.
+    """
+
+    def __init__(self, threshold: float = 0.6, dimensions: int = 1 << 14):
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self.labels: List[str] = []
+        self._columns: Dict[int, int] = {}  # Hash bucket -> weight row
+        self._idf: Optional[np.ndarray] = None
+        self._weights: Optional[np.ndarray] = None
+        self._bias: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.routed: Dict[str, int] = {}
+        self.fallbacks = 0
+        self._confidence_total = 0.0
+        self.training_seconds = 0.0
+
+    def _hash(self, text: str) -> Dict[int, float]:
+        counts: Dict[int, float] = {}
+        for gram in _features(text):
+            index = zlib.crc32(gram.encode("utf-8")) % self.dimensions
+            counts[index] = counts.get(index, 0.0) + 1.0
+        return counts
+
+    def _vectorize(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), len(self._columns)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for index, count in self._hash(text).items():
+                column = self._columns.get(index)
+                if column is not None:
+                    matrix[row, column] = 1.0 + np.log(count)
+        matrix *= self._idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-9)
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str], epochs: int = 300, learning_rate: float = 2.0, l2: float = 1e-3):
+        started = time.perf_counter()
+        self.labels = sorted(set(labels))
+        targets = np.array([self.labels.index(label) for label in labels])
+
+        hashed = [self._hash(text) for text in texts]
+        self._columns = {}
+        for counts in hashed:
+            for index in counts:
+                self._columns.setdefault(index, len(self._columns))
+        document_frequency = np.zeros(len(self._columns), dtype=np.float32)
+        for counts in hashed:
+            document_frequency[[self._columns[index] for index in counts]] += 1.0
+        self._idf = (np.log((1.0 + len(texts)) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+
+        features = self._vectorize(texts)
+        one_hot = np.eye(len(self.labels), dtype=np.float32)[targets]
+        weights = np.zeros((len(self._columns), len(self.labels)), dtype=np.float32)
+        bias = np.zeros(len(self.labels), dtype=np.float32)
+        for _ in range(epochs):
+            gradient = _softmax(features @ weights + bias) - one_hot
+            weights -= learning_rate * (features.T @ gradient / len(texts) + l2 * weights)
+            bias -= learning_rate * gradient.mean(axis=0)
+        self._weights, self._bias = weights, bias
+        self.training_seconds = time.perf_counter() - started
+        return self
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        if self._weights is None:
+            raise RuntimeError("IntentRouter is not trained.")
+        return _softmax(self._vectorize(texts) @ self._weights + self._bias)
+
+    def route(self, text: str) -> RouteDecision:
+        probabilities = self.predict_proba([text])[0]
+        best = int(np.argmax(probabilities))
+        confidence = float(probabilities[best])
+        fallback = confidence < self.threshold
+        with self._lock:
+            self._confidence_total += confidence
+            if fallback:
+                self.fallbacks += 1
+            else:
+                self.routed[self.labels[best]] = self.routed.get(self.labels[best], 0) + 1
+        return RouteDecision(
+            None if fallback else self.labels[best], self.labels[best], round(confidence, 4), fallback
+        )
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.fallbacks + sum(self.routed.values())
+            return {
+                "decisions": total,
+                "routed": dict(self.routed),
+                "fallbacks": self.fallbacks,
+                "fallback_rate": round(self.fallbacks / total, 4) if total else 0.0,
+                "mean_confidence": round(self._confidence_total / total, 4) if total else 0.0,
+            }
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_transcripts(path: str) -> Tuple[List[str], List[str]]:
+    """Reads labelled examples: one JSON object per line with "text" and "agent"."""
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record["text"])
+                labels.append(record["agent"])
+    return texts, labels
+
+
+def train_router(path: str, threshold: float) -> IntentRouter:
+    texts, labels = load_transcripts(path)
+    return IntentRouter(threshold=threshold).fit(texts, labels)
+
+
+_router: Optional[IntentRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> IntentRouter:
+    """Process-wide router, trained from ROUTER_TRAINING_PATH on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            from config.settings import ROUTER_CONFIDENCE_THRESHOLD, ROUTER_TRAINING_PATH
+            _router = train_router(ROUTER_TRAINING_PATH, ROUTER_CONFIDENCE_THRESHOLD)
+        return _router
@@ -0,0 +1,263 @@
+# Shared LLM call scheduler: token bucket per model, crisis lane first, one backoff per model
+import asyncio
+import contextlib
+import contextvars
+import logging
+import random
+import re
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, Optional
+
+from config.settings import (
+    LLM_BURST_SECONDS,
+    LLM_CRISIS_RESERVE,
+    LLM_DEFAULT_RPM,
+    LLM_MAX_ATTEMPTS,
+    LLM_MAX_BACKOFF_SECONDS,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+    LLM_REQUESTS_PER_MINUTE,
+    RETRY_EXP_BASE,
+    RETRY_STATUS_CODES,
+)
+
+if TYPE_CHECKING:
+    from google.adk.models.llm_request import LlmRequest
+    from google.genai import errors
+
+CRISIS = "crisis"
+NORMAL = "normal"
+BULK = "bulk"
+
+# Set by the orchestrator around the safety screen; everything the safety
+# runner sends (including its resource_lookup follow-up) goes first. Batch
+# jobs (core/bulk_screen.py) set BULK and only get slots live turns leave.
+_lane: contextvars.ContextVar[str] = contextvars.ContextVar("llm_lane", default=NORMAL)
+
+# Tools whose follow-up model call is on the crisis path wherever it happens
+CRISIS_TOOLS = frozenset({"resource_lookup"})
+
+# Message prefix matches google-genai's, so the tracer counts these retries
+_logger = logging.getLogger("withyou_llm_scheduler")
+
+_DURATION = re.compile(r"^\s*([\d.]+)s\s*$")
+
+
+class LlmQueueTimeout(Exception):
+    """A normal-lane call waited longer than LLM_QUEUE_TIMEOUT_SECONDS for a slot."""
+
+
+@contextlib.contextmanager
+def _use_lane(lane: str):
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def crisis_priority():
+    """Model calls made inside this block (in this task) use the crisis lane."""
+    return _use_lane(CRISIS)
+
+
+def bulk_priority():
+    """Model calls made inside this block wait behind all live traffic."""
+    return _use_lane(BULK)
+
+
+def lane_for(llm_request: "LlmRequest") -> str:
+    lane = _lane.get()
+    if lane == CRISIS:
+        return CRISIS
+    last = llm_request.contents[-1] if llm_request.contents else None
+    for part in (last.parts or []) if last is not None else []:
+        if part.function_response is not None and part.function_response.name in CRISIS_TOOLS:
+            return CRISIS
+    return lane
+
+
+def server_retry_delay(error: "errors.APIError") -> Optional[float]:
+    """
+    Seconds the server asked us to wait: a Retry-After header, or the
+    RetryInfo detail Gemini attaches to RESOURCE_EXHAUSTED ("12s").
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass  # HTTP-date form; fall through to the body
+    details = error.details.get("error", {}).get("details", []) if isinstance(error.details, dict) else []
+    for detail in details:
+        if isinstance(detail, dict) and str(detail.get("@type", "")).endswith("google.rpc.RetryInfo"):
+            match = _DURATION.match(str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+class _ModelBucket:
+    """
+    Token bucket for one model plus its waiting lanes. Normal and bulk
+    calls leave `reserve` tokens untouched, so a crisis call finds a slot
+    even while coaching traffic is using the whole rate.
+    """
+
+    __slots__ = ("limit", "rate", "capacity", "reserve", "tokens", "stamp", "paused_until", "lanes", "stats")
+
+    def __init__(self, requests_per_minute: float):
+        self.limit = requests_per_minute / 60.0
+        self.rate = self.limit
+        self.reserve = self.limit * LLM_BURST_SECONDS * LLM_CRISIS_RESERVE
+        # Normal and bulk calls need 1 + reserve tokens; at low rates the burst
+        # alone would be smaller than that and they could never start.
+        self.capacity = max(1.0 + self.reserve, self.limit * LLM_BURST_SECONDS)
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0
+        self.lanes: Dict[str, Deque[asyncio.Event]] = {CRISIS: deque(), NORMAL: deque(), BULK: deque()}
+        self.stats = {"granted": 0, "throttled": 0, "requeued": 0, "timeouts": 0}
+
+    def delay(self, lane: str, now: float) -> float:
+        """Seconds until a call in `lane` may start (0 means now)."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        need = 1.0
+        if lane != CRISIS:
+            need += self.reserve
+            if self.lanes[CRISIS] or (lane == BULK and self.lanes[NORMAL]):
+                return 1.0 / self.rate  # Higher lanes' waiters go first
+        if self.tokens >= need:
+            return 0.0
+        return (need - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1.0
+        self.stats["granted"] += 1
+
+    def throttle(self, pause: float, now: float, quota: bool):
+        """Server pushed back: everyone on this model waits, and on 429 the rate halves."""
+        self.paused_until = max(self.paused_until, now + pause)
+        self.stats["throttled"] += 1
+        if quota:
+            self.tokens = 0.0
+            self.rate = max(self.limit / 16, self.rate / 2)
+
+    def recover(self):
+        """A call succeeded: creep back towards the configured rate."""
+        if self.rate < self.limit:
+            self.rate = min(self.limit, self.rate + self.limit / 20)
+
+
+class LlmScheduler:
+    """
+    One admission point for every model call in the process. Each model has
+    a token bucket sized from LLM_REQUESTS_PER_MINUTE; calls wait in FIFO
+    lanes served crisis first, then normal, then bulk. When the
+    server returns 429/5xx, the whole model pauses (for the server's retry
+    delay if it gave one, otherwise jittered exponential backoff) and the
+    failed call goes back to the front of its lane, instead of each caller
+    retrying on its own schedule.
+    """
+
+    def __init__(self, requests_per_minute: Dict[str, float], default_rpm: float):
+        self._limits = dict(requests_per_minute)
+        self._default_rpm = default_rpm
+        self._buckets: Dict[str, _ModelBucket] = {}
+        self._retry_codes = frozenset(RETRY_STATUS_CODES)
+        self._base_delay = 1.0
+        self._exp_base = RETRY_EXP_BASE
+
+    def _bucket(self, model: str) -> _ModelBucket:
+        bucket = self._buckets.get(model)
+        if bucket is None:
+            bucket = self._buckets[model] = _ModelBucket(self._limits.get(model, self._default_rpm))
+        return bucket
+
+    async def acquire(self, model: str, lane: str, front: bool = False):
+        """Waits for a slot on `model`. Only the head of each lane polls the bucket."""
+        bucket = self._bucket(model)
+        queue = bucket.lanes[lane]
+        if not queue and bucket.delay(lane, time.monotonic()) <= 0:
+            bucket.take()
+            return
+
+        turn = asyncio.Event()
+        if front:
+            queue.appendleft(turn)
+        else:
+            queue.append(turn)
+        if queue[0] is turn:
+            turn.set()
+        deadline = time.monotonic() + LLM_QUEUE_TIMEOUT_SECONDS if lane == NORMAL else None
+        try:
+            while True:
+                if deadline is None:
+                    await turn.wait()
+                else:
+                    await asyncio.wait_for(turn.wait(), max(0.0, deadline - time.monotonic()))
+                now = time.monotonic()
+                wait = bucket.delay(lane, now)
+                if wait <= 0:
+                    bucket.take()
+                    return
+                if deadline is not None and now + wait > deadline:
+                    raise asyncio.TimeoutError
+                await asyncio.sleep(wait)
+        except asyncio.TimeoutError:
+            bucket.stats["timeouts"] += 1
+            raise LlmQueueTimeout(f"{model}: no slot within {LLM_QUEUE_TIMEOUT_SECONDS}s") from None
+        finally:
+            was_head = bool(queue) and queue[0] is turn
+            queue.remove(turn)
+            if was_head and queue:
+                queue[0].set()
+
+    def retryable(self, error: Exception, attempt: int) -> bool:
+        from google.genai import errors
+
+        return (
+            isinstance(error, errors.APIError)
+            and error.code in self._retry_codes
+            and attempt < LLM_MAX_ATTEMPTS
+        )
+
+    def backoff(self, model: str, error: "errors.APIError", attempt: int) -> float:
+        """Pauses `model` after a rejected call and returns the pause in seconds."""
+        hinted = server_retry_delay(error)
+        if hinted is not None:
+            pause = hinted * random.uniform(1.0, 1.2)  # Spread the return a little
+        else:
+            # Full jitter, so callers rejected together do not return together
+            pause = random.uniform(0, min(LLM_MAX_BACKOFF_SECONDS, self._base_delay * self._exp_base ** attempt))
+        bucket = self._bucket(model)
+        bucket.throttle(pause, time.monotonic(), quota=error.code == 429)
+        bucket.stats["requeued"] += 1
+        _logger.info(f"Retrying {model} in {pause:.2f} seconds as it raised {type(error).__name__}.")
+        return pause
+
+    def succeeded(self, model: str):
+        self._bucket(model).recover()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            model: {
+                **bucket.stats,
+                "rpm": round(bucket.rate * 60, 1),
+                "queued_crisis": len(bucket.lanes[CRISIS]),
+                "queued_normal": len(bucket.lanes[NORMAL]),
+                "queued_bulk": len(bucket.lanes[BULK]),
+                "paused_s": round(max(0.0, bucket.paused_until - now), 2),
+            }
+            for model, bucket in self._buckets.items()
+        }
+
+
+llm_scheduler = LlmScheduler(LLM_REQUESTS_PER_MINUTE, LLM_DEFAULT_RPM)
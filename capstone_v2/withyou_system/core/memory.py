@@ -1,11 +1,90 @@
 # Memory Bank & Session Management
+import copy
+import threading
+
 from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
+from config.settings import (
+    COMPACTION_KEEP_TURNS, COMPACTION_SUMMARY_MAX_CHARS, MEMORY_TOP_K, SESSION_BACKEND,
+    SESSION_CACHE_SIZE, SESSION_DB_PATH, SESSION_WRITE_BATCH,
+)
+from core.compaction import CompactingSessionService, ContextCompactor
+from core.memory_index import IndexedMemoryService
+from core.session_store import SessionCheckpoint, SqliteSessionService
+
+
+class WithyouSessionService(InMemorySessionService):
+    """
+    In-memory session service that can roll a session back to a checkpoint,
+    so speculative agent runs can be discarded without a trace.
+    """
+
+    def _stored_session(self, app_name: str, user_id: str, session_id: str):
+        return self.sessions.get(app_name, {}).get(user_id, {}).get(session_id)
+
+    async def ensure_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        if self._stored_session(app_name, user_id, session_id) is None:
+            await self.create_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def checkpoint(self, *, app_name: str, user_id: str, session_id: str) -> SessionCheckpoint:
+        await self.ensure_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        # Read the stored session directly: get_session() merges app/user state in.
+        session = self._stored_session(app_name, user_id, session_id)
+        return SessionCheckpoint(
+            app_name, user_id, session_id, len(session.events), copy.deepcopy(session.state)
+        )
+
+    async def rollback(self, checkpoint: SessionCheckpoint) -> int:
+        """
+        Drops every event appended after `checkpoint` and restores its state.
+        Returns the number of events removed.
+        """
+        session = self._stored_session(
+            checkpoint.app_name, checkpoint.user_id, checkpoint.session_id
+        )
+        if session is None:
+            return 0
+        removed = len(session.events) - checkpoint.event_count
+        del session.events[checkpoint.event_count:]
+        session.state = copy.deepcopy(checkpoint.state)
+        return max(removed, 0)
+
+
+# Built on first use (not at import): opening the session store is part of
+# a cold start, and the pre-warm hook can do it before traffic arrives.
+_services = None
+_services_lock = threading.Lock()
+
+
+def _build_services():
+    # Sessions survive restarts in a local SQLite file; "memory" keeps them in-process only.
+    # In production, this would connect to Vertex AI Memory Bank for long-term vector storage
+    if SESSION_BACKEND == "sqlite":
+        session_service = SqliteSessionService(SESSION_DB_PATH, SESSION_CACHE_SIZE, SESSION_WRITE_BATCH)
+    else:
+        session_service = WithyouSessionService()
+    # Long-term memory for `load_memory`: per-user BM25 index, incremental inserts
+    memory_service = IndexedMemoryService(top_k=MEMORY_TOP_K)
+
+    # Agent runners read sessions through a compacting view: recent turns verbatim,
+    # older turns folded into a summary. Writes still land in the full history.
+    runner_session_service = CompactingSessionService(
+        session_service, ContextCompactor(COMPACTION_KEEP_TURNS, COMPACTION_SUMMARY_MAX_CHARS)
+    )
+    return session_service, memory_service, runner_session_service
+
+
+def _get_services():
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = _build_services()
+    return _services
 
-# Initialize persistent layers
-# In production, this would connect to Vertex AI Memory Bank for long-term vector storage
-session_service = InMemorySessionService()
-memory_service = InMemoryMemoryService()
 
 def get_session_services():
-    return session_service, memory_service
\ No newline at end of file
+    session_service, memory_service, _ = _get_services()
+    return session_service, memory_service
+
+def get_runner_session_service():
+    return _get_services()[2]
@@ -0,0 +1,246 @@
+# Indexed long-term memory: per-user BM25 inverted index + optional NumPy vectors
+import heapq
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from google.adk.events import Event
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import Session
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from i i'm if in is it its me my of on or so that the "
+    "this to was were what when with you your".split()
+)
+
+# BM25 parameters (standard Okapi defaults)
+_K1 = 1.2
+_B = 0.75
+# Reciprocal-rank-fusion constant for combining BM25 and vector rankings
+_RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class _GrowableArray:
+    """Append-only NumPy array with amortized O(1) appends (capacity doubling)."""
+
+    __slots__ = ("_data", "size")
+
+    def __init__(self, dtype, width: Optional[int] = None, capacity: int = 8):
+        shape = (capacity,) if width is None else (capacity, width)
+        self._data = np.empty(shape, dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self._data):
+            grown = np.empty((len(self._data) * 2,) + self._data.shape[1:], dtype=self._data.dtype)
+            grown[: self.size] = self._data[: self.size]
+            self._data = grown
+        self._data[self.size] = value
+        self.size += 1
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._data[: self.size]
+
+
+class _UserIndex:
+    """
+    Inverted index (and optional vector matrix) over one user's memories.
+
+    Each posting stores its BM25 term-frequency weight, computed against a
+    snapshot of the average document length. The snapshot is refreshed (and
+    all weights recomputed) whenever the corpus grows by 10%, so the rebuild
+    cost is amortized O(1) per insert and a query is one scaled scatter-add
+    per term.
+    """
+
+    _REFRESH_GROWTH = 1.1
+
+    def __init__(self, dimensions: Optional[int]):
+        self.entries: List[MemoryEntry] = []
+        self.seen_event_ids: Set[str] = set()
+        # Per-session high-water mark: events before it were already indexed.
+        self.session_marks: Dict[str, int] = {}
+        self.doc_lengths = _GrowableArray(np.float32)
+        self.total_length = 0.0
+        self.postings: Dict[str, Tuple[_GrowableArray, _GrowableArray, _GrowableArray]] = {}
+        self.vectors = _GrowableArray(np.float32, width=dimensions) if dimensions else None
+        self._average_length = 1.0
+        self._snapshot_size = 0
+
+    def _weight(self, frequency, length):
+        norm = _K1 * (1.0 - _B + _B * length / self._average_length)
+        return frequency * (_K1 + 1.0) / (frequency + norm)
+
+    def _refresh_weights(self):
+        self._average_length = (self.total_length / len(self.entries)) or 1.0
+        self._snapshot_size = len(self.entries)
+        lengths = self.doc_lengths.view
+        for doc_ids, frequencies, weights in self.postings.values():
+            weights.view[:] = self._weight(frequencies.view, lengths[doc_ids.view])
+
+    def add(self, entry: MemoryEntry, text: str, vector: Optional[np.ndarray]):
+        doc_id = len(self.entries)
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        self.entries.append(entry)
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        for token, count in counts.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = (
+                    _GrowableArray(np.int32), _GrowableArray(np.float32), _GrowableArray(np.float32)
+                )
+            postings[0].append(doc_id)
+            postings[1].append(count)
+            postings[2].append(self._weight(count, len(tokens)))
+        if self.vectors is not None and vector is not None:
+            self.vectors.append(vector)
+        if len(self.entries) > self._snapshot_size * self._REFRESH_GROWTH:
+            self._refresh_weights()
+
+    def bm25(self, terms: Sequence[str]) -> Optional[np.ndarray]:
+        count = len(self.entries)
+        scores = None
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            doc_ids, weights = postings[0].view, postings[2].view
+            idf = np.log1p((count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            if scores is None:
+                scores = np.zeros(count, dtype=np.float32)
+            # Doc ids are unique within one posting list, so fancy-index += is safe.
+            scores[doc_ids] += np.float32(idf) * weights
+        return scores
+
+
+def _top_k(scores: np.ndarray, k: int) -> List[int]:
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return sorted(candidates.tolist(), key=lambda doc_id: -scores[doc_id])
+
+
+class IndexedMemoryService(BaseMemoryService):
+    """
+    Local memory service with a per-user inverted index scored by BM25.
+
+    Inserts are incremental: re-adding a session only looks at events past the
+    session's high-water mark, so indexing a turn costs the size of the turn,
+    not of the history. Posting lists are NumPy arrays, so a query touches only
+    the documents containing its terms and costs a few vector operations per
+    term rather than a Python loop per document.
+
+    If `embed` (text -> 1-D vector) is given, memories are also kept in a
+    normalized NumPy matrix and results are fused with cosine-similarity
+    rankings via reciprocal rank fusion.
+    """
+
+    def __init__(
+        self,
+        top_k: int = 5,
+        embed: Optional[Callable[[str], np.ndarray]] = None,
+        dimensions: Optional[int] = None,
+    ):
+        if embed is not None and not dimensions:
+            raise ValueError("dimensions is required when an embed function is given.")
+        self._top_k = top_k
+        self._embed = embed
+        self._dimensions = dimensions if embed is not None else None
+        self._indexes: Dict[Tuple[str, str], _UserIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, app_name: str, user_id: str) -> _UserIndex:
+        key = (app_name, user_id)
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = _UserIndex(self._dimensions)
+        return index
+
+    def _vector(self, text: str) -> Optional[np.ndarray]:
+        if self._embed is None:
+            return None
+        vector = np.asarray(self._embed(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _insert_events(self, app_name: str, user_id: str, events: Sequence[Event]) -> int:
+        added = 0
+        with self._lock:
+            index = self._index(app_name, user_id)
+            for event in events:
+                if not event.content or not event.content.parts:
+                    continue
+                if event.id and event.id in index.seen_event_ids:
+                    continue
+                text = " ".join(part.text for part in event.content.parts if part.text)
+                if not text.strip():
+                    continue
+                if event.id:
+                    index.seen_event_ids.add(event.id)
+                entry = MemoryEntry(
+                    content=event.content,
+                    author=event.author,
+                    timestamp=datetime.fromtimestamp(event.timestamp, tz=timezone.utc).isoformat(),
+                )
+                index.add(entry, text, self._vector(text))
+                added += 1
+        return added
+
+    async def add_session_to_memory(self, session: Session) -> None:
+        with self._lock:
+            marks = self._index(session.app_name, session.user_id).session_marks
+            start = marks.get(session.id, 0)
+            if start > len(session.events):
+                # The session was rewritten (deleted and recreated); event ids still dedupe.
+                start = 0
+            marks[session.id] = len(session.events)
+        self._insert_events(session.app_name, session.user_id, session.events[start:])
+
+    async def add_events_to_memory(self, *, app_name: str, user_id: str, events: Sequence[Event], **kwargs) -> None:
+        self._insert_events(app_name, user_id, events)
+
+    def search(self, app_name: str, user_id: str, query: str, top_k: Optional[int] = None) -> List[MemoryEntry]:
+        top_k = top_k or self._top_k
+        with self._lock:
+            index = self._indexes.get((app_name, user_id))
+            if index is None or not index.entries:
+                return []
+
+            scores = index.bm25(tokenize(query))
+            ranked = _top_k(scores, top_k) if scores is not None else []
+
+            if index.vectors is not None and index.vectors.size:
+                similarities = index.vectors.view @ self._vector(query)
+                by_vector = _top_k(similarities, top_k)
+                fused: Dict[int, float] = {}
+                for ranking in (ranked, by_vector):
+                    for rank, doc_id in enumerate(ranking):
+                        fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (_RRF_K + rank)
+                ranked = heapq.nlargest(top_k, fused, key=fused.get)
+
+            return [index.entries[doc_id] for doc_id in ranked]
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        return SearchMemoryResponse(memories=self.search(app_name, user_id, query))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._indexes),
+                "memories": sum(len(index.entries) for index in self._indexes.values()),
+                "terms": sum(len(index.postings) for index in self._indexes.values()),
+            }
@@ -0,0 +1,112 @@
+# Per-turn model tiering: flash or pro for the specialists, chosen from cheap local signals
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+
+from config.settings import (
+    MODEL_NAME,
+    ROUTING_MODEL,
+    TIER_LATENCY_SAMPLES,
+    TIER_LATENCY_WINDOW_SECONDS,
+    TIER_LONG_MESSAGE_WORDS,
+    TIER_MIN_ROUTE_CONFIDENCE,
+    TIER_PRO_RISK_SCORE,
+    TIER_PRO_TTFT_TARGET_MS,
+)
+
+FLASH = "flash"
+PRO = "pro"
+TIER_MODELS: Dict[str, str] = {FLASH: ROUTING_MODEL, PRO: MODEL_NAME}
+
+
+class TierDecision(NamedTuple):
+    tier: str
+    model: str
+    reason: str   # The signal that decided it
+
+
+# The current turn's decision; TierPlugin (core/plugins.py) applies it to specialist calls
+_turn_tier: contextvars.ContextVar[Optional[TierDecision]] = contextvars.ContextVar("withyou_turn_tier", default=None)
+
+
+class _LatencyWindow:
+    """Time-to-first-response of recent calls to one model, oldest dropped first."""
+
+    def __init__(self):
+        self.samples: Deque[Tuple[float, float]] = deque(maxlen=TIER_LATENCY_SAMPLES)
+
+    def p90(self, now: float) -> Optional[float]:
+        while self.samples and now - self.samples[0][0] > TIER_LATENCY_WINDOW_SECONDS:
+            self.samples.popleft()
+        if len(self.samples) < 5:
+            return None  # Too little recent evidence to call the model slow
+        ordered = sorted(seconds for _, seconds in self.samples)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+
+class TierPolicy:
+    """
+    Picks the model tier for a turn. Pro is kept for turns that need it:
+    long messages, any risk signal, or intents the router was unsure of;
+    short, clearly routed check-ins go to flash.
+
+    Pro is also skipped while its recent p90 time-to-first-response is over
+    TIER_PRO_TTFT_TARGET_MS (which includes time queued in the scheduler).
+    Samples older than TIER_LATENCY_WINDOW_SECONDS expire, so once flash has
+    carried the traffic for a window, pro is tried again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: Dict[str, _LatencyWindow] = {model: _LatencyWindow() for model in TIER_MODELS.values()}
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+    def choose(self, user_input: str, risk_score: float, route_confidence: Optional[float]) -> TierDecision:
+        """`route_confidence` is the local router's; None where there is no router."""
+        if risk_score >= TIER_PRO_RISK_SCORE:
+            tier, reason = PRO, "risk_score"
+        elif len(user_input.split()) >= TIER_LONG_MESSAGE_WORDS:
+            tier, reason = PRO, "long_message"
+        elif route_confidence is not None and route_confidence < TIER_MIN_ROUTE_CONFIDENCE:
+            tier, reason = PRO, "uncertain_route"
+        else:
+            tier, reason = FLASH, "short_check_in"
+        if tier == PRO and not self.pro_within_target():
+            tier, reason = FLASH, "pro_over_latency_target"
+        with self._lock:
+            self._counts[(tier, reason)] = self._counts.get((tier, reason), 0) + 1
+        return TierDecision(tier, TIER_MODELS[tier], reason)
+
+    def pro_within_target(self) -> bool:
+        with self._lock:
+            p90 = self._latency[TIER_MODELS[PRO]].p90(time.monotonic())
+        return p90 is None or p90 * 1000 <= TIER_PRO_TTFT_TARGET_MS
+
+    def observe(self, model: str, seconds: float):
+        window = self._latency.get(model)
+        if window is not None:
+            with self._lock:
+                window.samples.append((time.monotonic(), seconds))
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        with self._lock:
+            p90 = {model: window.p90(now) for model, window in self._latency.items()}
+            counts = dict(self._counts)
+        return {
+            "turns": {f"{tier}/{reason}": count for (tier, reason), count in sorted(counts.items())},
+            "ttft_p90_ms": {model: None if value is None else round(value * 1000, 1) for model, value in p90.items()},
+        }
+
+
+def set_turn_tier(decision: Optional[TierDecision]):
+    _turn_tier.set(decision)
+
+
+def turn_tier() -> Optional[TierDecision]:
+    return _turn_tier.get()
+
+
+tier_policy = TierPolicy()
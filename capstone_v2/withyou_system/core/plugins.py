@@ -0,0 +1,121 @@
+# ADK runner plugins: per-turn model tiers and tracing spans. The registry
+# imports this when it builds the first runner, so the ADK loads on first use.
+import time
+from typing import Dict, Tuple
+
+from google.adk.plugins import BasePlugin
+
+from config.settings import TIERED_AGENTS
+from core.model_tiers import TierPolicy, tier_policy, turn_tier
+from core.tracing import Span, Tracer, tracer
+
+
+class TierPlugin(BasePlugin):
+    """
+    Runner plugin: points TIERED_AGENTS' model calls at the turn's tier
+    (llm_request.model is what the client sends) and feeds every model
+    call's time to first response back into the policy. Registered ahead
+    of the tracing plugin so model spans show the model actually used.
+    """
+
+    def __init__(self, policy: TierPolicy):
+        super().__init__(name="withyou_model_tiers")
+        self.policy = policy
+        self._started: Dict[str, Tuple[str, float]] = {}
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        decision = turn_tier()
+        if decision is not None and callback_context.agent_name in TIERED_AGENTS:
+            llm_request.model = decision.model
+        key = f"{callback_context.invocation_id}/{callback_context.agent_name}"
+        self._started[key] = (llm_request.model, time.perf_counter())
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        # The first response, partial or not, marks time to first token
+        started = self._started.pop(f"{callback_context.invocation_id}/{callback_context.agent_name}", None)
+        if started is not None:
+            self.policy.observe(started[0], time.perf_counter() - started[1])
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        # A call that failed (or timed out in the queue) counts at the time it took
+        started = self._started.pop(f"{callback_context.invocation_id}/{callback_context.agent_name}", None)
+        if started is not None:
+            self.policy.observe(started[0], time.perf_counter() - started[1])
+        return None
+
+
+class TracingPlugin(BasePlugin):
+    """
+    Runner plugin: a span per model call (with token counts and retries) and
+    per tool call. AgentTool calls are their own stage, so a specialist's
+    time shows up separately from the triage model that chose it. ADK hands
+    plugins down to AgentTool's sub-runners, so nested calls are traced too.
+    """
+
+    def __init__(self, tracer: Tracer):
+        super().__init__(name="withyou_tracing")
+        self.tracer = tracer
+        self._open: Dict[Tuple[str, str], Span] = {}
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        span = self.tracer.start_span("llm", callback_context.agent_name, model=llm_request.model)
+        self._open[("llm", f"{callback_context.invocation_id}/{callback_context.agent_name}")] = span
+        self.tracer.bind_model_span(span)
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        key = ("llm", f"{callback_context.invocation_id}/{callback_context.agent_name}")
+        span = self._open.get(key)
+        if span is None:
+            return None
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            span.attributes["prompt_tokens"] = usage.prompt_token_count or 0
+            span.attributes["output_tokens"] = usage.candidates_token_count or 0
+        if not llm_response.partial:
+            del self._open[key]
+            self.tracer.bind_model_span(None)
+            self.tracer.add_tokens(
+                callback_context.agent_name,
+                span.attributes.get("prompt_tokens", 0),
+                span.attributes.get("output_tokens", 0),
+            )
+            self.tracer.end_span(span)
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        span = self._open.pop(("llm", f"{callback_context.invocation_id}/{callback_context.agent_name}"), None)
+        if span is not None:
+            self.tracer.bind_model_span(None)
+            self.tracer.end_span(span, error=type(error).__name__)
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        from google.adk.tools.agent_tool import AgentTool
+
+        stage = "agent_tool" if isinstance(tool, AgentTool) else "tool"
+        self._open[("tool", tool_context.function_call_id or tool.name)] = self.tracer.start_span(
+            stage, tool.name, agent=tool_context.agent_name
+        )
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        span = self._open.pop(("tool", tool_context.function_call_id or tool.name), None)
+        if span is not None:
+            self.tracer.end_span(span)
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        span = self._open.pop(("tool", tool_context.function_call_id or tool.name), None)
+        if span is not None:
+            self.tracer.end_span(span, error=type(error).__name__)
+        return None
+
+
+tier_plugin = TierPlugin(tier_policy)
+tracing_plugin = TracingPlugin(tracer)
+
+# Order matters: the tier plugin sets the model before the span records it
+RUNNER_PLUGINS = [tier_plugin, tracing_plugin]
@@ -0,0 +1,289 @@
+# Deterministic PII redaction: compiled patterns + gazetteer, stable placeholders per user
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from config.settings import PII_GAZETTEER_PATH, REDACTION_SESSIONS
+from core.safety_guard import CrisisMatcher
+
+_MONTHS = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+)
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+
+# Patterns are grouped by what their first character can be. Each group is
+# one regex behind a lookahead on that character, which the regex engine
+# rejects in a single step at most positions. Within a group, alternatives
+# are tried left to right, so more specific shapes come first (an Aadhaar
+# number would otherwise read as a phone number).
+PII_PATTERNS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    r"[\d+(]": (
+        ("SSN", r"(?<!\d)\d{3}-\d{2}-\d{4}(?!\d)"),
+        ("AADHAAR", r"(?<!\d)[2-9]\d{3}[ -]?\d{4}[ -]?\d{4}(?![\d-])"),
+        ("DATE", (
+            r"(?<!\d)(?:\d{4}-\d{2}-\d{2}|\d{1,2}[/.-]\d{1,2}[/.-](?:\d{4}|\d{2}))(?![\d/.-]\d)"
+            rf"|(?i:\b{_DAY}\s+(?:of\s+)?{_MONTHS}\b\.?(?:,?\s+\d{{4}}\b)?)"
+        )),
+        ("PHONE", r"(?<![\w+])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{2,5}\)[\s.-]?)?\d{2,5}(?:[\s.-]?\d{2,5}){1,3}(?!\d)"),
+        ("ID", r"\b\d{6,}\b"),
+    ),
+    r"[A-Zjfmasond]": (
+        ("PAN", r"\b[A-Z]{3}[ABCFGHLJPT][A-Z]\d{4}[A-Z]\b"),
+        ("ID", r"\b[A-Z]{2,5}[-/]?\d{6,}\b"),
+        ("DATE", rf"(?i:\b{_MONTHS}\.?\s+{_DAY}\b(?:,?\s+\d{{4}}\b)?)"),
+    ),
+    r"[A-Za-z0-9._%+-]": (
+        ("EMAIL", r"(?<![A-Za-z0-9._%+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}"),
+    ),
+}
+
+
+def _compile_group(first: str, patterns: Tuple[Tuple[str, str], ...]) -> "re.Pattern[str]":
+    branches = "|".join(f"(?P<{kind}_{index}>{pattern})" for index, (kind, pattern) in enumerate(patterns))
+    return re.compile(f"(?={first})(?:{branches})")
+
+
+_DIGIT_PATTERN, _LETTER_PATTERN, _EMAIL_PATTERN = (
+    _compile_group(first, patterns) for first, patterns in PII_PATTERNS.items()
+)
+_HAS_DIGIT = re.compile(r"\d")
+
+# Phone candidates are any digit groups; only plausible lengths are kept, so
+# "2023-2024" or a 4-digit helpline number is left alone.
+_PHONE_DIGITS = (10, 13)
+_INTERNATIONAL_DIGITS = (8, 15)
+
+# Streaming keeps this many characters back so no match can straddle a chunk
+# boundary; it must exceed the longest PII span the patterns can produce.
+_STREAM_HOLDBACK = 96
+
+
+class PiiMatch(NamedTuple):
+    kind: str
+    start: int
+    end: int
+    value: str
+
+
+def _canonical(kind: str, value: str) -> str:
+    """The identity of a value, so "98204 66726" and "9820466726" share a placeholder."""
+    if kind in ("PHONE", "AADHAAR", "SSN"):
+        digits = re.sub(r"\D", "", value)
+        return digits[-10:] if kind == "PHONE" else digits
+    if kind in ("PAN", "ID"):
+        return re.sub(r"[\s/-]", "", value).upper()
+    return " ".join(value.casefold().split())
+
+
+class RedactionSession:
+    """
+    Numbered placeholders ("[NAME_1]", "[PHONE_2]") that stay the same for
+    the same value, so a redacted conversation still reads coherently: every
+    mention of one person becomes the same token.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[Tuple[str, str], str] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def token(self, kind: str, value: str) -> str:
+        key = (kind, _canonical(kind, value))
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None:
+                self._counts[kind] = self._counts.get(kind, 0) + 1
+                token = self._tokens[key] = f"[{kind}_{self._counts[kind]}]"
+            return token
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+
+class HashedTokens:
+    """
+    Placeholders for logs: kind plus a short keyed hash ("[PHONE:3fa2c01b]").
+    Stable for the process lifetime, so records about one value can be
+    correlated, without storing a table of originals.
+    """
+
+    def __init__(self, key: Optional[bytes] = None):
+        self._key = key or os.urandom(32)
+
+    def token(self, kind: str, value: str) -> str:
+        digest = hmac.new(self._key, f"{kind}\x00{_canonical(kind, value)}".encode("utf-8"), hashlib.sha256)
+        return f"[{kind}:{digest.hexdigest()[:8]}]"
+
+
+def load_gazetteer(path: str) -> Dict[str, List[str]]:
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    return {"NAME": data["names"], "PLACE": data["places"]}
+
+
+class Redactor:
+    """
+    Finds PII in one pass of a combined regex (emails, phones, dates, IDs)
+    and one pass of the gazetteer trie (names, places), then replaces each
+    span with a placeholder. Deterministic: the same text and session always
+    give the same output, and no text leaves the process.
+
+    Gazetteer names only match when capitalized (in scripts that have case),
+    so "grace under pressure" is left alone but "Priya" is not; places match
+    in any case.
+    """
+
+    def __init__(self, gazetteer: Dict[str, Iterable[str]]):
+        self._gazetteer = CrisisMatcher(gazetteer)
+
+    def find(self, text: str) -> List[PiiMatch]:
+        candidates: List[PiiMatch] = []
+        # Every pattern except EMAIL needs a digit; EMAIL needs an "@".
+        patterns = [_DIGIT_PATTERN, _LETTER_PATTERN] if _HAS_DIGIT.search(text) else []
+        if "@" in text:
+            patterns.append(_EMAIL_PATTERN)
+        for match in (match for pattern in patterns for match in pattern.finditer(text)):
+            kind = match.lastgroup.rpartition("_")[0]
+            value = match.group()
+            if kind == "PHONE":
+                digits = sum(char.isdigit() for char in value)
+                low, high = _INTERNATIONAL_DIGITS if value.startswith("+") else _PHONE_DIGITS
+                if not low <= digits <= high:
+                    continue
+            candidates.append(PiiMatch(kind, match.start(), match.end(), value))
+        for match in self._gazetteer.scan(text):
+            if match.language == "NAME" and text[match.start].islower():
+                continue
+            candidates.append(PiiMatch(match.language, match.start, match.end, text[match.start:match.end]))
+
+        # Earliest start wins; at the same start, the longer span.
+        candidates.sort(key=lambda item: (item.start, -item.end))
+        matches: List[PiiMatch] = []
+        covered = 0
+        for candidate in candidates:
+            if candidate.start >= covered:
+                matches.append(candidate)
+                covered = candidate.end
+        return matches
+
+    def _replace(self, text: str, matches: List[PiiMatch], session) -> str:
+        parts, position = [], 0
+        for match in matches:
+            parts.append(text[position:match.start])
+            parts.append(session.token(match.kind, match.value))
+            position = match.end
+        parts.append(text[position:])
+        return "".join(parts)
+
+    def redact(self, text: str, session) -> str:
+        """`session` is a RedactionSession or HashedTokens."""
+        if not text:
+            return text
+        return self._replace(text, self.find(text), session)
+
+    def redact_stream(self, chunks: Iterable[str], session) -> Iterator[str]:
+        """
+        Redacts text arriving in chunks (e.g. a streamed model reply). Output
+        is held back until it ends in whitespace outside any match and at
+        least `_STREAM_HOLDBACK` characters before the end of what has
+        arrived, so the concatenated output equals `redact()` of the whole.
+        """
+        buffer = ""
+        for chunk in chunks:
+            buffer += chunk
+            # Scan once per holdback's worth of new text, not once per chunk
+            if len(buffer) < 2 * _STREAM_HOLDBACK:
+                continue
+            limit = len(buffer) - _STREAM_HOLDBACK
+            matches = self.find(buffer)
+            cut = _safe_cut(buffer, limit, matches)
+            if cut:
+                yield self._replace(buffer[:cut], [m for m in matches if m.end <= cut], session)
+                buffer = buffer[cut:]
+        if buffer:
+            yield self.redact(buffer, session)
+
+
+def _safe_cut(text: str, limit: int, matches: List[PiiMatch]) -> int:
+    """Last whitespace position at or before `limit` that no match spans (0 if none)."""
+    cut = limit
+    index = len(matches) - 1
+    while cut > 0:
+        cut = max(text.rfind(" ", 0, cut), text.rfind("\n", 0, cut))
+        if cut <= 0:
+            return 0
+        while index >= 0 and matches[index].start >= cut:
+            index -= 1
+        if index < 0 or matches[index].end <= cut:
+            return cut
+    return 0
+
+
+_redactor: Optional[Redactor] = None
+_redactor_lock = threading.Lock()
+
+
+def get_redactor() -> Redactor:
+    global _redactor
+    if _redactor is None:
+        with _redactor_lock:
+            if _redactor is None:
+                _redactor = Redactor(load_gazetteer(PII_GAZETTEER_PATH))
+    return _redactor
+
+
+# Placeholder tables per user, least recently used dropped first
+_sessions: "OrderedDict[str, RedactionSession]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+# Process-wide keyed hashing for telemetry sinks
+log_tokens = HashedTokens()
+
+
+def session_tokens(key: str) -> RedactionSession:
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = RedactionSession()
+            while len(_sessions) > REDACTION_SESSIONS:
+                _sessions.popitem(last=False)
+        else:
+            _sessions.move_to_end(key)
+        return session
+
+
+# Pseudonymous identifiers the audit trail needs verbatim
+_LOG_KEYS_KEPT = frozenset({"user_id", "session_id", "session", "turn_id", "trace_id"})
+
+
+def redact_for_log(value):
+    """Redacts strings (also inside dicts and lists) for a log record."""
+    if isinstance(value, str):
+        return get_redactor().redact(value, log_tokens)
+    if isinstance(value, dict):
+        return {key: item if key in _LOG_KEYS_KEPT else redact_for_log(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact_for_log(item) for item in value]
+    return value
+
+
+def redact_llm_request(callback_context, llm_request):
+    """
+    before_model_callback: replaces PII in every text part of the request in
+    place, before it is sent to the model. Placeholders are per user, so
+    "[NAME_1]" means the same person in every handoff for that user, even
+    though AgentTool gives each call a fresh session.
+    """
+    redactor = get_redactor()
+    session = session_tokens(callback_context.user_id)
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                part.text = redactor.redact(part.text, session)
+    return None
@@ -0,0 +1,111 @@
+# Process-wide registry: model clients, agents and runners are built once, lazily
+import importlib
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from config.settings import APP_NAME, FAKE_LLM
+
+# Agent name -> (module, attribute). Modules are imported on first use only.
+AGENT_MODULES: Dict[str, Tuple[str, str]] = {
+    "safety_sentinel": ("agents.safety_agent", "safety_agent"),
+    "clinical_triage": ("agents.triage_agent", "triage_agent"),
+    "cbt_coach": ("agents.coach_agent", "coach_agent"),
+    "behavioral_planner": ("agents.planner_agent", "planner_agent"),
+    "clinician_bridge": ("agents.clinician_agent", "clinician_agent"),
+}
+
+
+@lru_cache(maxsize=None)
+def _root_runner_class():
+    from google.adk.runners import Runner
+
+    class RootRunner(Runner):
+        """
+        Runner that always hands the turn to its root agent.
+
+        Direct specialist runners share the user's session with
+        clinical_triage and with each other, and no agent here has sub-agents
+        to transfer to. ADK's default lookup walks the history for the last
+        agent that replied, warns "Event from an unknown agent" for every
+        event another runner's agent wrote, then falls back to the root
+        anyway. Those events still reach the model as conversation context.
+        """
+
+        def _find_agent_to_run(self, session, root_agent):
+            return root_agent
+
+    return RootRunner
+
+
+class Registry:
+    """
+    Holds one Gemini model object per model name, one agent per agent name and
+    one Runner per agent. Every agent on the same model shares that model's
+    Gemini object, and with it one API client and its pooled HTTP connections.
+    Model objects are wrapped in ScheduledLlm, so every call goes through the
+    shared scheduler's rate limit and priority lanes.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._models: Dict[str, Any] = {}
+        self._agents: Dict[str, Any] = {}
+        self._runners: Dict[str, Any] = {}
+
+    def model(self, model_name: str):
+        with self._lock:
+            if model_name not in self._models:
+                from core.scheduled_llm import NO_RETRY, ScheduledLlm
+                if FAKE_LLM:
+                    from core.fake_llm import FakeGemini as Gemini
+                else:
+                    from google.adk.models.google_llm import Gemini
+                client = Gemini(model=model_name, retry_options=NO_RETRY)
+                self._models[model_name] = ScheduledLlm(model=model_name, inner=client)
+            return self._models[model_name]
+
+    def agent(self, agent_name: str):
+        with self._lock:
+            if agent_name not in self._agents:
+                module_name, attribute = AGENT_MODULES[agent_name]
+                module = importlib.import_module(module_name)
+                self._agents[agent_name] = getattr(module, attribute)
+            return self._agents[agent_name]
+
+    def runner(self, agent_name: str):
+        with self._lock:
+            if agent_name not in self._runners:
+                from core.memory import get_runner_session_service, get_session_services
+                from core.plugins import RUNNER_PLUGINS
+
+                _, memory_service = get_session_services()
+                self._runners[agent_name] = _root_runner_class()(
+                    app_name=APP_NAME,
+                    agent=self.agent(agent_name),
+                    session_service=get_runner_session_service(),
+                    memory_service=memory_service,
+                    plugins=RUNNER_PLUGINS,
+                )
+            return self._runners[agent_name]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counts of objects held. Each model object owns one API client, so
+        `http_clients` is the number of distinct connection pools in use.
+        """
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "agents": len(self._agents),
+                "runners": len(self._runners),
+                "http_clients": len(self._models),
+            }
+
+
+registry = Registry()
+
+
+def get_model(model_name: str):
+    """Shared Gemini model object for `model_name`."""
+    return registry.model(model_name)
@@ -0,0 +1,557 @@
+# Reminder engine behind schedule_routine: recurrence rules, durable SQLite store, near-horizon heap
+import heapq
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, tzinfo
+from datetime import time as clock
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from core.telemetry import log_agent_action
+
+ONCE = "ONCE"
+DAILY = "DAILY"
+WEEKLY = "WEEKLY"
+HOURLY = "HOURLY"
+
+_DAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+_DAY_LABELS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_DAY_NAMES = {
+    "mon": 0, "monday": 0, "tue": 1, "tues": 1, "tuesday": 1, "wed": 2, "wednesday": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3, "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5, "sun": 6, "sunday": 6,
+}
+_DAILY_WORDS = frozenset({
+    "", "daily", "every day", "everyday", "each day", "nightly", "every night",
+    "every morning", "every afternoon", "every evening",
+})
+_WEEKDAY_WORDS = frozenset({"weekdays", "every weekday", "on weekdays", "workdays"})
+_WEEKEND_WORDS = frozenset({"weekends", "every weekend", "on weekends"})
+_WEEKLY_WORDS = frozenset({"weekly", "every week", "once a week"})
+_ONCE_WORDS = frozenset({"once", "one time", "just once", "today", "tonight"})
+_FILLER = frozenset({"every", "each", "on", "and", "the", "at"})
+_RANGE = frozenset({"to", "through", "thru", "until"})
+
+_TIME = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*(?:([ap])\.?m\.?)?$")
+_EVERY = re.compile(r"^every (\d+|other) (day|days|hour|hours|week|weeks)$")
+
+
+class Recurrence(NamedTuple):
+    """
+    When a reminder fires, in the user's local time. The canonical text
+    form (`rule`) is an RRULE-like string, e.g. "FREQ=WEEKLY;BYDAY=MO,TH;AT=07:30".
+    """
+
+    freq: str                     # ONCE | DAILY | WEEKLY | HOURLY
+    hour: int
+    minute: int
+    interval: int = 1             # Every N days (DAILY) or hours (HOURLY)
+    weekdays: Tuple[int, ...] = ()  # WEEKLY: 0 = Monday
+    start: Optional[date] = None  # The day for ONCE; the anchor for intervals
+
+    @property
+    def rule(self) -> str:
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.weekdays:
+            parts.append("BYDAY=" + ",".join(_DAY_CODES[day] for day in self.weekdays))
+        if self.start is not None:
+            parts.append(f"START={self.start.isoformat()}")
+        parts.append(f"AT={self.hour:02d}:{self.minute:02d}")
+        return ";".join(parts)
+
+    def describe(self) -> str:
+        at = f"{self.hour:02d}:{self.minute:02d}"
+        if self.freq == ONCE:
+            return f"once at {at}" + (f" on {self.start.isoformat()}" if self.start else "")
+        if self.freq == HOURLY:
+            return f"every {self.interval} hour{'s' if self.interval > 1 else ''} from {at}"
+        if self.freq == WEEKLY:
+            if self.weekdays == (0, 1, 2, 3, 4):
+                return f"weekdays at {at}"
+            return ", ".join(_DAY_LABELS[day] for day in self.weekdays) + f" at {at}"
+        return f"daily at {at}" if self.interval == 1 else f"every {self.interval} days at {at}"
+
+    def anchored(self, now: float, tz: tzinfo) -> "Recurrence":
+        """
+        Fills in `start` for rules that need one: today, or tomorrow if the
+        time has already passed today (hourly rules keep today and fire at
+        the next step).
+        """
+        if self.start is not None or not (self.freq in (ONCE, HOURLY) or (self.freq == DAILY and self.interval > 1)):
+            return self
+        local = datetime.fromtimestamp(now, tz)
+        day = local.date()
+        if self.freq != HOURLY and (local.hour, local.minute) >= (self.hour, self.minute):
+            day += timedelta(days=1)
+        return self._replace(start=day)
+
+    def next_after(self, after: float, tz: tzinfo) -> Optional[float]:
+        """The first occurrence strictly after `after` (epoch seconds); None when there is none."""
+        at = clock(self.hour, self.minute)
+        if self.freq == HOURLY:
+            anchor = datetime.combine(self.start, at, tzinfo=tz).timestamp()
+            if after < anchor:
+                return anchor
+            step = self.interval * 3600
+            return anchor + (int((after - anchor) // step) + 1) * step
+        if self.freq == ONCE:
+            due = datetime.combine(self.start, at, tzinfo=tz).timestamp()
+            return due if due > after else None
+        day = datetime.fromtimestamp(after, tz).date()
+        for offset in range(max(self.interval, 7) + 1):
+            candidate = day + timedelta(days=offset)
+            if self._fires_on(candidate):
+                due = datetime.combine(candidate, at, tzinfo=tz).timestamp()
+                if due > after:
+                    return due
+        return None
+
+    def _fires_on(self, day: date) -> bool:
+        if self.freq == WEEKLY:
+            return day.weekday() in self.weekdays
+        if self.start is None:
+            return True
+        return day >= self.start and (day - self.start).days % self.interval == 0
+
+
+def parse_time(text: str) -> Tuple[int, int]:
+    """"22:00", "7:30", "7:30 am", "10pm", "noon" -> (hour, minute)."""
+    text = text.strip().lower()
+    if text in ("noon", "midday"):
+        return 12, 0
+    if text == "midnight":
+        return 0, 0
+    match = _TIME.match(text)
+    if match is None:
+        raise ValueError(f"Unrecognized time {text!r}; use HH:MM (24h).")
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if match.group(3):
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Unrecognized time {text!r}; use HH:MM (24h).")
+        hour = hour % 12 + (12 if match.group(3) == "p" else 0)
+    if hour > 23 or minute > 59:
+        raise ValueError(f"Unrecognized time {text!r}; use HH:MM (24h).")
+    return hour, minute
+
+
+@lru_cache(maxsize=4096)
+def from_rule(rule: str) -> Recurrence:
+    """Parses a canonical rule (Recurrence.rule). Cached: many reminders share one rule."""
+    try:
+        fields = dict(part.split("=", 1) for part in rule.strip().upper().split(";") if part)
+    except ValueError:
+        raise ValueError(f"Malformed rule {rule!r}") from None
+    freq = fields.get("FREQ")
+    if freq not in (ONCE, DAILY, WEEKLY, HOURLY):
+        raise ValueError(f"Unsupported FREQ in {rule!r}; use ONCE, DAILY, WEEKLY or HOURLY.")
+    if "AT" not in fields:
+        raise ValueError(f"Rule {rule!r} has no AT=HH:MM")
+    hour, minute = parse_time(fields["AT"])
+    interval = int(fields.get("INTERVAL", "1"))
+    start = date.fromisoformat(fields["START"]) if "START" in fields else None
+    weekdays: Tuple[int, ...] = ()
+    if "BYDAY" in fields:
+        try:
+            weekdays = tuple(sorted({_DAY_CODES.index(code) for code in fields["BYDAY"].split(",")}))
+        except ValueError:
+            raise ValueError(f"Unknown BYDAY in {rule!r}; use MO,TU,WE,TH,FR,SA,SU.") from None
+    if interval < 1:
+        raise ValueError(f"INTERVAL must be at least 1 in {rule!r}")
+    if freq == WEEKLY:
+        if interval != 1:
+            # Every N weeks on one day is the same as every 7N days from that day
+            raise ValueError(f"Use FREQ=DAILY;INTERVAL={7 * interval} for every {interval} weeks.")
+        if not weekdays and start is not None:
+            weekdays = (start.weekday(),)
+        if not weekdays:
+            raise ValueError(f"FREQ=WEEKLY needs BYDAY in {rule!r}")
+    return Recurrence(freq, hour, minute, interval, weekdays, start)
+
+
+def _weekdays_from_words(text: str) -> Tuple[int, ...]:
+    """"mondays and thursdays", "mon, wed, fri", "monday to friday", "fri to mon" -> weekday numbers; () if not days."""
+    days: List[int] = []
+    in_range = False
+    for word in re.findall(r"[a-z]+", text):
+        if word in _FILLER:
+            continue
+        if word in _RANGE:
+            in_range = bool(days)
+            continue
+        day = _DAY_NAMES.get(word, _DAY_NAMES.get(word.rstrip("s")))
+        if day is None:
+            return ()
+        if in_range:
+            # Ranges wrap past Sunday: "friday to monday" is Fri, Sat, Sun, Mon
+            last = days[-1]
+            days.extend((last + k) % 7 for k in range(1, (day - last) % 7 + 1))
+            in_range = False
+        else:
+            days.append(day)
+    return tuple(sorted(set(days)))
+
+
+def parse_recurrence(time_text: str, frequency: str) -> Recurrence:
+    """
+    Turns schedule_routine's `time` and `frequency` into a Recurrence.
+    Understands "daily", "weekdays", "weekends", "weekly", "once",
+    "every 2 days", "every other day", "every 3 hours", "hourly",
+    "every 2 weeks", day lists ("mon, wed, fri", "tuesdays and thursdays",
+    "monday to friday"), and rules ("FREQ=WEEKLY;BYDAY=MO,TH").
+    """
+    hour, minute = parse_time(time_text)
+    raw = frequency.strip()
+    if raw.upper().startswith("FREQ="):
+        rule = raw.upper() if "AT=" in raw.upper() else f"{raw.upper().rstrip(';')};AT={hour:02d}:{minute:02d}"
+        return from_rule(rule)
+
+    text = " ".join(raw.lower().replace("-", " to ").replace(",", " ").split())
+    if text in _DAILY_WORDS:
+        return Recurrence(DAILY, hour, minute)
+    if text in _WEEKDAY_WORDS:
+        return Recurrence(WEEKLY, hour, minute, weekdays=(0, 1, 2, 3, 4))
+    if text in _WEEKEND_WORDS:
+        return Recurrence(WEEKLY, hour, minute, weekdays=(5, 6))
+    if text in _WEEKLY_WORDS:
+        return Recurrence(DAILY, hour, minute, interval=7)   # Anchored on the first occurrence
+    if text in _ONCE_WORDS:
+        return Recurrence(ONCE, hour, minute)
+    if text in ("hourly", "every hour"):
+        return Recurrence(HOURLY, hour, minute)
+    match = _EVERY.match(text)
+    if match:
+        count = 2 if match.group(1) == "other" else int(match.group(1))
+        if count < 1:
+            raise ValueError(f"Unrecognized frequency {frequency!r}")
+        if match.group(2).startswith("hour"):
+            return Recurrence(HOURLY, hour, minute, interval=count)
+        days = count * 7 if match.group(2).startswith("week") else count
+        return Recurrence(DAILY, hour, minute, interval=days)
+    weekdays = _weekdays_from_words(text)
+    if weekdays:
+        return Recurrence(WEEKLY, hour, minute, weekdays=weekdays)
+    raise ValueError(
+        f"Unrecognized frequency {frequency!r}; try 'daily', 'weekdays', 'mon, wed, fri', "
+        "'every 2 days' or a rule like 'FREQ=WEEKLY;BYDAY=MO,TH'."
+    )
+
+
+@lru_cache(maxsize=256)
+def _zone(name: str) -> tzinfo:
+    return ZoneInfo(name)
+
+
+def check_timezone(name: str) -> str:
+    """Returns the IANA zone name, or raises ValueError if it is not one."""
+    name = name.strip()
+    try:
+        _zone(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone '{name}'. Use an IANA name such as 'Europe/London' or 'Asia/Kolkata'.") from None
+    return name
+
+
+class Reminder(NamedTuple):
+    id: int
+    user_id: str
+    activity: str
+    rule: str
+    timezone: str
+    next_due: float   # Epoch seconds
+
+    def next_due_local(self) -> datetime:
+        return datetime.fromtimestamp(self.next_due, _zone(self.timezone))
+
+
+class DueReminder(NamedTuple):
+    id: int
+    user_id: str
+    activity: str
+    due: float        # When it was scheduled to fire
+    late: float       # Seconds between `due` and delivery
+
+
+class JsonlOutbox:
+    """Local sink: appends delivered reminders to a JSONL file the app (or a push relay) tails."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, reminders: List[DueReminder]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write("".join(
+                json.dumps({"id": r.id, "user_id": r.user_id, "activity": r.activity,
+                            "due": round(r.due, 3), "late_s": round(r.late, 3)}) + "\n"
+                for r in reminders
+            ))
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    activity TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    timezone TEXT NOT NULL,
+    next_due REAL NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reminders_by_due ON reminders (next_due);
+CREATE INDEX IF NOT EXISTS reminders_by_user ON reminders (user_id);
+"""
+
+_FETCH_CHUNK = 500   # Ids per "WHERE id IN (...)" lookup
+
+
+class ReminderEngine:
+    """
+    Durable reminders with O(due) ticks. Every reminder is a row keyed by
+    its next due time, and SQLite's B-tree index on `next_due` is the far
+    tier: nothing ever scans the whole table. The near tier is an in-memory
+    min-heap holding only reminders due within the next `horizon_seconds`,
+    refilled by one index range query as the horizon moves. A tick pops what
+    is due, hands it to the sink in one batch, and writes each reminder's
+    next occurrence back (one transaction), so memory and work per tick
+    follow the reminders due, not the millions stored.
+
+    Delivery is at least once: the sink runs before the new due times are
+    committed, so a crash in between repeats that batch on restart.
+    Reminders missed by more than `grace_seconds` (e.g. while the node was
+    down) are skipped to their next occurrence instead of firing late. If
+    the sink raises, the batch stays due and is retried on the next tick.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        sink: Optional[Callable[[List[DueReminder]], Any]] = None,
+        timezone: str = "UTC",
+        horizon_seconds: float = 300.0,
+        tick_seconds: float = 1.0,
+        grace_seconds: float = 900.0,
+    ):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.sink = sink if sink is not None else JsonlOutbox(os.path.join(os.path.dirname(db_path) or ".", "reminder_outbox.jsonl"))
+        self.timezone = timezone
+        self.horizon_seconds = horizon_seconds
+        self.tick_seconds = tick_seconds
+        self.grace_seconds = grace_seconds
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int]] = []
+        self._horizon: Optional[float] = None   # The heap holds every reminder due before this
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counts = {"delivered": 0, "missed": 0, "failed_deliveries": 0, "ticks": 0}
+
+    # --- Reminders ----------------------------------------------------------------
+
+    def add(
+        self, user_id: str, activity: str, recurrence: Recurrence,
+        timezone: Optional[str] = None, now: Optional[float] = None,
+    ) -> Reminder:
+        return self.add_many([(user_id, activity, recurrence)], timezone, now)[0]
+
+    def add_many(
+        self, specs: Iterable[Tuple[str, str, Recurrence]],
+        timezone: Optional[str] = None, now: Optional[float] = None,
+    ) -> List[Reminder]:
+        """Stores reminders in one transaction; raises ValueError if one would never fire."""
+        now = time.time() if now is None else now
+        timezone = timezone or self.timezone
+        tz = _zone(timezone)
+        pending = []
+        for user_id, activity, recurrence in specs:
+            recurrence = recurrence.anchored(now, tz)
+            due = recurrence.next_after(now, tz)
+            if due is None:
+                raise ValueError(f"{recurrence.describe()} has no future occurrence")
+            pending.append((user_id, activity, recurrence.rule, due))
+
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                # Ids are assigned here (under the lock) so one executemany covers the batch
+                first = conn.execute("SELECT coalesce(max(id), 0) + 1 FROM reminders").fetchone()[0]
+                added = [
+                    Reminder(first + offset, user_id, activity, rule, timezone, due)
+                    for offset, (user_id, activity, rule, due) in enumerate(pending)
+                ]
+                conn.executemany(
+                    "INSERT INTO reminders (id, user_id, activity, rule, timezone, next_due, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(*reminder, now) for reminder in added],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            for reminder in added:
+                self._track(reminder.id, reminder.next_due)
+        return added
+
+    def cancel(self, user_id: str, reminder_id: int) -> bool:
+        # Its heap entry, if any, is dropped when popped: the row is gone
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM reminders WHERE id=? AND user_id=?", (reminder_id, user_id))
+        return cursor.rowcount > 0
+
+    def reminders_for(self, user_id: str) -> List[Reminder]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, user_id, activity, rule, timezone, next_due FROM reminders WHERE user_id=? ORDER BY next_due",
+                (user_id,),
+            ).fetchall()
+        return [Reminder(*row) for row in rows]
+
+    # --- Ticks ----------------------------------------------------------------------
+
+    def _track(self, reminder_id: int, due: float):
+        # Due after the horizon: the range query that moves the horizon finds it
+        if self._horizon is not None and due < self._horizon:
+            heapq.heappush(self._heap, (due, reminder_id))
+
+    def _advance_horizon(self, now: float):
+        if self._horizon is not None and now < self._horizon - self.horizon_seconds / 2:
+            return
+        end = now + self.horizon_seconds
+        if self._horizon is None:
+            rows = self._conn.execute("SELECT next_due, id FROM reminders WHERE next_due < ?", (end,))
+        else:
+            rows = self._conn.execute(
+                "SELECT next_due, id FROM reminders WHERE next_due >= ? AND next_due < ?", (self._horizon, end)
+            )
+        for entry in rows:
+            heapq.heappush(self._heap, entry)
+        self._horizon = end
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """Delivers everything due at `now`; returns how many reminders were delivered."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self.counts["ticks"] += 1
+            self._advance_horizon(now)
+            popped = []
+            while self._heap and self._heap[0][0] <= now:
+                popped.append(heapq.heappop(self._heap))
+            if not popped:
+                return 0
+
+            rows: Dict[int, tuple] = {}
+            ids = [reminder_id for _, reminder_id in popped]
+            for start in range(0, len(ids), _FETCH_CHUNK):
+                chunk = ids[start:start + _FETCH_CHUNK]
+                for row in self._conn.execute(
+                    f"SELECT id, user_id, activity, rule, timezone, next_due FROM reminders WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ):
+                    rows[row[0]] = row
+
+            deliver: List[DueReminder] = []
+            skipped: List[tuple] = []
+            for due, reminder_id in popped:
+                row = rows.get(reminder_id)
+                if row is None or row[5] != due:
+                    continue  # Cancelled, or rescheduled since it was queued
+                if now - due <= self.grace_seconds:
+                    deliver.append(DueReminder(reminder_id, row[1], row[2], due, now - due))
+                else:
+                    skipped.append(row)
+            if deliver:
+                try:
+                    self.sink(deliver)
+                except Exception as error:
+                    self.counts["failed_deliveries"] += len(deliver)
+                    log_agent_action("reminders", "DELIVERY_FAILED", {"reminders": len(deliver), "error": repr(error)})
+                    for reminder in deliver:
+                        heapq.heappush(self._heap, (reminder.due, reminder.id))
+                    deliver = []
+            fired = [rows[reminder.id] for reminder in deliver] + skipped
+            self._reschedule(fired, now)
+            self.counts["delivered"] += len(deliver)
+            self.counts["missed"] += len(skipped)
+            return len(deliver)
+
+    def _reschedule(self, rows: List[tuple], now: float):
+        updates, deletes = [], []
+        for reminder_id, _, _, rule, timezone, due in rows:
+            following = from_rule(rule).next_after(max(due, now), _zone(timezone))
+            if following is None:
+                deletes.append((reminder_id,))
+            else:
+                updates.append((following, reminder_id))
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany("UPDATE reminders SET next_due=? WHERE id=?", updates)
+            conn.executemany("DELETE FROM reminders WHERE id=?", deletes)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        for following, reminder_id in updates:
+            self._track(reminder_id, following)
+
+    # --- Background thread -----------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="reminder-ticker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.tick_seconds):
+            try:
+                self.tick()
+            except Exception as error:
+                log_agent_action("reminders", "TICK_FAILED", {"error": repr(error)})
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counts,
+                "near_heap": len(self._heap),
+                "horizon_s": None if self._horizon is None else round(self._horizon - time.time(), 1),
+            }
+
+
+_engine: Optional[ReminderEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_reminder_engine() -> ReminderEngine:
+    """Process-wide engine on REMINDER_DB_PATH; its ticker thread starts with the server."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            from config.settings import (
+                REMINDER_DB_PATH, REMINDER_GRACE_SECONDS, REMINDER_HORIZON_SECONDS, REMINDER_OUTBOX_PATH,
+                REMINDER_TICK_SECONDS, REMINDER_TIMEZONE,
+            )
+            _engine = ReminderEngine(
+                REMINDER_DB_PATH,
+                sink=JsonlOutbox(REMINDER_OUTBOX_PATH),
+                timezone=REMINDER_TIMEZONE,
+                horizon_seconds=REMINDER_HORIZON_SECONDS,
+                tick_seconds=REMINDER_TICK_SECONDS,
+                grace_seconds=REMINDER_GRACE_SECONDS,
+            )
+        return _engine
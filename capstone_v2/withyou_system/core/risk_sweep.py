@@ -0,0 +1,290 @@
+# Population-wide mood risk sweep: sharded, vectorized, incremental
+# Run from withyou_system/: python -m core.risk_sweep
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.mood_store import RECORD_DTYPE, TS_DTYPE, USER_INDEX, read_sleep
+
+# Bump when features or scoring change: every shard is then recomputed.
+FEATURE_VERSION = 1
+FEATURES = ("entries", "mean_valence", "slope_per_day", "volatility", "sleep_correlation", "last_ts", "score")
+_F = {name: i for i, name in enumerate(FEATURES)}
+# Queue rows add the time since the last entry, measured from the sweep (never cached)
+QUEUE_FIELDS = FEATURES + ("days_since_last",)
+
+_SECONDS_PER_DAY = 86400.0
+_CHUNK_USERS = 4096       # Users loaded and scored together in one vectorized pass
+_MIN_ENTRIES = 3          # Fewer entries in the window -> no score
+
+
+class SweepSummary(NamedTuple):
+    users: int
+    recomputed: int
+    reused: int
+    queued: int
+    quiet: int            # Scored users with no entry for more than quiet_days
+    seconds: float
+    queue_path: str
+    quiet_path: str
+
+
+def _read_user_index(store_dir: str) -> Dict[str, str]:
+    """File name -> user id, from the store's append-only user index."""
+    users: Dict[str, str] = {}
+    path = os.path.join(store_dir, USER_INDEX)
+    if not os.path.exists(path):
+        return users
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            name, _, user_id = line.rstrip("\n").partition("\t")
+            if user_id:
+                users[name] = json.loads(user_id)
+    return users
+
+
+def _entry_count(base: str) -> int:
+    try:
+        return min(
+            os.path.getsize(base + ".ts") // TS_DTYPE.itemsize,
+            os.path.getsize(base + ".mood") // RECORD_DTYPE.itemsize,
+        )
+    except OSError:
+        return 0
+
+
+def _load_window(base: str, count: int, window_days: float):
+    """Entries in the `window_days` before the user's latest entry."""
+    stamps = np.fromfile(base + ".ts", dtype=TS_DTYPE, count=count)
+    last_ts = stamps[-1]
+    start = int(stamps.searchsorted(last_ts - window_days * _SECONDS_PER_DAY, side="left"))
+    records = np.fromfile(
+        base + ".mood", dtype=RECORD_DTYPE, count=count - start, offset=start * RECORD_DTYPE.itemsize
+    )
+    sleep = read_sleep(base, start, count - start)
+    return (stamps[start:] - last_ts) / _SECONDS_PER_DAY, records["valence"], sleep, last_ts
+
+
+def _segment_sums(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    return np.add.reduceat(values, offsets) if len(values) else np.zeros(len(offsets))
+
+
+def score_features(
+    t: np.ndarray, valence: np.ndarray, sleep: np.ndarray, lengths: np.ndarray, last_ts: np.ndarray
+) -> np.ndarray:
+    """
+    Features for many users at once. The inputs are the users' windows
+    concatenated end to end, with `lengths[i]` entries belonging to user i.
+    Every statistic is a segmented sum (np.add.reduceat), so there is no
+    Python loop over users or entries.
+    """
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    n = lengths.astype(np.float64)
+    v = valence.astype(np.float64)
+
+    sum_t, sum_v = _segment_sums(t, offsets), _segment_sums(v, offsets)
+    sum_tt, sum_tv = _segment_sums(t * t, offsets), _segment_sums(t * v, offsets)
+    spread = n * sum_tt - sum_t * sum_t
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(spread > 1e-12, (n * sum_tv - sum_t * sum_v) / spread, 0.0)
+        mean = sum_v / n
+
+        # Volatility: root mean square of successive differences within a user
+        diffs = np.diff(v, prepend=v[:1]) if len(v) else v
+        diffs[offsets] = 0.0  # First entry of each user has no predecessor
+        volatility = np.sqrt(_segment_sums(diffs * diffs, offsets) / np.maximum(n - 1, 1))
+
+        # Pearson correlation of sleep hours and valence over entries that report sleep
+        has_sleep = ~np.isnan(sleep)
+        s = np.where(has_sleep, sleep, 0.0).astype(np.float64)
+        vs = np.where(has_sleep, v, 0.0)
+        m = _segment_sums(has_sleep.astype(np.float64), offsets)
+        sum_s, sum_vs = _segment_sums(s, offsets), _segment_sums(vs, offsets)
+        cov = m * _segment_sums(s * vs, offsets) - sum_s * sum_vs
+        var_s = m * _segment_sums(s * s, offsets) - sum_s * sum_s
+        var_v = m * _segment_sums(vs * vs, offsets) - sum_vs * sum_vs
+        sleep_corr = np.where((m >= _MIN_ENTRIES) & (var_s > 1e-9) & (var_v > 1e-9), cov / np.sqrt(var_s * var_v), 0.0)
+
+    # Ordering heuristic for the review queue, not a clinical score: falling
+    # mood (points per week), instability, a low baseline, and mood that
+    # tracks sleep.
+    score = (
+        2.0 * np.maximum(-slope * 7.0, 0.0)
+        + 0.5 * volatility
+        + 0.5 * np.maximum(3.0 - mean, 0.0)
+        + 0.25 * np.maximum(sleep_corr, 0.0)
+    )
+    score = np.where(n >= _MIN_ENTRIES, score, 0.0)
+    return np.column_stack([n, mean, slope, volatility, sleep_corr, last_ts, score])
+
+
+def _shard_path(out_dir: str, shard: int) -> str:
+    return os.path.join(out_dir, f"shard-{shard:04d}.npz")
+
+
+def _top(scores: np.ndarray, mask: np.ndarray, top_k: int) -> np.ndarray:
+    candidates = np.flatnonzero(mask & (scores > 0))
+    return candidates[np.argsort(-scores[candidates], kind="stable")[:top_k]]
+
+
+def _sweep_shard(args) -> Tuple[int, int, np.ndarray, np.ndarray]:
+    """
+    Scores one shard. Users whose entry count matches the previous run reuse
+    its features. Returns (recomputed, reused, names, rows): the top_k
+    active and the top_k quiet users, rows being QUEUE_FIELDS.
+    """
+    shard, names, store_dir, out_dir, window_days, top_k, now, quiet_days = args
+    previous: Dict[str, Tuple[int, np.ndarray]] = {}
+    path = _shard_path(out_dir, shard)
+    if os.path.exists(path):
+        with np.load(path) as saved:
+            if int(saved["version"]) == FEATURE_VERSION and float(saved["window_days"]) == window_days:
+                previous = {
+                    name: (int(count), row)
+                    for name, count, row in zip(saved["names"].tolist(), saved["counts"], saved["features"])
+                }
+
+    counts = np.array([_entry_count(os.path.join(store_dir, name)) for name in names], dtype=np.int64)
+    features = np.zeros((len(names), len(FEATURES)))
+    stale: List[int] = []
+    for i, (name, count) in enumerate(zip(names, counts)):
+        cached = previous.get(name)
+        if cached is not None and cached[0] == count:
+            features[i] = cached[1]
+        elif count:
+            stale.append(i)
+
+    for begin in range(0, len(stale), _CHUNK_USERS):
+        chunk = stale[begin:begin + _CHUNK_USERS]
+        windows = [_load_window(os.path.join(store_dir, names[i]), int(counts[i]), window_days) for i in chunk]
+        features[chunk] = score_features(
+            np.concatenate([w[0] for w in windows]),
+            np.concatenate([w[1] for w in windows]),
+            np.concatenate([w[2] for w in windows]),
+            np.array([len(w[1]) for w in windows]),
+            np.array([w[3] for w in windows]),
+        )
+
+    temporary = path + ".tmp.npz"
+    np.savez(
+        temporary,
+        version=FEATURE_VERSION,
+        window_days=window_days,
+        names=np.array(names, dtype="U32"),
+        counts=counts,
+        features=features,
+    )
+    os.replace(temporary, path)
+
+    days_since_last = (now - features[:, _F["last_ts"]]) / _SECONDS_PER_DAY
+    scores = features[:, _F["score"]]
+    quiet = days_since_last > quiet_days
+    top = np.concatenate([_top(scores, ~quiet, top_k), _top(scores, quiet, top_k)])
+    rows = np.column_stack([features, days_since_last])[top]
+    return len(stale), len(names) - len(stale), np.array(names, dtype="U32")[top], rows
+
+
+def run_sweep(
+    store_dir: str,
+    out_dir: str,
+    window_days: float = 14.0,
+    shards: int = 64,
+    workers: Optional[int] = None,
+    queue_size: int = 500,
+    quiet_days: float = 7.0,
+    now: Optional[float] = None,
+) -> SweepSummary:
+    """
+    Scores every user in the mood store and writes the `queue_size` highest
+    risk scores to `out_dir/review_queue.jsonl`, highest first. Users whose
+    last entry is more than `quiet_days` before the sweep are ranked apart,
+    in `out_dir/went_quiet.jsonl`: their window is an old one, and having
+    stopped logging is itself the signal. Both carry `days_since_last`.
+
+    Users are split into `shards` by file name (stable across runs) and the
+    shards are scored in a process pool. Each shard's features are saved
+    with the entry counts they were computed from, so a re-run only reloads
+    users with new entries. Windows end at each user's latest entry, so a
+    user's features change only when they log something new; only
+    `days_since_last` is measured from the sweep's `now`.
+    """
+    started = time.perf_counter()
+    now = time.time() if now is None else now
+    os.makedirs(out_dir, exist_ok=True)
+    users = _read_user_index(store_dir)
+    by_shard: Dict[int, List[str]] = {}
+    for name in users:
+        by_shard.setdefault(int(name[:8], 16) % shards, []).append(name)
+    jobs = [
+        (shard, sorted(names), store_dir, out_dir, window_days, queue_size, now, quiet_days)
+        for shard, names in sorted(by_shard.items())
+    ]
+
+    recomputed = reused = 0
+    top_names: List[np.ndarray] = [np.zeros(0, dtype="U32")]
+    top_rows: List[np.ndarray] = [np.zeros((0, len(QUEUE_FIELDS)))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard_recomputed, shard_reused, names, rows in pool.map(_sweep_shard, jobs):
+            recomputed += shard_recomputed
+            reused += shard_reused
+            top_names.append(names)
+            top_rows.append(rows)
+
+    names, rows = np.concatenate(top_names), np.concatenate(top_rows)
+    quiet = rows[:, len(FEATURES)] > quiet_days
+    queue_path = os.path.join(out_dir, "review_queue.jsonl")
+    quiet_path = os.path.join(out_dir, "went_quiet.jsonl")
+    queued = _write_ranked(queue_path, users, names[~quiet], rows[~quiet], queue_size)
+    quieted = _write_ranked(quiet_path, users, names[quiet], rows[quiet], queue_size)
+
+    summary = SweepSummary(
+        len(users), recomputed, reused, queued, quieted, time.perf_counter() - started, queue_path, quiet_path,
+    )
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as handle:
+        json.dump({"finished_at": time.time(), "window_days": window_days, "quiet_days": quiet_days, "shards": shards,
+                   "feature_version": FEATURE_VERSION, **summary._asdict()}, handle, indent=2)
+    return summary
+
+
+def _write_ranked(path: str, users: Dict[str, str], names: np.ndarray, rows: np.ndarray, limit: int) -> int:
+    """Highest score first; replaces the file atomically."""
+    order = np.argsort(-rows[:, _F["score"]], kind="stable")[:limit]
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        for rank, i in enumerate(order, start=1):
+            row = dict(zip(QUEUE_FIELDS, rows[i].tolist()))
+            row["entries"] = int(row["entries"])
+            handle.write(json.dumps({"rank": rank, "user_id": users[str(names[i])], **row}) + "\n")
+    os.replace(temporary, path)
+    return len(order)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    import argparse
+
+    from config.settings import (
+        MOOD_STORE_DIR, REVIEW_QUEUE_SIZE, SWEEP_DIR, SWEEP_QUIET_DAYS, SWEEP_SHARDS, SWEEP_WINDOW_DAYS,
+        SWEEP_WORKERS,
+    )
+
+    parser = argparse.ArgumentParser(description="Rank users for clinician review by mood-trend risk.")
+    parser.add_argument("--store", default=MOOD_STORE_DIR)
+    parser.add_argument("--out", default=SWEEP_DIR)
+    parser.add_argument("--window-days", type=float, default=SWEEP_WINDOW_DAYS)
+    parser.add_argument("--shards", type=int, default=SWEEP_SHARDS)
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=REVIEW_QUEUE_SIZE)
+    parser.add_argument("--quiet-days", type=float, default=SWEEP_QUIET_DAYS)
+    args = parser.parse_args(argv)
+    summary = run_sweep(
+        args.store, args.out, args.window_days, args.shards, args.workers, args.queue_size, args.quiet_days,
+    )
+    print(json.dumps(summary._asdict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Model client wrapper that admits every call through the shared LLM scheduler
+from typing import AsyncGenerator, List
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors, types
+
+from core.llm_scheduler import lane_for, llm_scheduler
+
+# Model clients are built with this, so google-genai does not retry on its
+# own; the scheduler decides when a failed call goes again.
+NO_RETRY = types.HttpRetryOptions(attempts=1)
+
+
+class ScheduledLlm(BaseLlm):
+    """
+    Wraps a model client (Gemini, or FakeGemini under WITHYOU_FAKE_LLM) so
+    each call first takes a slot from the shared scheduler. A rejected call
+    that has not streamed anything yet is requeued; once output has been
+    yielded, errors propagate as before.
+    """
+
+    inner: BaseLlm
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [r"gemini-.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        # The tier policy may have pointed this call at another model
+        model = llm_request.model or self.model
+        lane = lane_for(llm_request)
+        attempt = 0
+        while True:
+            await llm_scheduler.acquire(model, lane, front=attempt > 0)
+            yielded = False
+            try:
+                async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                    yielded = True
+                    yield response
+            except errors.APIError as error:
+                attempt += 1
+                if yielded or not llm_scheduler.retryable(error, attempt):
+                    raise
+                llm_scheduler.backoff(model, error, attempt)
+                continue
+            llm_scheduler.succeeded(model)
+            return
+
+    def connect(self, llm_request: LlmRequest):
+        return self.inner.connect(llm_request)
@@ -0,0 +1,498 @@
+# Durable SQLite session service (WAL, group-committed appends, LRU hot cache)
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+_SessionKey = Tuple[str, str, str]
+
+
+class SessionCheckpoint(NamedTuple):
+    app_name: str
+    user_id: str
+    session_id: str
+    event_count: int
+    state: Dict[str, Any]
+
+
+def _split_state(state: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Splits a state dict into (app, user, session) scopes, dropping temp keys."""
+    app_state, user_state, session_state = {}, {}, {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+class _CachedSession:
+    """Canonical in-memory copy of a stored session (session-scoped state only)."""
+
+    __slots__ = ("session", "app_state", "user_state")
+
+    def __init__(self, session: Session, app_state: Dict[str, Any], user_state: Dict[str, Any]):
+        self.session = session
+        self.app_state = app_state
+        self.user_state = user_state
+
+    def view(self) -> Session:
+        # Events are shared (they are never mutated after append); the list
+        # and state dict are copied so callers cannot corrupt the cache.
+        state = dict(self.session.state)
+        state.update({State.APP_PREFIX + k: v for k, v in self.app_state.items()})
+        state.update({State.USER_PREFIX + k: v for k, v in self.user_state.items()})
+        return Session(
+            id=self.session.id,
+            app_name=self.session.app_name,
+            user_id=self.session.user_id,
+            state=state,
+            events=list(self.session.events),
+            last_update_time=self.session.last_update_time,
+        )
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    Session service backed by a local SQLite file in WAL mode.
+
+    Appended events are queued and written by a single writer task, which
+    commits everything waiting in the queue (up to `write_batch` events) in one
+    transaction. `append_event` returns once its batch is committed, so a turn
+    pays for one shared commit rather than one per event. Recently used
+    sessions stay in a bounded LRU cache; cache misses load from disk. App and
+    user scoped state is cached only while a cached session refers to it, and
+    a failed commit drops the cached copies it touched so they reload from disk.
+
+    All SQLite work runs on one dedicated thread, off the event loop.
+    """
+
+    def __init__(self, db_path: str, cache_size: int = 1024, write_batch: int = 256):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="withyou-sqlite")
+        self._conn = self._executor.submit(self._connect, db_path).result()
+        self._cache: "OrderedDict[_SessionKey, _CachedSession]" = OrderedDict()
+        self._cache_size = cache_size
+        # App/user scoped state is shared by every cached session in that scope
+        # and reference counted so it leaves with the last of those sessions.
+        self._app_states: Dict[str, Dict[str, Any]] = {}
+        self._user_states: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._app_refs: Dict[str, int] = {}
+        self._user_refs: Dict[Tuple[str, str], int] = {}
+        self._write_batch = write_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.commits = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    # --- SQLite thread -------------------------------------------------------
+
+    @staticmethod
+    def _connect(db_path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _execute_batch(self, statements: List[Tuple[str, tuple]]):
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            for sql, params in statements:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _load(self, key: _SessionKey) -> Optional[_CachedSession]:
+        app_name, user_id, session_id = key
+        conn = self._conn
+        row = conn.execute(
+            "SELECT state, last_update_time FROM sessions WHERE app_name=? AND user_id=? AND session_id=?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        events = [
+            Event.model_validate_json(payload)
+            for (payload,) in conn.execute(
+                "SELECT event FROM events WHERE app_name=? AND user_id=? AND session_id=? ORDER BY seq",
+                key,
+            )
+        ]
+        app_row = conn.execute("SELECT state FROM app_states WHERE app_name=?", (app_name,)).fetchone()
+        user_row = conn.execute(
+            "SELECT state FROM user_states WHERE app_name=? AND user_id=?", (app_name, user_id)
+        ).fetchone()
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=json.loads(row[0]),
+            events=events,
+            last_update_time=row[1],
+        )
+        return _CachedSession(
+            session,
+            json.loads(app_row[0]) if app_row else {},
+            json.loads(user_row[0]) if user_row else {},
+        )
+
+    def _list(self, app_name: str, user_id: Optional[str]) -> List[Tuple[str, str, float]]:
+        if user_id is None:
+            query = "SELECT user_id, session_id, last_update_time FROM sessions WHERE app_name=?"
+            params: tuple = (app_name,)
+        else:
+            query = "SELECT user_id, session_id, last_update_time FROM sessions WHERE app_name=? AND user_id=?"
+            params = (app_name, user_id)
+        return self._conn.execute(query + " ORDER BY last_update_time", params).fetchall()
+
+    # --- Writer --------------------------------------------------------------
+
+    async def _run_in_db_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _ensure_writer(self):
+        loop = asyncio.get_running_loop()
+        if self._writer is None or self._writer.done() or self._writer.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._writer = loop.create_task(self._write_loop())
+
+    async def _write_loop(self):
+        queue = self._queue
+        while True:
+            statements, future = await queue.get()
+            batch = [(statements, future)]
+            size = len(statements)
+            while size < self._write_batch and not queue.empty():
+                item = queue.get_nowait()
+                batch.append(item)
+                size += len(item[0])
+            try:
+                await self._run_in_db_thread(
+                    self._execute_batch, [stmt for stmts, _ in batch for stmt in stmts]
+                )
+                self.commits += 1
+                for _, waiter in batch:
+                    if not waiter.done():
+                        waiter.set_result(None)
+            except Exception as error:
+                for _, waiter in batch:
+                    if not waiter.done():
+                        waiter.set_exception(error)
+
+    async def _write(self, statements: List[Tuple[str, tuple]]):
+        self._ensure_writer()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((statements, future))
+        await future
+
+    async def flush(self) -> None:
+        """Waits until every queued write has been committed."""
+        if self._writer is not None and not self._writer.done():
+            await self._write([])
+
+    # --- Cache ---------------------------------------------------------------
+
+    def _remember(self, key: _SessionKey, cached: _CachedSession) -> _CachedSession:
+        existing = self._cache.get(key)
+        if existing is not None:
+            # A concurrent cold read cached it first; keep that canonical copy.
+            self._cache.move_to_end(key)
+            return existing
+        app_name, user_id, _ = key
+        user_key = (app_name, user_id)
+        cached.app_state = self._app_states.setdefault(app_name, cached.app_state)
+        cached.user_state = self._user_states.setdefault(user_key, cached.user_state)
+        self._app_refs[app_name] = self._app_refs.get(app_name, 0) + 1
+        self._user_refs[user_key] = self._user_refs.get(user_key, 0) + 1
+        self._cache[key] = cached
+        while len(self._cache) > self._cache_size:
+            self._forget(next(iter(self._cache)))
+        return cached
+
+    def _forget(self, key: _SessionKey):
+        if self._cache.pop(key, None) is None:
+            return
+        app_name, user_id, _ = key
+        user_key = (app_name, user_id)
+        self._user_refs[user_key] -= 1
+        if not self._user_refs[user_key]:
+            del self._user_refs[user_key]
+            self._user_states.pop(user_key, None)
+        self._app_refs[app_name] -= 1
+        if not self._app_refs[app_name]:
+            del self._app_refs[app_name]
+            self._app_states.pop(app_name, None)
+
+    def _invalidate(self, key: _SessionKey, app_scope: bool = False, user_scope: bool = False):
+        """Drops cached copies a failed commit left ahead of disk, so the next read reloads them."""
+        app_name, user_id, _ = key
+        for cached_key in list(self._cache):
+            if (
+                cached_key == key
+                or (app_scope and cached_key[0] == app_name)
+                or (user_scope and cached_key[:2] == (app_name, user_id))
+            ):
+                self._forget(cached_key)
+        # Scoped state may be cached with no session yet (a failed create).
+        if app_scope:
+            self._app_states.pop(app_name, None)
+        if user_scope:
+            self._user_states.pop((app_name, user_id), None)
+
+    async def _canonical(self, key: _SessionKey) -> Optional[_CachedSession]:
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return cached
+        self.cache_misses += 1
+        # Pending writes must land before a cold read sees the table.
+        await self.flush()
+        cached = await self._run_in_db_thread(self._load, key)
+        if cached is not None:
+            cached = self._remember(key, cached)
+        return cached
+
+    # --- BaseSessionService --------------------------------------------------
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        key = (app_name, user_id, session_id)
+        if await self._canonical(key) is not None:
+            raise ValueError(f"Session with id {session_id} already exists.")
+
+        app_delta, user_delta, session_state = _split_state(state or {})
+        now = time.time()
+        statements = [(
+            "INSERT INTO sessions (app_name, user_id, session_id, state, last_update_time) VALUES (?, ?, ?, ?, ?)",
+            (app_name, user_id, session_id, json.dumps(session_state), now),
+        )]
+        app_state = self._app_states.get(app_name)
+        user_state = self._user_states.get((app_name, user_id))
+        if app_state is None or user_state is None:
+            stored_app, stored_user = await self._run_in_db_thread(self._scoped_states, app_name, user_id)
+            app_state = self._app_states.setdefault(app_name, stored_app)
+            user_state = self._user_states.setdefault((app_name, user_id), stored_user)
+        if app_delta:
+            app_state.update(app_delta)
+            statements.append(self._upsert_app_state(app_name, app_state))
+        if user_delta:
+            user_state.update(user_delta)
+            statements.append(self._upsert_user_state(app_name, user_id, user_state))
+        try:
+            await self._write(statements)
+        except Exception:
+            self._invalidate(key, app_scope=bool(app_delta), user_scope=bool(user_delta))
+            raise
+
+        session = Session(
+            id=session_id, app_name=app_name, user_id=user_id,
+            state=session_state, events=[], last_update_time=now,
+        )
+        return self._remember(key, _CachedSession(session, app_state, user_state)).view()
+
+    def _scoped_states(self, app_name: str, user_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        app_row = self._conn.execute("SELECT state FROM app_states WHERE app_name=?", (app_name,)).fetchone()
+        user_row = self._conn.execute(
+            "SELECT state FROM user_states WHERE app_name=? AND user_id=?", (app_name, user_id)
+        ).fetchone()
+        return (json.loads(app_row[0]) if app_row else {}, json.loads(user_row[0]) if user_row else {})
+
+    @staticmethod
+    def _upsert_app_state(app_name: str, state: Dict[str, Any]) -> Tuple[str, tuple]:
+        return (
+            "INSERT INTO app_states (app_name, state) VALUES (?, ?) "
+            "ON CONFLICT(app_name) DO UPDATE SET state=excluded.state",
+            (app_name, json.dumps(state)),
+        )
+
+    @staticmethod
+    def _upsert_user_state(app_name: str, user_id: str, state: Dict[str, Any]) -> Tuple[str, tuple]:
+        return (
+            "INSERT INTO user_states (app_name, user_id, state) VALUES (?, ?, ?) "
+            "ON CONFLICT(app_name, user_id) DO UPDATE SET state=excluded.state",
+            (app_name, user_id, json.dumps(state)),
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        cached = await self._canonical((app_name, user_id, session_id))
+        if cached is None:
+            return None
+        session = cached.view()
+        if config:
+            if config.num_recent_events is not None:
+                session.events = session.events[-config.num_recent_events:] if config.num_recent_events else []
+            if config.after_timestamp is not None:
+                session.events = [e for e in session.events if e.timestamp >= config.after_timestamp]
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        await self.flush()
+        rows = await self._run_in_db_thread(self._list, app_name, user_id)
+        return ListSessionsResponse(sessions=[
+            Session(id=sid, app_name=app_name, user_id=uid, state={}, events=[], last_update_time=ts)
+            for uid, sid, ts in rows
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        self._forget(key)
+        await self._write([
+            ("DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?", key),
+            ("DELETE FROM sessions WHERE app_name=? AND user_id=? AND session_id=?", key),
+        ])
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session, event)
+
+        key = (session.app_name, session.user_id, session.id)
+        cached = await self._canonical(key)
+        if cached is None:
+            raise ValueError(f"Session {session.id} not found.")
+
+        stored = cached.session
+        seq = len(stored.events)
+        stored.events.append(event)
+        stored.last_update_time = event.timestamp
+
+        statements = [(
+            "INSERT INTO events (app_name, user_id, session_id, seq, event) VALUES (?, ?, ?, ?, ?)",
+            (*key, seq, event.model_dump_json(exclude_none=True)),
+        )]
+        delta = event.actions.state_delta if event.actions else None
+        app_delta, user_delta, session_delta = _split_state(delta or {})
+        if app_delta:
+            cached.app_state.update(app_delta)
+            statements.append(self._upsert_app_state(session.app_name, cached.app_state))
+        if user_delta:
+            cached.user_state.update(user_delta)
+            statements.append(self._upsert_user_state(session.app_name, session.user_id, cached.user_state))
+        stored.state.update(session_delta)
+        statements.append((
+            "UPDATE sessions SET state=?, last_update_time=? WHERE app_name=? AND user_id=? AND session_id=?",
+            (json.dumps(stored.state), stored.last_update_time, *key),
+        ))
+        try:
+            await self._write(statements)
+        except Exception:
+            self._invalidate(key, app_scope=bool(app_delta), user_scope=bool(user_delta))
+            raise
+        return event
+
+    # --- Speculation support (same interface as WithyouSessionService) -------
+
+    async def ensure_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        if await self._canonical((app_name, user_id, session_id)) is None:
+            await self.create_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def checkpoint(self, *, app_name: str, user_id: str, session_id: str) -> SessionCheckpoint:
+        await self.ensure_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        stored = (await self._canonical((app_name, user_id, session_id))).session
+        return SessionCheckpoint(
+            app_name, user_id, session_id, len(stored.events), copy.deepcopy(stored.state)
+        )
+
+    async def rollback(self, checkpoint: SessionCheckpoint) -> int:
+        """
+        Drops every event appended after `checkpoint` and restores its state.
+        Returns the number of events removed.
+        """
+        key = (checkpoint.app_name, checkpoint.user_id, checkpoint.session_id)
+        cached = await self._canonical(key)
+        if cached is None:
+            return 0
+        stored = cached.session
+        removed = len(stored.events) - checkpoint.event_count
+        del stored.events[checkpoint.event_count:]
+        stored.state = copy.deepcopy(checkpoint.state)
+        try:
+            await self._write([
+                ("DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=? AND seq>=?",
+                 (*key, checkpoint.event_count)),
+                ("UPDATE sessions SET state=? WHERE app_name=? AND user_id=? AND session_id=?",
+                 (json.dumps(stored.state), *key)),
+            ])
+        except Exception:
+            self._invalidate(key)
+            raise
+        return max(removed, 0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached_sessions": len(self._cache),
+            "cached_user_states": len(self._user_states),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "commits": self.commits,
+        }
+
+    def close(self):
+        if self._writer is not None and not self._writer.get_loop().is_closed():
+            self._writer.cancel()
+        self._executor.submit(self._conn.close).result()
+        self._executor.shutdown(wait=True)
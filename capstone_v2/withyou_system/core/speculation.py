@@ -0,0 +1,29 @@
+# Speculative triage: tools with side effects wait for the turn's safety verdict
+import asyncio
+import contextvars
+from typing import Optional
+
+# Set only inside a speculative triage task; resolved once the verdict is SAFE
+_safe_verdict: contextvars.ContextVar[Optional[asyncio.Future]] = contextvars.ContextVar(
+    "withyou_safe_verdict", default=None
+)
+
+
+def hold_side_effects(safe_verdict: asyncio.Future) -> None:
+    """Makes `side_effects_allowed` in the current task wait for `safe_verdict`."""
+    _safe_verdict.set(safe_verdict)
+
+
+async def side_effects_allowed() -> None:
+    """
+    Tools await this before writing anything that outlives the turn
+    (reminders, mood entries, questionnaire scores). Outside speculative
+    triage it returns at once. Inside it, it waits for a SAFE verdict; on
+    any other outcome the triage task is cancelled while it waits, so a
+    rolled-back turn leaves nothing behind but session events, which the
+    rollback removes.
+    """
+    safe_verdict = _safe_verdict.get()
+    if safe_verdict is not None:
+        # Shielded: one cancelled tool call must not cancel the shared verdict.
+        await asyncio.shield(safe_verdict)
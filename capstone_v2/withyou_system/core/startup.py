@@ -0,0 +1,135 @@
+# Cold start: pre-warm hook and an import-time profile of the orchestrator
+# Profile from withyou_system/: python -m core.startup --profile [--prewarm]
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from core.telemetry import log_agent_action
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PHASE_MARK = "-- withyou prewarm --"
+
+
+def prewarm() -> Dict[str, float]:
+    """
+    Loads everything the first turn would otherwise pay for: the SDKs,
+    session services, every agent with its runner and model clients, the
+    intent router and the redactor. Call it before the worker takes
+    traffic; later calls are nearly free. Returns milliseconds per step.
+    """
+    from config.settings import MODEL_NAME, ROUTING_MODEL
+    from core.intent_router import get_router
+    from core.memory import get_runner_session_service, get_session_services
+    from core.redaction import get_redactor
+    from core.registry import AGENT_MODULES, registry
+
+    def model_clients():
+        for model_name in (MODEL_NAME, ROUTING_MODEL):
+            getattr(registry.model(model_name).inner, "api_client", None)  # Builds the HTTP client
+
+    steps = [
+        ("sdk", lambda: [importlib.import_module(name) for name in ("google.genai.types", "google.adk.runners")]),
+        ("sessions", lambda: (get_session_services(), get_runner_session_service())),
+        ("agents", lambda: [registry.runner(name) for name in AGENT_MODULES]),
+        ("model_clients", model_clients),
+        ("intent_router", get_router),
+        ("redactor", get_redactor),
+    ]
+    timings: Dict[str, float] = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    timings["total"] = round(sum(timings.values()), 1)
+    log_agent_action("startup", "PREWARMED", timings)
+    return timings
+
+
+def _parse_importtime(lines: List[str]) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) from `python -X importtime` output."""
+    rows = []
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _package(module: str) -> str:
+    parts = module.split(".")
+    return ".".join(parts[:2]) if parts[0] == "google" and len(parts) > 1 else parts[0]
+
+
+def profile(target: str = "main", with_prewarm: bool = False) -> Dict[str, object]:
+    """
+    Imports `target` in a fresh interpreter under -X importtime and returns
+    import time grouped by package (self time, in ms). With `with_prewarm`,
+    prewarm() runs afterwards and its imports are reported separately.
+    """
+    code = f"import time; t = time.perf_counter(); import {target}; print(json.dumps({{'import_ms': (time.perf_counter() - t) * 1000}}))"
+    code = "import json; " + code
+    if with_prewarm:
+        code += (
+            f"; import sys; sys.stderr.write({_PHASE_MARK!r} + '\\n'); from core.startup import prewarm;"
+            " print(json.dumps(prewarm()))"
+        )
+    env = dict(os.environ, WITHYOU_LOG_CONSOLE="0")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    stderr = result.stderr.splitlines()
+    split = stderr.index(_PHASE_MARK) if _PHASE_MARK in stderr else len(stderr)
+    outputs = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+
+    report: Dict[str, object] = {"target": target, "import_ms": round(outputs[0]["import_ms"], 1)}
+    phases = {"import": stderr[:split]}
+    if with_prewarm:
+        phases["prewarm"] = stderr[split + 1:]
+        report["prewarm_ms"] = outputs[1]
+    for phase, lines in phases.items():
+        by_package: Dict[str, int] = {}
+        for module, self_us, _ in _parse_importtime(lines):
+            by_package[_package(module)] = by_package.get(_package(module), 0) + self_us
+        report[f"{phase}_by_package_ms"] = {
+            package: round(us / 1000, 1) for package, us in sorted(by_package.items(), key=lambda item: -item[1])
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start tools for the orchestrator.")
+    parser.add_argument("--profile", action="store_true", help="Print an import-time breakdown")
+    parser.add_argument("--prewarm", action="store_true", help="Also time prewarm() (with --profile), or just run it")
+    parser.add_argument("--target", default="main", help="Module to import when profiling (main, server)")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    if not args.profile:
+        print(json.dumps(prewarm(), indent=2))
+        return
+    report = profile(args.target, args.prewarm)
+    print(f"import {report['target']}: {report['import_ms']:.1f} ms")
+    for phase in ("import", "prewarm"):
+        packages = report.get(f"{phase}_by_package_ms")
+        if packages is None:
+            continue
+        print(f"\n{phase}: self time by package (ms)")
+        print("-" * 44)
+        for package, ms in list(packages.items())[:args.top]:
+            print(f"{package:<32} | {ms:>9.1f}")
+    if "prewarm_ms" in report:
+        print("\nprewarm steps (ms)")
+        print("-" * 44)
+        for step, ms in report["prewarm_ms"].items():
+            print(f"{step:<32} | {ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
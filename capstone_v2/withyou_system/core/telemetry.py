@@ -1,7 +1,22 @@
 # Logging & Observability wrappers
-import logging
+import atexit
 import json
-from typing import Any, Dict
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config.settings import (
+    TELEMETRY_BACKUPS,
+    TELEMETRY_CONSOLE,
+    TELEMETRY_DIR,
+    TELEMETRY_FLUSH_SECONDS,
+    TELEMETRY_MAX_BYTES,
+    TELEMETRY_QUEUE_SIZE,
+)
+from core.redaction import redact_for_log
 
 # Configure structured logging for Cloud Logging ingestion
 logging.basicConfig(
@@ -10,25 +25,210 @@ logging.basicConfig(
 )
 logger = logging.getLogger("withyou_telemetry")
 
+# Records serialized per write; small enough that the writer never holds the
+# GIL for long stretches
+_BATCH_SIZE = 256
+
+
+class TelemetryPipeline:
+    """
+    Non-blocking telemetry: callers append a pre-structured tuple to an
+    in-memory queue and return. A background thread drains the queue in
+    batches, redacts PII from the details, serializes them to JSON lines and
+    appends them to a size-rotated file (and, optionally, the console logger).
+
+    There are two bounded queues. Routine events (latency, routing, tiers)
+    are dropped when theirs is full. Audit events (crisis escalations) have
+    a separate, larger queue so a flood of routine events cannot push them
+    out. Drops are counted and reported, and nothing on the hot path waits
+    on a lock or on I/O: deque appends are atomic.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        filename: str = "telemetry.jsonl",
+        queue_size: int = 65536,
+        max_bytes: int = 50 * 1024 * 1024,
+        backups: int = 5,
+        flush_seconds: float = 0.25,
+        console: bool = True,
+    ):
+        self.path = os.path.join(directory, filename)
+        self.queue_size = queue_size
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_seconds = flush_seconds
+        self.console = console
+        self._routine: deque = deque()
+        self._audit: deque = deque()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.dropped_audit = 0
+        self.written = 0
+        self.batches = 0
+
+    # --- Hot path -------------------------------------------------------------
+
+    def emit(self, level: int, agent: str, event: str, details: Dict[str, Any]) -> bool:
+        """Queues one record. Never blocks; returns False if it was dropped."""
+        if self._thread is None:
+            self._start()
+        record = (time.time(), level, agent, event, details)
+        if level >= logging.WARNING:
+            if len(self._audit) >= self.queue_size * 4:
+                self.dropped_audit += 1
+                return False
+            self._audit.append(record)
+        else:
+            if len(self._routine) >= self.queue_size:
+                self.dropped += 1
+                return False
+            self._routine.append(record)
+            if len(self._routine) == self.queue_size // 2:
+                self._wake.set()  # Filling up: don't wait for the next tick
+        self.enqueued += 1
+        return True
+
+    # --- Writer thread ----------------------------------------------------------
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        while self._audit or self._routine:
+            batch = []
+            # Audit records first, so they survive even if routine ones pile up.
+            for source in (self._audit, self._routine):
+                while source and len(batch) < _BATCH_SIZE:
+                    batch.append(source.popleft())
+            self._write(batch)
+            # Hand the GIL back between batches so the event loop is not
+            # kept waiting for a whole drain.
+            time.sleep(0)
+
+    def _write(self, batch):
+        lines = []
+        for timestamp, level, agent, event, details in batch:
+            lines.append(json.dumps(
+                {"ts": round(timestamp, 6), "level": logging.getLevelName(level),
+                 "agent": agent, "event": event, "meta": redact_for_log(details)},
+                default=str,
+            ))
+        text = "\n".join(lines) + "\n"
+        try:
+            self._append(text)
+        except OSError as error:
+            logger.error(f"TELEMETRY_WRITE_FAILED: {error}")
+        if self.console:
+            for line in lines:
+                logger.info(line)
+        self.written += len(batch)
+        self.batches += 1
+
+    def _append(self, text: str):
+        data = text.encode("utf-8")
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "ab")
+            self._size = self._file.tell()
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+        self._size = 0
+
+    # --- Control ------------------------------------------------------------------
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Waits (off the event loop only) until everything queued so far is written."""
+        target = self.enqueued
+        deadline = time.monotonic() + timeout
+        self._wake.set()
+        while self.written < target and time.monotonic() < deadline and self._thread is not None:
+            time.sleep(0.005)
+
+    def close(self) -> None:
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        else:
+            self._drain()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._routine) + len(self._audit),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "dropped_audit": self.dropped_audit,
+        }
+
+
+pipeline = TelemetryPipeline(
+    TELEMETRY_DIR,
+    queue_size=TELEMETRY_QUEUE_SIZE,
+    max_bytes=TELEMETRY_MAX_BYTES,
+    backups=TELEMETRY_BACKUPS,
+    flush_seconds=TELEMETRY_FLUSH_SECONDS,
+    console=TELEMETRY_CONSOLE,
+)
+
 def log_agent_action(agent_name: str, action_type: str, details: Dict[str, Any]):
     """
-    Logs agent actions while ensuring strict PII redaction.
-    
+    Logs agent actions. PII in `details` is redacted by the writer thread
+    before anything reaches a sink.
+
     Args:
         agent_name: Name of the agent (e.g., 'safety_sentinel').
         action_type: Category (e.g., 'TOOL_USE', 'CRISIS_FLAG').
         details: Payload of the event.
     """
-    # In production, use a PII scrubber library here before logging
-    payload = {
-        "agent": agent_name,
-        "event": action_type,
-        "meta": details
-    }
-    logger.info(json.dumps(payload))
+    pipeline.emit(logging.INFO, agent_name, action_type, details)
 
 def log_audit_trail(user_id: str, session_id: str, risk_level: str):
     """
     Critical audit trail for clinical liability.
     """
-    logger.warning(f"AUDIT: User {user_id} | Session {session_id} | Risk {risk_level}")
\ No newline at end of file
+    pipeline.emit(logging.WARNING, "audit", "AUDIT", {"user_id": user_id, "session_id": session_id, "risk": risk_level})
+
+def log_latency(agent_name: str, metric: str, seconds: float):
+    """
+    Records a latency sample (e.g. 'ttft', 'total') for an agent.
+    """
+    log_agent_action(agent_name, "LATENCY", {"metric": metric, "ms": round(seconds * 1000, 1)})
@@ -0,0 +1,171 @@
+# Bounded TTL cache of SAFE verdicts from the safety LLM
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from config.settings import SAFETY_PASS_THRESHOLD, VERDICT_CACHE_MAX_CHARS
+from core.safety_cascade import RISK_SIGNALS
+from core.safety_guard import CRISIS_LEXICON
+
+_PUNCTUATION = re.compile(r"[^\w\s']+", re.UNICODE)
+_CONTEXT_DIGEST_BYTES = 8
+# Digest of a safety session with no messages yet
+EMPTY_SESSION_DIGEST = ""
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form for cache keys: NFKC, case-folded, punctuation dropped,
+    whitespace collapsed. "Can't sleep again!!" and "can't  sleep again"
+    share a key.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def safety_version(instruction: str, model_name: str) -> str:
+    """
+    Fingerprint of everything a cached verdict depends on: the crisis
+    lexicon, the soft risk cues, pass threshold and length limit, and the
+    safety agent's prompt and model. Any change produces a new version and a cold cache.
+    """
+    material = json.dumps(
+        {
+            "lexicon": CRISIS_LEXICON,
+            "risk_signals": RISK_SIGNALS,
+            "pass_threshold": SAFETY_PASS_THRESHOLD,
+            "max_chars": VERDICT_CACHE_MAX_CHARS,
+            "instruction": instruction,
+            "model": model_name,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def chain_digest(digest: str, text: str) -> str:
+    """Digest of a safety session after `text` is added to one whose digest is `digest`."""
+    return hashlib.blake2b(
+        f"{digest}\x1f{normalize_text(text)}".encode("utf-8"), digest_size=_CONTEXT_DIGEST_BYTES
+    ).hexdigest()
+
+
+class VerdictCache:
+    """
+    LRU cache with TTL for safety-LLM verdicts.
+
+    Only SAFE verdicts for short messages without risk cues are stored;
+    escalations are never cached, so a cached lookup can only skip a call
+    that would have returned SAFE for the same normalized text after the same
+    safety-session history. The key covers the normalized message, a chained
+    digest of every message already in the session's safety side session,
+    and the safety version.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 50_000,
+        ttl_seconds: float = 3600.0,
+        version: str = "",
+        max_chars: int = VERDICT_CACHE_MAX_CHARS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_chars = max_chars
+        self._version = version
+        self._entries: "OrderedDict[str, float]" = OrderedDict()  # key -> expiry (monotonic)
+        self._session_digests: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def set_version(self, version: str) -> None:
+        """Switches to a new safety version, dropping every cached verdict."""
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._entries.clear()
+
+    def _key(self, text: str, session_digest: str) -> str:
+        material = f"{self._version}\x1e{session_digest}\x1e{normalize_text(text)}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def cacheable(self, text: str, risk_score: float) -> bool:
+        """Only short messages without risk cues are looked up or stored."""
+        return len(text) <= self.max_chars and risk_score < SAFETY_PASS_THRESHOLD
+
+    def session_digest(self, user_id: str, session_id: str) -> Optional[str]:
+        """Digest of the session's safety history, or None if it is not tracked (evicted or unknown)."""
+        with self._lock:
+            return self._session_digests.get((user_id, session_id))
+
+    def set_session_digest(self, user_id: str, session_id: str, digest: Optional[str]) -> None:
+        """Records the session's safety-history digest; None forgets it."""
+        key = (user_id, session_id)
+        with self._lock:
+            if digest is None:
+                self._session_digests.pop(key, None)
+                return
+            self._session_digests[key] = digest
+            self._session_digests.move_to_end(key)
+            while len(self._session_digests) > self.max_entries:
+                self._session_digests.popitem(last=False)
+
+    @staticmethod
+    def digest_history(history: Iterable[str]) -> str:
+        """Digest of a safety session holding `history`, oldest message first."""
+        digest = EMPTY_SESSION_DIGEST
+        for text in history:
+            digest = chain_digest(digest, text)
+        return digest
+
+    def lookup(self, text: str, session_digest: str) -> bool:
+        """True if a SAFE verdict for this input after this safety history is cached and fresh."""
+        key = self._key(text, session_digest)
+        now = time.monotonic()
+        with self._lock:
+            expiry = self._entries.get(key)
+            if expiry is not None and expiry > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            if expiry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False
+
+    def store(self, text: str, verdict: str, session_digest: str) -> bool:
+        """Caches `verdict` if it is a plain SAFE. Returns whether it was stored."""
+        if "ESCALATE_CRISIS" in verdict or verdict.strip().rstrip(".").upper() != "SAFE":
+            return False
+        key = self._key(text, session_digest)
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stores += 1
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
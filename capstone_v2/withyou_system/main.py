@@ -1,79 +1,359 @@
 # Application Entry Point (Orchestrator)
 import asyncio
-from google.adk.runners import Runner
-from google.adk.apps.app import App
-from google.genai import types
-
-from agents.safety_agent import safety_agent
-from agents.triage_agent import triage_agent
-from core.memory import get_session_services
-
-# Initialize Services
-session_service, memory_service = get_session_services()
-
-# Define the App - The Triage Agent is the entry point for the standard flow
-withyou_app = App(
-    name="withyou_wellness_system",
-    root_agent=triage_agent,
-    session_service=session_service,
-    memory_service=memory_service
+import time
+from contextlib import aclosing, suppress
+from functools import lru_cache
+from typing import AsyncIterator, NamedTuple
+
+from config.settings import (
+    APP_NAME, DEFAULT_LOCATION, ESCALATION_COMMIT_WAIT_SECONDS, MODEL_NAME, SPECULATIVE_TRIAGE, VERDICT_CACHE_SIZE,
+    VERDICT_CACHE_TTL_SECONDS,
 )
+from core.escalations import get_escalation_outbox
+from core.intent_router import get_router
+from core.llm_scheduler import crisis_priority
+from core.model_tiers import set_turn_tier, tier_policy
+from core.registry import registry
+from core.safety_cascade import SafetyTier, assess
+from core.speculation import hold_side_effects
+from core.telemetry import log_agent_action, log_audit_trail, log_latency
+from core.tracing import tracer
+from core.verdict_cache import VerdictCache, chain_digest, safety_version
 
-# Initialize Runner
-runner = Runner(app=withyou_app)
+# SAFE verdicts from safety_sentinel, reused for short, cue-free messages after the same safety history
+verdict_cache = VerdictCache(VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL_SECONDS)
+
+
+# Agents, runners, session services and the ADK/genai SDKs are loaded on
+# first use, not at import; core/startup.py can pre-warm them.
+def _sessions():
+    from core.memory import get_session_services
+    return get_session_services()
+
+
+@lru_cache(maxsize=None)
+def _streaming_run_config():
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    # Partial text events are emitted as the model generates them
+    return RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+_STREAM_DONE = object()
+
+
+async def _escalate(user_input: str, user_id: str, session_id: str, source: str):
+    """Opens (or adds to) the session's review case; durable in the outbox log once awaited."""
+    log_audit_trail(user_id, session_id, "HIGH")
+    # record() syncs the outbox log to disk: on a worker thread, so other sessions keep streaming
+    return await asyncio.to_thread(get_escalation_outbox().record, user_id, session_id, source, "HIGH", user_input)
+
+
+async def _await_escalation(recorded) -> None:
+    # Called after the crisis reply has been yielded: the turn ends once the case is in SQLite
+    done, _ = await asyncio.wait({asyncio.wrap_future(recorded)}, timeout=ESCALATION_COMMIT_WAIT_SECONDS)
+    if not done:
+        log_agent_action("orchestrator", "ESCALATION_COMMIT_SLOW", {"waited_s": ESCALATION_COMMIT_WAIT_SECONDS})
+
+
+class StreamChunk(NamedTuple):
+    text: str
+    author: str
+
+
+async def _run_agent_stream(
+    agent_name: str, user_input: str, user_id: str, session_id: str, stage: str
+) -> AsyncIterator[StreamChunk]:
+    """
+    Streams text from a registry runner, recording time-to-first-token for
+    each agent that produces text. Partial chunks are yielded as they arrive;
+    a final event is only yielded if that author streamed nothing. The whole
+    run is one `stage` span of the current turn.
+    """
+    from google.genai import types
+
+    session_service, _ = _sessions()
+    await session_service.ensure_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    started = time.perf_counter()
+    streamed_authors = set()
+    events = registry.runner(agent_name).run_async(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=types.Content(parts=[types.Part(text=user_input)]),
+        run_config=_streaming_run_config(),
+    )
+    async with aclosing(events):
+        with tracer.span(stage, agent_name) as span:
+            async for event in events:
+                if not event.content or not event.content.parts:
+                    continue
+                text = "".join(part.text for part in event.content.parts if part.text)
+                if not text:
+                    continue
+                if event.partial:
+                    if event.author not in streamed_authors:
+                        streamed_authors.add(event.author)
+                        log_latency(event.author, "ttft", time.perf_counter() - started)
+                        span.attributes.setdefault("ttft_ms", round((time.perf_counter() - started) * 1000, 1))
+                    yield StreamChunk(text, event.author)
+                elif event.is_final_response():
+                    if event.author not in streamed_authors:
+                        log_latency(event.author, "ttft", time.perf_counter() - started)
+                        span.attributes.setdefault("ttft_ms", round((time.perf_counter() - started) * 1000, 1))
+                        yield StreamChunk(text, event.author)
+    log_latency(agent_name, "total", time.perf_counter() - started)
+
+
+async def _safety_session_digest(user_id: str, session_id: str) -> str:
+    digest = verdict_cache.session_digest(user_id, session_id)
+    if digest is None:
+        # Not tracked yet (or evicted): rebuild it from the safety side session itself.
+        session = await _sessions()[0].get_session(
+            app_name=APP_NAME, user_id=user_id, session_id=f"{session_id}_safety"
+        )
+        history = [
+            "".join(part.text for part in event.content.parts if part.text)
+            for event in (session.events if session else [])
+            if event.author == "user" and event.content and event.content.parts
+        ]
+        digest = verdict_cache.digest_history(history)
+        verdict_cache.set_session_digest(user_id, session_id, digest)
+    return digest
+
+
+async def _run_safety_check(user_input: str, user_id: str, session_id: str, risk_score: float) -> str:
+    if not verdict_cache.version:
+        agent = registry.agent("safety_sentinel")
+        verdict_cache.set_version(safety_version(str(agent.instruction), MODEL_NAME))
+    # The key includes a digest of everything the safety agent has already
+    # seen in this session: "yes" means something different after a
+    # distressing message than after "hello".
+    digest = None
+    if verdict_cache.cacheable(user_input, risk_score):
+        digest = await _safety_session_digest(user_id, session_id)
+        if verdict_cache.lookup(user_input, digest):
+            log_agent_action("safety_sentinel", "VERDICT_CACHE_HIT", {"hit_rate": verdict_cache.stats()["hit_rate"]})
+            with tracer.span("safety_cache", "safety_sentinel"):
+                return "SAFE"
+
+    # The safety runner is shared, but it writes to an isolated side session.
+    # Its model calls take the scheduler's crisis lane.
+    try:
+        with crisis_priority():
+            chunks = [
+                chunk.text
+                async for chunk in _run_agent_stream(
+                    "safety_sentinel", user_input, user_id, f"{session_id}_safety", "safety_llm"
+                )
+            ]
+    except BaseException:
+        # The side session may or may not hold the message now; rebuild the digest next time.
+        verdict_cache.set_session_digest(user_id, session_id, None)
+        raise
+    safety_response_text = "".join(chunks)
+    previous = verdict_cache.session_digest(user_id, session_id)
+    if previous is not None:
+        verdict_cache.set_session_digest(user_id, session_id, chain_digest(previous, user_input))
+    if digest is not None:
+        verdict_cache.store(user_input, safety_response_text, digest)
+    return safety_response_text
+
+
+def _stream_triage(user_input: str, user_id: str, session_id: str, risk_score: float) -> AsyncIterator[StreamChunk]:
+    # Confident intents go straight to the specialist, saving the router's
+    # model call. Uncertain ones go to the Triage agent, which routes to
+    # Coach/Planner/Clinician via AgentTool.
+    decision = get_router().route(user_input)
+    log_agent_action("intent_router", "ROUTING", {
+        "label": decision.label, "confidence": decision.confidence, "fallback": decision.fallback,
+    })
+    # Flash or pro for the specialist, from the same cheap signals. Set
+    # before the runner starts, so the speculative triage task inherits it.
+    tier = tier_policy.choose(user_input, risk_score, decision.confidence)
+    set_turn_tier(tier)
+    tracer.label_turn(tier.tier, model=tier.model, tier_reason=tier.reason)
+    log_agent_action("model_tiers", "TIER", tier._asdict())
+    if decision.agent:
+        return _run_agent_stream(decision.agent, user_input, user_id, session_id, "specialist")
+    return _run_agent_stream("clinical_triage", user_input, user_id, session_id, "triage")
+
+
+async def _pump(stream: AsyncIterator[StreamChunk], queue: asyncio.Queue):
+    try:
+        async for chunk in stream:
+            queue.put_nowait(chunk)
+    finally:
+        queue.put_nowait(_STREAM_DONE)
+
+
+async def _speculate(stream: AsyncIterator[StreamChunk], queue: asyncio.Queue, safe_verdict: asyncio.Future):
+    # The task has its own context: its tools hold side effects until `safe_verdict` resolves.
+    hold_side_effects(safe_verdict)
+    await _pump(stream, queue)
+
+
+async def _remember_turn(user_id: str, session_id: str):
+    # Index the finished turn for the coach's `load_memory`; only events past the last indexed one are read.
+    session_service, memory_service = _sessions()
+    session = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    if session is not None:
+        await memory_service.add_session_to_memory(session)
+
+
+async def _discard_speculative_triage(triage_task: asyncio.Task, safe_verdict: asyncio.Future, checkpoint) -> int:
+    safe_verdict.cancel()
+    triage_task.cancel()
+    with suppress(asyncio.CancelledError, Exception):
+        await triage_task
+    return await _sessions()[0].rollback(checkpoint)
+
+
+async def _stream_with_speculative_triage(
+    user_input: str, user_id: str, session_id: str, risk_score: float
+) -> AsyncIterator[StreamChunk]:
+    """
+    Runs the safety LLM and triage concurrently. Triage chunks are buffered
+    until the verdict is SAFE, then flushed and streamed live. Tools that
+    write outside the session (reminders, mood and questionnaire stores)
+    wait for the SAFE verdict before writing. On ESCALATE_CRISIS (or a
+    failed safety check) the triage task is cancelled, its session events
+    rolled back, and only the crisis response is yielded.
+    """
+    checkpoint = await _sessions()[0].checkpoint(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    buffer: asyncio.Queue = asyncio.Queue()
+    safe_verdict = asyncio.get_running_loop().create_future()
+    triage_task = asyncio.create_task(
+        _speculate(_stream_triage(user_input, user_id, session_id, risk_score), buffer, safe_verdict)
+    )
+
+    try:
+        safety_response_text = await _run_safety_check(user_input, user_id, session_id, risk_score)
+    except BaseException:
+        # Fail closed: never release output that was not screened.
+        await _discard_speculative_triage(triage_task, safe_verdict, checkpoint)
+        raise
 
-async def process_user_interaction(user_input: str, user_id: str, session_id: str):
-    print(f"\n--- Processing for User: {user_id} ---")
-    
-    # --- STEP 1: SAFETY GATE (The Sentinel) ---
-    # We create a temporary runner for the safety check to keep it isolated
-    safety_runner = Runner(agent=safety_agent, session_service=session_service)
-    
-    print("🛡️ Running Safety Protocol...")
-    safety_response_text = ""
-    
-    # Process Safety Check
-    async for event in safety_runner.run_async(
-        user_id=user_id, 
-        session_id=f"{session_id}_safety", 
-        new_message=types.Content(parts=[types.Part(text=user_input)])
-    ):
-        if event.is_final_response() and event.content:
-             safety_response_text = event.content.parts[0].text
-
-    # --- STEP 2: CRISIS INTERVENTION LOGIC ---
     if "ESCALATE_CRISIS" in safety_response_text:
-        print("🚨 CRISIS DETECTED. INTERRUPTING WORKFLOW.")
-        # Strip the system flag and show the compassionate resource message provided by the agent
-        clean_response = safety_response_text.replace("ESCALATE_CRISIS", "").strip()
-        print(f"System Response: {clean_response}")
-        # In a real app, this would trigger an alert to human review
+        removed = await _discard_speculative_triage(triage_task, safe_verdict, checkpoint)
+        log_agent_action("orchestrator", "SPECULATION_DISCARDED", {"events_removed": removed})
+        recorded = await _escalate(user_input, user_id, session_id, "safety_sentinel")
+        yield StreamChunk(safety_response_text.replace("ESCALATE_CRISIS", "").strip(), "safety_sentinel")
+        await _await_escalation(recorded)
         return
 
+    safe_verdict.set_result(None)
+    try:
+        while True:
+            chunk = await buffer.get()
+            if chunk is _STREAM_DONE:
+                break
+            yield chunk
+        await triage_task
+        await _remember_turn(user_id, session_id)
+    finally:
+        if not triage_task.done():
+            # Closed early (client gone): stop triage writing to the session before the turn ends
+            triage_task.cancel()
+            await asyncio.wait({triage_task})
+
+
+async def stream_user_interaction(
+    user_input: str,
+    user_id: str,
+    session_id: str,
+    location: str = DEFAULT_LOCATION,
+    speculative: bool = SPECULATIVE_TRIAGE,
+) -> AsyncIterator[StreamChunk]:
+    """
+    Orchestrates one turn and yields response text as it is generated.
+    No text is released before the safety verdict for the turn is known.
+    Every stage of the turn is traced under one turn id.
+    """
+    started = time.perf_counter()
+    turn = tracer.start_turn(user_id=user_id, session_id=session_id, speculative=speculative)
+    first_chunk = True
+    try:
+        # aclosing throughout: a turn closed early closes its inner streams (and their tasks) at once
+        async with aclosing(_stream_turn(user_input, user_id, session_id, location, speculative)) as stream:
+            async for chunk in stream:
+                if first_chunk:
+                    first_chunk = False
+                    log_latency("orchestrator", "ttft", time.perf_counter() - started)
+                    turn.root.attributes["ttft_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                yield chunk
+    finally:
+        tracer.end_turn(turn)
+    log_latency("orchestrator", "total", time.perf_counter() - started)
+
+
+async def _stream_turn(
+    user_input: str, user_id: str, session_id: str, location: str, speculative: bool
+) -> AsyncIterator[StreamChunk]:
+    # --- STEP 1: SAFETY GATE (The Sentinel) ---
+    # Deterministic tiers first: keyword hits and plain acknowledgements skip the model call.
+    with tracer.span("safety_gate") as span:
+        verdict = assess(user_input, location)
+        span.attributes["tier"] = verdict.tier.value
+    log_agent_action("safety_cascade", "SAFETY_TIER", {"tier": verdict.tier.value, "score": verdict.score})
+
+    if verdict.tier is SafetyTier.ESCALATE:
+        recorded = await _escalate(user_input, user_id, session_id, "safety_cascade")
+        yield StreamChunk(verdict.response, "safety_cascade")
+        await _await_escalation(recorded)
+        return
+
+    if verdict.tier is SafetyTier.REVIEW:
+        if speculative:
+            async with aclosing(_stream_with_speculative_triage(user_input, user_id, session_id, verdict.score)) as stream:
+                async for chunk in stream:
+                    yield chunk
+            return
+
+        safety_response_text = await _run_safety_check(user_input, user_id, session_id, verdict.score)
+
+        # --- STEP 2: CRISIS INTERVENTION LOGIC ---
+        if "ESCALATE_CRISIS" in safety_response_text:
+            recorded = await _escalate(user_input, user_id, session_id, "safety_sentinel")
+            # Strip the system flag and show the compassionate resource message provided by the agent
+            yield StreamChunk(safety_response_text.replace("ESCALATE_CRISIS", "").strip(), "safety_sentinel")
+            await _await_escalation(recorded)
+            return
+
     # --- STEP 3: CLINICAL TRIAGE & INTERVENTION ---
-    print("✅ Safety Check Passed. Routing to Clinical Triage.")
-    
-    # The Triage agent will now take over and route to Coach/Planner via AgentTool
-    async for event in runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=types.Content(parts=[types.Part(text=user_input)])
-    ):
-        if event.is_final_response() and event.content:
-            print(f"withyou > {event.content.parts[0].text}")
+    async with aclosing(_stream_triage(user_input, user_id, session_id, verdict.score)) as stream:
+        async for chunk in stream:
+            yield chunk
+    await _remember_turn(user_id, session_id)
+
+
+async def process_user_interaction(
+    user_input: str,
+    user_id: str,
+    session_id: str,
+    location: str = DEFAULT_LOCATION,
+    speculative: bool = SPECULATIVE_TRIAGE,
+):
+    print(f"\n--- Processing for User: {user_id} ---")
+    print("withyou > ", end="", flush=True)
+    async for chunk in stream_user_interaction(user_input, user_id, session_id, location, speculative):
+        print(chunk.text, end="", flush=True)
+    print()
 
 # --- Execution Simulation ---
-if __name__ == "__main__":
+# For concurrent multi-session serving, run server.py instead.
+async def _run_demo():
     # Scenario 1: Anxiety (Standard Flow)
-    asyncio.run(process_user_interaction(
-        "I can't sleep because I'm worried about my job presentation tomorrow.", 
-        "user_123", 
+    await process_user_interaction(
+        "I can't sleep because I'm worried about my job presentation tomorrow.",
+        "user_123",
         "session_001"
-    ))
-    
+    )
+
     # Scenario 2: Safety Risk (Crisis Flow)
-    asyncio.run(process_user_interaction(
-        "I don't want to be here anymore. I'm thinking of hurting myself.", 
-        "user_123", 
+    await process_user_interaction(
+        "I don't want to be here anymore. I'm thinking of hurting myself.",
+        "user_123",
         "session_002"
-    ))
\ No newline at end of file
+    )
+
+if __name__ == "__main__":
+    asyncio.run(_run_demo())
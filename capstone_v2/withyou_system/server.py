@@ -0,0 +1,338 @@
+# Long-running async HTTP front end (many sessions, one event loop)
+#
+#   POST /v1/sessions/{session_id}/messages  {"user_id": ..., "text": ..., "location": ...}
+#       -> 200 chunked NDJSON stream of {"text", "author"} lines, then {"done": true}
+#       -> 429 if the session already has too many pending turns
+#       -> 503 if the server-wide queue is full
+#   POST /v1/escalations/{case_id}/ack      {"reviewer": ...}   (or /resolve)
+#       Authorization: Bearer $WITHYOU_REVIEWER_TOKEN; without a configured token -> 404
+#       -> 200 {"case_id", "status"}; 401 on a missing or wrong token;
+#          404 if the case is unknown or already closed
+#   GET /healthz
+#   GET /metrics   Prometheus text: per-stage latency histograms, tokens, retries
+import asyncio
+import hmac
+import json
+from contextlib import aclosing
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from config.settings import (
+    DEFAULT_LOCATION,
+    ESCALATION_REVIEWER_TOKEN,
+    MAX_CONCURRENT_TURNS,
+    MAX_QUEUED_TURNS,
+    MAX_SESSION_QUEUE,
+    PREWARM_ON_START,
+    SERVER_HOST,
+    SERVER_PORT,
+)
+from core.telemetry import log_agent_action, pipeline as telemetry_pipeline
+from core.tracing import trace_pipeline, tracer
+from core.escalations import get_escalation_outbox
+from core.intent_router import get_router
+from core.llm_scheduler import llm_scheduler
+from core.model_tiers import tier_policy
+from core.reminders import get_reminder_engine
+from main import stream_user_interaction, verdict_cache
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+MAX_BODY_BYTES = 64 * 1024
+RETRY_AFTER_SECONDS = 1
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class _SessionLane:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()  # FIFO: turns in a session run in arrival order
+        self.pending = 0
+
+
+class TurnScheduler:
+    """
+    Admission control for turns. Turns within one session run strictly in
+    order; across sessions at most `max_concurrent` run at once, at most
+    `max_queued` wait, and anything beyond that is rejected immediately.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, max_per_session: int):
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._max_queued = max_queued
+        self._max_per_session = max_per_session
+        self._lanes: Dict[Tuple[str, str], _SessionLane] = {}
+        self.admitted = 0
+        self.running = 0
+        self.rejected = 0
+
+    def admit(self, user_id: str, session_id: str) -> _SessionLane:
+        if self.admitted - self.running >= self._max_queued:
+            self.rejected += 1
+            raise HttpError(503, "server busy")
+        key = (user_id, session_id)
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _SessionLane()
+        if lane.pending >= self._max_per_session:
+            self.rejected += 1
+            raise HttpError(429, "too many pending messages for this session")
+        lane.pending += 1
+        self.admitted += 1
+        return lane
+
+    async def acquire(self, lane: _SessionLane):
+        await lane.lock.acquire()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            lane.lock.release()
+            raise
+        self.running += 1
+
+    def release(self, user_id: str, session_id: str, lane: _SessionLane, acquired: bool):
+        if acquired:
+            self.running -= 1
+            self._slots.release()
+            lane.lock.release()
+        lane.pending -= 1
+        self.admitted -= 1
+        if lane.pending == 0:
+            self._lanes.pop((user_id, session_id), None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._lanes),
+            "running": self.running,
+            "queued": self.admitted - self.running,
+            "rejected": self.rejected,
+        }
+
+
+class WithyouServer:
+    def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT):
+        self.host = host
+        self.port = port
+        self.scheduler = TurnScheduler(MAX_CONCURRENT_TURNS, MAX_QUEUED_TURNS, MAX_SESSION_QUEUE)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        log_agent_action("server", "LISTENING", {"host": self.host, "port": self.port})
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                await self._dispatch(method, path, headers, body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HttpError as error:
+            await self._send_json(writer, error.status, {"error": error.reason})
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise HttpError(400, "invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path, headers, body
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes, writer: asyncio.StreamWriter):
+        # Routes match the path alone; segments are unquoted after splitting,
+        # so an encoded "/" stays inside its segment.
+        path = urlsplit(target).path
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if path == "/healthz":
+            await self._send_json(writer, 200, {
+                "status": "ok",
+                **self.scheduler.stats(),
+                "verdict_cache": verdict_cache.stats(),
+                "intent_router": get_router().stats(),
+                "telemetry": telemetry_pipeline.stats(),
+                "traces": trace_pipeline.stats(),
+                "llm_scheduler": llm_scheduler.stats(),
+                "model_tiers": tier_policy.stats(),
+                "reminders": get_reminder_engine().stats(),
+                "escalations": get_escalation_outbox().stats(),
+                "latency_ms": tracer.snapshot(),
+            })
+            return
+        if path == "/metrics":
+            await self._send_text(writer, 200, tracer.prometheus_text(), "text/plain; version=0.0.4")
+            return
+
+        if len(parts) == 4 and parts[:2] == ["v1", "escalations"] and parts[3] in ("ack", "resolve"):
+            await self._review(method, parts[2], parts[3], headers, body, writer)
+            return
+        if len(parts) != 4 or parts[0] != "v1" or parts[1] != "sessions" or parts[3] != "messages":
+            await self._send_json(writer, 404, {"error": "not found"})
+            return
+        if method != "POST":
+            await self._send_json(writer, 405, {"error": "use POST"})
+            return
+
+        try:
+            payload = json.loads(body or b"{}")
+            user_id = str(payload["user_id"])
+            text = str(payload["text"])
+        except (ValueError, KeyError, TypeError):
+            await self._send_json(writer, 400, {"error": "body must be JSON with user_id and text"})
+            return
+
+        await self._handle_turn(
+            user_id, parts[2], text, str(payload.get("location") or DEFAULT_LOCATION), writer
+        )
+
+    async def _review(self, method: str, case_id: str, action: str, headers: Dict[str, str], body: bytes, writer: asyncio.StreamWriter):
+        # Case ids are sequential, so closing a case needs the reviewer token;
+        # with none configured the endpoints do not exist on this port.
+        if not ESCALATION_REVIEWER_TOKEN:
+            await self._send_json(writer, 404, {"error": "not found"})
+            return
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode("utf-8"), ESCALATION_REVIEWER_TOKEN.encode("utf-8")):
+            log_agent_action("server", "REVIEW_UNAUTHORIZED", {"case_id": case_id, "action": action})
+            await self._send_json(writer, 401, {"error": "reviewer token required"})
+            return
+        if method != "POST":
+            await self._send_json(writer, 405, {"error": "use POST"})
+            return
+        try:
+            reviewer = str(json.loads(body or b"{}")["reviewer"])
+            case = int(case_id)
+        except (ValueError, KeyError, TypeError):
+            await self._send_json(writer, 400, {"error": "body must be JSON with reviewer"})
+            return
+        outbox = get_escalation_outbox()
+        update = outbox.acknowledge if action == "ack" else outbox.resolve
+        if not await asyncio.to_thread(update, case, reviewer):
+            await self._send_json(writer, 404, {"error": "no open case with that id"})
+            return
+        await self._send_json(writer, 200, {"case_id": case, "status": "acknowledged" if action == "ack" else "resolved"})
+
+    async def _handle_turn(self, user_id: str, session_id: str, text: str, location: str, writer: asyncio.StreamWriter):
+        try:
+            lane = self.scheduler.admit(user_id, session_id)
+        except HttpError as error:
+            log_agent_action("server", "REJECTED", {"status": error.status, **self.scheduler.stats()})
+            await self._send_json(writer, error.status, {"error": error.reason})
+            return
+
+        acquired = False
+        headers_sent = False
+        try:
+            await self.scheduler.acquire(lane)
+            acquired = True
+            headers_sent = True
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/x-ndjson\r\n"
+                b"Transfer-Encoding: chunked\r\n\r\n"
+            )
+            # Closed before the lane is released, even on a disconnect: a turn's
+            # speculative triage must not write to the session under the next turn
+            async with aclosing(stream_user_interaction(text, user_id, session_id, location)) as stream:
+                async for chunk in stream:
+                    await self._write_chunk(writer, {"text": chunk.text, "author": chunk.author})
+            await self._write_chunk(writer, {"done": True})
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except Exception as error:
+            log_agent_action("server", "TURN_FAILED", {"session": session_id, "error": type(error).__name__})
+            if not headers_sent:
+                await self._send_json(writer, 500, {"error": "internal error"})
+            else:
+                await self._write_chunk(writer, {"error": "internal error", "done": True})
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        finally:
+            self.scheduler.release(user_id, session_id, lane, acquired)
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, payload: dict):
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        writer.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict):
+        await self._send_text(writer, status, json.dumps(payload), "application/json")
+
+    async def _send_text(self, writer: asyncio.StreamWriter, status: int, text: str, content_type: str):
+        data = text.encode("utf-8")
+        headers = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(data)}",
+        ]
+        if status in (429, 503):
+            headers.append(f"Retry-After: {RETRY_AFTER_SECONDS}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+
+async def serve(host: str = SERVER_HOST, port: int = SERVER_PORT, prewarm: bool = PREWARM_ON_START):
+    # Load agents and SDKs before the port opens, so a load balancer only
+    # sees this worker once the first turn will not pay for a cold start.
+    if prewarm:
+        from core.startup import prewarm as prewarm_worker
+        prewarm_worker()
+    get_reminder_engine().start()   # Delivers reminders set through schedule_routine
+    get_escalation_outbox().start()  # Delivers crisis cases left undelivered by a previous run
+    await WithyouServer(host, port).serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -1,35 +1,148 @@
 # Symptom checkers, Mood analysis
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, Optional
 
-def mood_trend_analyzer(user_id: str, days: int = 7) -> Dict[str, Any]:
+import numpy as np
+from google.adk.tools.tool_context import ToolContext
+
+from config.settings import MOOD_STORE_DIR
+from core.assessments import CHANGE_LABELS, INSTRUMENTS, extract_items, get_assessment_store, instrument_for, prefill
+from core.mood_store import EMOTIONS, MoodStore
+from core.speculation import side_effects_allowed
+
+mood_store = MoodStore(MOOD_STORE_DIR)
+
+async def log_mood(
+    valence: int, emotion: str, sleep_hours: Optional[float] = None, tool_context: Optional[ToolContext] = None
+) -> Dict[str, Any]:
     """
-    Simulates fetching and analyzing mood logs from the mobile app database.
+    Records a mood check-in for the user.
+
+    Args:
+        valence: Integer from 1 (Very Negative) to 5 (Very Positive).
+        emotion: One word, e.g. 'anxious', 'calm', 'tired'.
+        sleep_hours: Hours slept last night, if the user mentioned it.
+
+    Returns:
+        Confirmation with the user's total number of check-ins.
+    """
+    if not (1 <= valence <= 5):
+        return {"status": "error", "message": "Valence must be between 1 and 5."}
+    # Nothing is written until the turn's safety verdict is known.
+    await side_effects_allowed()
+    user_id = tool_context.user_id if tool_context is not None else "local_user"
+    entries = await asyncio.to_thread(mood_store.append, user_id, valence, emotion, sleep_hours=sleep_hours)
+    return {"status": "success", "entries": entries, "known_emotions": ", ".join(EMOTIONS[1:])}
+
+def mood_trend_analyzer(days: int = 7, tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
+    """
+    Analyzes the user's logged moods over the past days.
     
     Args:
-        user_id: Unique user identifier.
         days: Number of past days to analyze.
     
     Returns:
         Analysis of mood trajectory (e.g., 'deteriorating', 'stable', 'improving').
     """
-    # Logic to fetch data from secure backend would go here.
-    # Evaluating simulated patterns for the capstone context.
+    user_id = tool_context.user_id if tool_context is not None else "local_user"
+    # Binary search + running totals: cost does not grow with the history length.
+    window = mood_store.window(user_id, days)
+    if not window.entries:
+        return {"status": "no_data", "trend": "insufficient_data", "entries": 0}
     return {
         "status": "success",
-        "trend": "deteriorating",
-        "primary_emotion": "anxiety",
-        "sleep_correlation": "high_negative", # Poor sleep correlating with anxiety
-        "context": "User logs indicate escalating stress regarding work deadlines."
+        "trend": window.trend,
+        "primary_emotion": window.primary_emotion,
+        "average_valence": window.average_valence,
+        "valence_change_per_day": window.slope_per_day,
+        "entries": window.entries,
     }
 
-def symptom_checker(symptoms: str) -> Dict[str, str]:
+def symptom_checker(symptoms: str) -> Dict[str, Any]:
     """
     Provides a non-diagnostic assessment of severity based on reported symptoms.
     Uses clinical heuristics based on PHQ-9/GAD-7 logic structures.
+
+    Args:
+        symptoms: The user's own description of how they have been feeling.
+
+    Returns:
+        Questionnaire items the description suggests, with pre-filled answers
+        and the least severe band they imply.
     """
     # Deterministic logic to prevent LLM hallucinating a medical diagnosis
-    return {
-        "disclaimer": "This is not a medical diagnosis. Please consult a professional.",
-        "severity_indicator": "moderate",
-        "suggested_action": "Recommend grounding techniques and sleep hygiene."
-    }
\ No newline at end of file
+    result: Dict[str, Any] = {"disclaimer": "This is not a medical diagnosis. Please consult a professional."}
+    worst, flagged = 0.0, False
+    found = extract_items(symptoms)
+    for key, instrument in INSTRUMENTS.items():
+        suggested = found[key]
+        if not suggested:
+            continue
+        # Items not mentioned count as 0, so this is a floor, not a score
+        floor = int(np.nansum(prefill(instrument, suggested)))
+        band = int(np.searchsorted(instrument.band_floors, floor, side="right")) - 1
+        result[key] = {
+            "prefilled": {str(item + 1): value for item, value in sorted(suggested.items())},
+            "items_mentioned": [instrument.items[item] for item in sorted(suggested)],
+            "score_at_least": floor,
+            "band_at_least": instrument.bands[band],
+            "items_to_ask": len(instrument.items) - len(suggested),
+        }
+        worst = max(worst, band / (len(instrument.bands) - 1))
+        flagged = flagged or (instrument.flag_item is not None and suggested.get(instrument.flag_item, 0) > 0)
+
+    if flagged:
+        result["severity_indicator"] = "urgent"
+        result["suggested_action"] = (
+            "Ask directly about safety now: whether they are having thoughts of ending their life or harming "
+            "themselves. Offer crisis resources before anything else."
+        )
+    elif len(result) == 1:
+        result["severity_indicator"] = "unclear"
+        result["suggested_action"] = "Ask gently how often these feelings have come up over the last two weeks."
+    elif worst >= 0.5:
+        result["severity_indicator"] = "moderate_or_higher"
+        result["suggested_action"] = "Offer to complete the full PHQ-9/GAD-7 and share the result with a clinician."
+    else:
+        result["severity_indicator"] = "mild"
+        result["suggested_action"] = "Recommend grounding techniques and sleep hygiene."
+    return result
+
+async def record_questionnaire(
+    instrument: str, answers: str, tool_context: Optional[ToolContext] = None
+) -> Dict[str, Any]:
+    """
+    Scores a completed PHQ-9 or GAD-7 and compares it with the user's last one.
+
+    Args:
+        instrument: 'PHQ-9' or 'GAD-7'.
+        answers: Item answers in order, 0-3 each, comma-separated (e.g. '1,2,0,1,3,0,1,0,0').
+            Leave an item empty if the user skipped it.
+
+    Returns:
+        Total, severity band and the change since the previous administration.
+    """
+    try:
+        chosen = instrument_for(instrument)
+        values = [float(value) if value.strip() else np.nan for value in answers.split(",")]
+        # Nothing is written until the turn's safety verdict is known.
+        await side_effects_allowed()
+        user_id = tool_context.user_id if tool_context is not None else "local_user"
+        batch = await asyncio.to_thread(get_assessment_store().add, chosen, user_id, values)
+    except ValueError as error:
+        return {"status": "error", "message": str(error)}
+    scores, changes = batch
+    total = scores.totals[0]
+    result: Dict[str, Any] = {
+        "status": "success",
+        "instrument": chosen.name,
+        "total": None if np.isnan(total) else int(total),
+        "band": scores.band_labels(chosen)[0],
+        "change": CHANGE_LABELS[changes.status[0]],
+        "disclaimer": "This is a screening score, not a diagnosis.",
+    }
+    if not np.isnan(changes.change[0]):
+        result["points_since_last"] = int(changes.change[0])
+    if scores.flagged[0]:
+        result["safety_flag"] = "Item 9 was answered above 0: follow the safety protocol now."
+    return result
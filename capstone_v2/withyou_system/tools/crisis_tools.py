@@ -1,28 +1,23 @@
 # Hotline lookups, Emergency protocols
-from typing import Dict, List
+from typing import Any, Dict
 
-def resource_lookup(location: str, urgency: str) -> Dict[str, str]:
+from config.settings import CRISIS_RESOURCES_PATH, CRISIS_RESOURCES_RELOAD_SECONDS
+from core.crisis_registry import CrisisResourceRegistry
+
+# Loaded once from data/crisis_resources.json; edits are picked up without a restart.
+crisis_registry = CrisisResourceRegistry(CRISIS_RESOURCES_PATH, CRISIS_RESOURCES_RELOAD_SECONDS)
+
+def resource_lookup(location: str, urgency: str) -> Dict[str, Any]:
     """
     Retrieves vetted mental health resources based on location and urgency.
     
     Args:
-        location: The user's region (e.g., "India", "USA").
+        location: The user's location in any form (e.g., "India", "IN", "Mumbai", "USA").
         urgency: Level of crisis ("immediate", "informational").
         
     Returns:
-        Dictionary containing helpline numbers and website links.
+        Dictionary with the resolved country/region, a one-line `summary` of
+        helplines, the individual `resources`, and the data file version.
     """
-    # In production, this queries a verified database via API
-    resources = {
-        "India": {
-            "immediate": "Vandrevala Foundation: 1860-266-2345 | AASRA: 9820466726",
-            "informational": "https://nimhans.ac.in/"
-        },
-        "Global": {
-            "immediate": "International Suicide Prevention: findahelpline.com",
-            "informational": "WHO Mental Health Resources"
-        }
-    }
-    
-    # Default to Global if location unknown
-    return resources.get(location, resources["Global"])
\ No newline at end of file
+    # Unknown locations fall back to global resources, never a guessed country.
+    return crisis_registry.lookup(location, urgency).as_dict()
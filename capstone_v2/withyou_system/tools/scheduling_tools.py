@@ -1,21 +1,57 @@
 # Calendar/Routine management
-from typing import Dict
+import asyncio
+from typing import Dict, Optional
 
-def schedule_routine(activity: str, time: str, frequency: str) -> Dict[str, str]:
+from google.adk.tools.tool_context import ToolContext
+
+from core.reminders import check_timezone, get_reminder_engine, parse_recurrence
+from core.speculation import side_effects_allowed
+
+# User-scoped state key holding the user's IANA time zone, once they have given it
+TIMEZONE_STATE_KEY = "user:timezone"
+
+async def schedule_routine(
+    activity: str,
+    time: str,
+    frequency: str,
+    timezone: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None,
+) -> Dict[str, str]:
     """
     Schedules a wellness activity in the user's local calendar.
     
     Args:
         activity: The habit to build (e.g., '5-minute breathing', 'Morning walk').
-        time: HH:MM format (24h).
-        frequency: e.g., 'daily', 'weekdays'.
+        time: HH:MM format (24h), in the user's local time.
+        frequency: e.g., 'daily', 'weekdays', 'mon, wed, fri', 'every 2 days', 'once'.
+        timezone: The user's IANA time zone (e.g., 'Asia/Kolkata'), if they have said where they are.
+            Remembered for their later reminders.
         
     Returns:
-        Confirmation status.
+        Confirmation status with the reminder ID and when it first fires.
     """
-    # In production, integrates with Google Calendar API or Mobile OS Alarms
+    state = tool_context.state if tool_context is not None else {}
+    try:
+        recurrence = parse_recurrence(time, frequency)
+        zone = check_timezone(timezone) if timezone else state.get(TIMEZONE_STATE_KEY)
+    except ValueError as error:
+        return {"status": "error", "message": str(error)}
+    engine = get_reminder_engine()
+    # Nothing is written until the turn's safety verdict is known.
+    await side_effects_allowed()
+    user_id = tool_context.user_id if tool_context is not None else "local_user"
+    # SQLite write off the event loop: the engine's lock may be held by a tick delivering reminders.
+    reminder = await asyncio.to_thread(engine.add, user_id, activity, recurrence, zone)
+    if timezone and tool_context is not None:
+        tool_context.state[TIMEZONE_STATE_KEY] = zone
+    first = reminder.next_due_local()
+    message = f"Reminder set: '{activity}' {recurrence.describe()}. First one: {first:%a %d %b %H:%M} ({reminder.timezone})."
+    if zone is None:
+        message += " The user's time zone is not known, so this uses the default; ask where they are to correct it."
     return {
         "status": "success",
-        "message": f"Reminder set: '{activity}' at {time} ({frequency}).",
-        "behavioral_activation_id": "BA-9928"
-    }
\ No newline at end of file
+        "message": message,
+        "behavioral_activation_id": f"BA-{reminder.id}",
+        "rule": reminder.rule,
+        "timezone": reminder.timezone,
+    }